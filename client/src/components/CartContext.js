@@ -1,4 +1,4 @@
-import React, { createContext, useContext, useState } from "react";
+import React, { createContext, useCallback, useContext, useState } from "react";
 
 const CartContext = createContext();
 
@@ -39,9 +39,48 @@ export const CartWrapper = ({ children }) => {
         });
     };
 
+    // Brings the price and stock of every cart item up to date with one
+    // request. ids is the comma-separated list of the items' product ids.
+    const refreshCart = useCallback(async (ids) => {
+        if (!ids) {
+            return;
+        }
+        try {
+            const response = await fetch(`/products?ids=${ids}`);
+            if (!response.ok) {
+                throw new Error("Network response was not ok.");
+            }
+            const { products, missing } = await response.json();
+            const latest = new Map(
+                products.map((product) => [product.id, product])
+            );
+            setCartItems((currentItems) =>
+                currentItems
+                    .filter((item) => !missing.includes(item.id))
+                    .map((item) =>
+                        latest.has(item.id)
+                            ? {
+                                  ...item,
+                                  ...latest.get(item.id),
+                                  quantity: item.quantity,
+                              }
+                            : item
+                    )
+            );
+        } catch (error) {
+            console.error("Could not refresh the cart:", error);
+        }
+    }, []);
+
     return (
         <CartContext.Provider
-            value={{ cartItems, addToCart, updateQuantity, removeFromCart }}
+            value={{
+                cartItems,
+                addToCart,
+                updateQuantity,
+                removeFromCart,
+                refreshCart,
+            }}
         >
             {children}
         </CartContext.Provider>
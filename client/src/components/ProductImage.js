@@ -0,0 +1,29 @@
+// ProductImage.js
+import React from "react";
+
+// Renders a product image as a <picture> with the resized AVIF/WebP variants
+// the server lists in image_srcset, so the browser downloads the smallest file
+// that fits. Falls back to the original PNG when no variants exist.
+export default function ProductImage({
+    product,
+    sizes,
+    className,
+    loading = "lazy",
+}) {
+    const srcsets = product.image_srcset || {};
+
+    return (
+        <picture>
+            {Object.entries(srcsets).map(([type, srcSet]) => (
+                <source key={type} type={type} srcSet={srcSet} sizes={sizes} />
+            ))}
+            <img
+                src={`/assets/${product.image_url}`}
+                alt={product.imageAlt}
+                className={className}
+                loading={loading}
+                decoding="async"
+            />
+        </picture>
+    );
+}
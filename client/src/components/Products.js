@@ -1,5 +1,6 @@
 import React, { useEffect, useState } from "react";
 import { Link } from "react-router-dom";
+import ProductImage from "./ProductImage";
 
 export default function Products() {
     const [products, setProducts] = useState([]);
@@ -41,9 +42,9 @@ export default function Products() {
                                 className="group"
                             >
                                 <div className="aspect-w-1 aspect-h-1 w-full overflow-hidden rounded-lg bg-gray-200 xl:aspect-w-7 xl:aspect-h-8">
-                                    <img
-                                        src={`/assets/${product.image_url}`}
-                                        alt={product.imageAlt}
+                                    <ProductImage
+                                        product={product}
+                                        sizes="(min-width: 1280px) 25vw, (min-width: 640px) 50vw, 100vw"
                                         className="h-full w-full object-cover object-center group-hover:opacity-75"
                                     />
                                 </div>
@@ -1,11 +1,19 @@
-import React, { Fragment } from "react";
+import React, { Fragment, useEffect } from "react";
 import { Dialog, Transition } from "@headlessui/react";
 import { XMarkIcon } from "@heroicons/react/24/outline";
 import { Link } from "react-router-dom";
 import { useCartContext } from "../components/CartContext";
 
 export default function ShoppingCart({ open, setOpen }) {
-    const { cartItems, updateQuantity, removeFromCart } = useCartContext();
+    const { cartItems, updateQuantity, removeFromCart, refreshCart } =
+        useCartContext();
+    const cartIds = cartItems.map((item) => item.id).join(",");
+
+    useEffect(() => {
+        if (open) {
+            refreshCart(cartIds);
+        }
+    }, [open, cartIds, refreshCart]);
 
     const calculateTotal = () => {
         return cartItems
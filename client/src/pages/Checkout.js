@@ -1,4 +1,4 @@
-import React from "react";
+import React, { useEffect, useRef } from "react";
 import { Formik, Form, Field } from "formik";
 import * as Yup from "yup";
 import { useCartContext } from "../components/CartContext";
@@ -14,7 +14,16 @@ const CheckoutSchema = Yup.object().shape({
 });
 
 const Checkout = () => {
-    const { cartItems } = useCartContext();
+    const { cartItems, refreshCart } = useCartContext();
+    const cartIds = cartItems.map((item) => item.id).join(",");
+    // Sent with every attempt to submit this order, so a retry after a lost
+    // response returns the order already placed instead of placing another.
+    const idempotencyKey = useRef(null);
+
+    // Prices and stock may have changed since the items were added.
+    useEffect(() => {
+        refreshCart(cartIds);
+    }, [cartIds, refreshCart]);
 
     const calculateTotal = () => {
         return cartItems
@@ -44,6 +53,11 @@ const Checkout = () => {
                                 <p className="text-sm text-gray-500">
                                     Quantity: {item.quantity}
                                 </p>
+                                {item.item_quantity < item.quantity && (
+                                    <p className="text-sm text-red-600">
+                                        Only {item.item_quantity} left in stock
+                                    </p>
+                                )}
                             </div>
                         </div>
                         <span className="font-semibold">
@@ -77,10 +91,14 @@ const Checkout = () => {
                             quantity: item.quantity,
                         }));
 
+                        if (!idempotencyKey.current) {
+                            idempotencyKey.current = crypto.randomUUID();
+                        }
                         const response = await fetch("/api/orders", {
                             method: "POST",
                             headers: {
                                 "Content-Type": "application/json",
+                                "Idempotency-Key": idempotencyKey.current,
                             },
                             body: JSON.stringify({
                                 // user_id: ,
@@ -88,6 +106,10 @@ const Checkout = () => {
                             }),
                         });
 
+                        // A refused order was not placed, so the next attempt is a new one.
+                        if (response.status >= 400 && response.status < 500) {
+                            idempotencyKey.current = null;
+                        }
                         if (!response.ok) {
                             throw new Error("Network response was not ok.");
                         }
@@ -2,6 +2,7 @@ import React, { useEffect, useState } from "react";
 import { useParams } from "react-router-dom";
 import { StarIcon } from "@heroicons/react/20/solid";
 import { useCartContext } from "../components/CartContext";
+import ProductImage from "../components/ProductImage";
 
 export default function ViewProduct() {
     const { id } = useParams();
@@ -42,9 +43,10 @@ export default function ViewProduct() {
         <div className="bg-white py-8">
             <div className="max-w-2xl mx-auto px-4 sm:px-6 lg:max-w-7xl lg:grid lg:grid-cols-3 lg:gap-x-8 lg:px-8">
                 <div className="lg:col-span-1 flex justify-center lg:justify-start">
-                    <img
-                        src={`/assets/${product.image_url}`}
-                        alt={product.imageAlt}
+                    <ProductImage
+                        product={product}
+                        sizes="(min-width: 1024px) 33vw, 100vw"
+                        loading="eager"
                         className="rounded-lg shadow-md w-full lg:w-auto h-auto"
                     />
                 </div>
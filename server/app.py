@@ -3,28 +3,113 @@
 # here we will have route definitions and logic for our API
 
 import os
+import secrets
+from bisect import bisect_right
+from datetime import datetime
+from operator import attrgetter
 
 # Standard library imports
 from email.headerregistry import HeaderRegistry
 
 # Remote library imports
 # Local imports
+from auth import (
+    AuthError,
+    issue_token,
+    require_user_id,
+    revocations,
+    revoke_current_token,
+    token_user_id,
+)
+from catalog_cache import catalog_cache, payload_product_tags
+from category_index import category_index
+from checkout import CheckoutError, InsufficientStockError, place_orders
 from config import api, app, db
-from dotenv import load_dotenv
-from flask import jsonify, make_response, request
+from exports import (
+    export_response,
+    order_detail_export_query,
+    order_export_query,
+    parse_export_range,
+)
+from flask import Response, jsonify, make_response, request
 from flask_restful import Resource
-from helpers import validate_not_blank, validate_type
-from marshmallow import Schema, fields, validate
+from helpers import (
+    decode_cursor,
+    encode_cursor,
+    parse_id_list,
+    parse_limit,
+    validate_not_blank,
+    validate_type,
+)
+from idempotency import (
+    IdempotencyConflict,
+    IdempotencyError,
+    idempotency_store,
+    parse_idempotency_key,
+    request_fingerprint,
+)
+from instrumentation import install_instrumentation, metrics_registry
+from inventory import (
+    OutOfStockError,
+    ReservationError,
+    active_reservations,
+    release_reservation,
+    reservation_sweeper,
+    reserve,
+)
+from marshmallow import ValidationError
 from models import Category, Order, OrderDetail, Product, ProductCategory, User
+from payloads import EncodedPayload, payload_response
+from ratelimit import install_rate_limits, rate_limiter
+from reports import MAX_REPORT_ROWS, parse_report_range, sales_report
+from schemas import (
+    category_schema,
+    credentials_schema,
+    load_payload,
+    order_batch_schema,
+    order_schema,
+    password_change_schema,
+    product_category_schema,
+    product_schema,
+    product_update_schema,
+    reservation_schema,
+    token_password_change_schema,
+    user_schema,
+)
+from search import search_product_ids, search_terms
+from serializers import (
+    category_serializer,
+    fast_serializers_enabled,
+    order_detail_serializer,
+    product_category_serializer,
+    serialize_orders,
+    user_serializer,
+)
+from sqlalchemy import String, func, select, tuple_, type_coerce
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.exc import StaleDataError
 
 # Builds app, set attributes
-BASE_DIR = os.path.abspath(os.path.dirname(__file__))
-DATABASE = os.environ.get(
-    "DB_URI", f"sqlite:///{os.path.join(BASE_DIR, 'instance', 'app.db')}"
-)
-load_dotenv()
-app.secret_key = os.environ.get("SECRET_KEY")
+# Session tokens are signed with SECRET_KEY, so every worker process and every restart has to use the same one. Only the development server and tests fall back to a per-process random key; anything else, e.g. uvicorn with several workers, refuses to start without it.
+secret_key = os.environ.get("SECRET_KEY")
+if not secret_key:
+    if not (__name__ == "__main__" or app.debug or app.testing):
+        raise RuntimeError(
+            "SECRET_KEY is not set. Session tokens are signed with it, so every "
+            "worker and restart must share one; set it in server/.env."
+        )
+    app.logger.warning(
+        "SECRET_KEY is not set; using a random key, so session tokens stop "
+        "validating on restart and in other processes."
+    )
+    secret_key = secrets.token_hex(32)
+app.secret_key = secret_key
+
+
+@app.before_request
+def start_reservation_sweeper():
+    reservation_sweeper.ensure_running()
 
 
 @app.route("/")
@@ -36,31 +121,55 @@ class Products(Resource):
     # TESTED ✅
     def get(self):
         try:
-            products = [product.to_dict() for product in Product.query.all()]
-            products = [
-                product.to_dict(convert_price_to_dollars=True)
-                for product in Product.query.all()
-            ]
+            if "ids" in request.args:
+                return product_batch_response(request.args["ids"])
+
+            if "category" in request.args:
+                if request.args.get("sort", "id") != "id":
+                    raise ValueError("Category listings are sorted by id only.")
+                category_id = validate_type(request.args["category"], "category", int)
+                return category_products_response(category_id, request.args)
+
+            # Paginated mode kicks in as soon as the client asks for a page,
+            # otherwise the full catalog is returned as before.
+            if any(arg in request.args for arg in ("limit", "after", "sort")):
+                key = (
+                    "products",
+                    request.args.get("sort", "id"),
+                    request.args.get("after"),
+                    request.args.get("limit"),
+                )
+                page = catalog_cache.get_or_load(
+                    key,
+                    lambda: EncodedPayload(paginate_products(request.args)),
+                    tags=payload_product_tags,
+                )
+                return payload_response(page)
+
+            products = catalog_cache.get_or_load(
+                ("products", "all"),
+                lambda: EncodedPayload(
+                    {
+                        "products": [
+                            product.to_dict(convert_price_to_dollars=True)
+                            for product in Product.query.all()
+                        ]
+                    }
+                ),
+                tags=payload_product_tags,
+            )
 
-            return make_response({"products": products}, 200)
+            return payload_response(products)
+        except ValueError as error:
+            return make_response({"error": str(error)}, 400)
         except Exception as error:
             return make_response({"error": str(error)}, 500)
 
     # TESTED ✅
 
     def post(self):
-        product_data = request.get_json()
         try:
-            required_fields = [
-                "name",
-                "description",
-                "price",
-                "item_quantity",
-                "image_url",
-                "imageAlt",
-            ]
-            if not all(field in product_data for field in required_fields):
-                return make_response({"error": "Missing required fields"}, 400)
+            product_data = load_payload(product_schema, request.get_json(silent=True))
 
             # Convert price to cents
             new_product_price = int(float(product_data["price"]) * 100)
@@ -76,6 +185,8 @@ class Products(Resource):
             db.session.add(new_product)
             commit_session(db.session)
             return make_response({"new_product": new_product.to_dict()}, 201)
+        except ValidationError as error:
+            return validation_error_response(error)
         except IntegrityError:
             return make_response(
                 {"error": "Product creation failed due to a database error."}, 400
@@ -84,30 +195,81 @@ class Products(Resource):
             return make_response({"error": str(error)}, 500)
 
 
+class ProductSearch(Resource):
+    # Ranked full-text search over product names, descriptions and image alt
+    # text. Results are paged with limit/offset, since ranked results have no
+    # stable key to use as a cursor.
+    def get(self):
+        try:
+            query = request.args.get("q", "")
+            limit = parse_limit(
+                request.args.get("limit"), DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+            )
+            offset = validate_type(request.args.get("offset", 0), "offset", int)
+            if offset < 0:
+                raise ValueError("The offset must not be negative.")
+
+            def load():
+                ids = search_product_ids(query, limit + 1, offset)
+                return EncodedPayload(
+                    {
+                        "products": load_product_dicts(ids[:limit]),
+                        "next_offset": offset + limit if len(ids) > limit else None,
+                        "limit": limit,
+                    }
+                )
+
+            key = ("search", " ".join(search_terms(query)), limit, offset)
+            return payload_response(
+                catalog_cache.get_or_load(key, load, tags=payload_product_tags)
+            )
+        except ValueError as error:
+            return make_response({"error": str(error)}, 400)
+        except Exception as error:
+            return make_response({"error": str(error)}, 500)
+
+
 class ProductByID(Resource):
     # TESTED ✅
     def get(self, id):
-        product = Product.query.get(id)
+        def load():
+            product = Product.query.get(id)
+            if product is None:
+                return None
+            return EncodedPayload(product.to_dict(convert_price_to_dollars=True))
+
+        product = catalog_cache.get_or_load(("product", id), load)
         if product:
-            return make_response(product.to_dict(convert_price_to_dollars=True), 200)
+            return payload_response(product)
         else:
             return make_response({"error": "Product not found"}, 404)
 
     # TESTED ✅
     def patch(self, id):
+        try:
+            data = load_payload(product_update_schema, request.get_json(silent=True))
+        except ValidationError as error:
+            return validation_error_response(error)
+
         product = Product.query.get(id)
 
         if product:
-            data = request.get_json()
-
             try:
+                # A client that sends the version it read only overwrites that version.
+                if "version" in data and data["version"] != product.version:
+                    return stale_product_response(product)
                 for attr in data:
-                    setattr(product, attr, data[attr])
+                    if attr != "version":
+                        setattr(product, attr, data[attr])
 
                 commit_session(db.session)
 
                 return make_response(product.to_dict(), 202)
 
+            except StaleDataError:
+                # Someone else (e.g. a checkout) changed the row since it was loaded.
+                db.session.rollback()
+                return stale_product_response(db.session.get(Product, id))
             except ValueError:
                 return make_response({"errors": ["validation errors"]}, 400)
         else:
@@ -130,12 +292,14 @@ class ProductByID(Resource):
 class Users(Resource):
     # TESTED ✅
     def get(self):
+        if fast_serializers_enabled():
+            return make_response(user_serializer.all(db.session), 200)
         return make_response([user.to_dict() for user in User.query.all()], 200)
 
     # TESTED ✅
     def post(self):
-        user_data = request.get_json()
         try:
+            user_data = load_payload(user_schema, request.get_json(silent=True))
             new_user = User(
                 username=user_data["username"],
                 email=user_data["email"],
@@ -151,6 +315,8 @@ class Users(Resource):
             commit_session(db.session)
 
             return make_response({"message": "User created successfully"}, 201)
+        except ValidationError as error:
+            return validation_error_response(error)
         except IntegrityError as e:
             db.session.rollback()
             if "UNIQUE constraint failed" in str(e):
@@ -166,12 +332,18 @@ class Users(Resource):
 
     def delete(self):
         try:
-            data = request.get_json()
-            if not all(key in data for key in ("username", "password")):
-                return make_response(
-                    {"error": "Username and password are required"}, 400
-                )
+            # A valid session token stands in for the credentials, so no bcrypt run is needed.
+            user_id = token_user_id()
+            if user_id is not None:
+                user = db.session.get(User, user_id)
+                if user is None:
+                    return make_response({"error": "User not found"}, 404)
+                db.session.delete(user)
+                commit_session(db.session)
+                revocations.revoke_user(user_id)
+                return make_response({"message": "User deleted successfully"}, 200)
 
+            data = load_payload(credentials_schema, request.get_json(silent=True))
             username = data["username"]
             password = data["password"]
 
@@ -181,18 +353,30 @@ class Users(Resource):
                 user_to_delete = user
                 db.session.delete(user_to_delete)
                 commit_session(db.session)
+                revocations.revoke_user(user_to_delete.id)
                 return make_response({"message": "User deleted successfully"}, 200)
             else:
                 return make_response({"error": "Invalid credentials"}, 401)
+        except ValidationError as error:
+            return validation_error_response(error)
+        except AuthError as error:
+            return make_response({"error": str(error)}, 401)
         except Exception as error:
             return make_response({"error": str(error)}, 500)
 
     def patch(self):
-        data = request.get_json()
         try:
-            if not all(key in data for key in ("username", "password", "newPassword")):
-                return make_response({"error": "Required fields are missing"}, 400)
+            user_id = token_user_id()
+            if user_id is not None:
+                data = load_payload(
+                    token_password_change_schema, request.get_json(silent=True)
+                )
+                user = db.session.get(User, user_id)
+                if user is None:
+                    return make_response({"error": "User not found"}, 404)
+                return update_password(user, data["newPassword"])
 
+            data = load_payload(password_change_schema, request.get_json(silent=True))
             username = data["username"]
             password = data["password"]
             new_password = data["newPassword"]
@@ -200,105 +384,336 @@ class Users(Resource):
             user = User.query.filter_by(username=username).first()
 
             if user and user.authenticate(password):
-                user.password = new_password
-                commit_session(db.session)
-                return make_response({"message": "Password updated successfully"}, 200)
+                return update_password(user, new_password)
             else:
                 return make_response({"error": "Invalid credentials"}, 401)
+        except ValidationError as error:
+            return validation_error_response(error)
+        except AuthError as error:
+            return make_response({"error": str(error)}, 401)
         except Exception as error:
             return make_response({"error": str(error)}, 500)
 
 
-# User Schema
-class UserSchema(Schema):
-    id = fields.Int(dump_only=True)
-    username = fields.Str(required=True, validate=validate.Length(min=3))
-    email = fields.Email(required=True)
-    first_name = fields.Str(required=False, validate=validate.Length(min=1))
-    last_name = fields.Str(required=False, validate=validate.Length(min=1))
-    password = fields.Str(
-        load_only=True, required=True, validate=validate.Length(min=6)
-    )
-    shipping_address = fields.Str(required=False, validate=validate.Length(min=1))
-    shipping_city = fields.Str(required=False, validate=validate.Length(min=1))
-    shipping_state = fields.Str(required=False, validate=validate.Length(min=1))
-    shipping_zip = fields.Str(required=False, validate=validate.Length(min=1))
-    orders = fields.Nested("OrderSchema", many=True, exclude=("user",))
-
-    def __repr__(self):
-        return f"<User {self.username}>"
-
-
 class Orders(Resource):
     # TESTED ✅
     def get(self):
         try:
+            if fast_serializers_enabled():
+                return make_response(serialize_orders(db.session), 200)
             orders = Order.query.all()
             return make_response([order.to_dict() for order in orders], 200)
         except Exception as error:
             return make_response({"error": str(error)}, 500)
 
     # TESTED ✅
+    # With an Idempotency-Key header, retries of a successful request get its
+    # original response back instead of placing the order again.
     def post(self):
-        order_data = request.get_json()
+        idempotency_key = None
         try:
-            new_order = Order(user_id=order_data["user_id"])
-            db.session.add(new_order)
-            db.session.flush()
-
-            for detail in order_data["order_details"]:
-                order_detail = OrderDetail(
-                    order_id=new_order.id,
-                    product_id=detail["product_id"],
-                    quantity=detail["quantity"],
+            idempotency_key = parse_idempotency_key(
+                request.headers.get("Idempotency-Key")
+            )
+            order_data = load_payload(order_schema, request.get_json(silent=True))
+            # Signed-in clients may leave out user_id, but can't order for someone else.
+            user_id = token_user_id()
+            if user_id is not None:
+                order_data.setdefault("user_id", user_id)
+                if order_data["user_id"] != user_id:
+                    return make_response(
+                        {"error": "Orders can only be placed for yourself"}, 403
+                    )
+
+            cart = order_data.pop("cart", None)
+            if idempotency_key is not None:
+                request_hash = request_fingerprint(order_data, cart)
+                replay = idempotency_store.replay(
+                    db.session, idempotency_key, request_hash
+                )
+                if replay is not None:
+                    return replay
+
+            [order_id] = place_orders(db.session, [order_data], cart=cart)
+            body = {"message": "Order created successfully", "order_id": order_id}
+            if idempotency_key is not None:
+                idempotency_store.save(
+                    db.session, idempotency_key, request_hash, 201, body
                 )
-                db.session.add(order_detail)
+            commit_session(db.session)
+            return make_response(body, 201)
+        except ValidationError as error:
+            return validation_error_response(error)
+        except IdempotencyConflict as e:
+            return make_response({"error": str(e)}, 422)
+        except IdempotencyError as e:
+            return make_response({"error": str(e)}, 400)
+        except IntegrityError as e:
+            db.session.rollback()
+            # A concurrent request with the same key committed first; this
+            # request's order was rolled back, so answer with that one's.
+            if idempotency_key is not None:
+                try:
+                    replay = idempotency_store.replay(
+                        db.session, idempotency_key, request_hash
+                    )
+                except IdempotencyConflict as conflict:
+                    return make_response({"error": str(conflict)}, 422)
+                if replay is not None:
+                    return replay
+            return make_response({"error": "Order creation failed: " + str(e)}, 500)
+        except AuthError as e:
+            return make_response({"error": str(e)}, 401)
+        except InsufficientStockError as e:
+            return make_response({"error": str(e), "shortages": e.shortages}, 409)
+        except CheckoutError as e:
+            db.session.rollback()
+            return make_response({"error": str(e)}, 400)
+        except Exception as e:
+            db.session.rollback()
+            return make_response({"error": "Order creation failed: " + str(e)}, 500)
+
+
+class Reservations(Resource):
+    # Holds stock for a cart until checkout or RESERVATION_TTL, whichever
+    # comes first. The cart token returned with the first reservation groups
+    # the next ones and is passed as "cart" when the order is placed.
+    def get(self):
+        cart = request.args.get("cart")
+        if not cart:
+            return make_response({"error": "The cart is required"}, 400)
+        return make_response(
+            [
+                reservation.to_dict()
+                for reservation in active_reservations(db.session, cart)
+            ],
+            200,
+        )
+
+    def post(self):
+        try:
+            data = load_payload(reservation_schema, request.get_json(silent=True))
+            reservation = reserve(
+                db.session,
+                data["product_id"],
+                data["quantity"],
+                cart=data.get("cart"),
+            )
+            commit_session(db.session)
+            return make_response(reservation.to_dict(), 201)
+        except ValidationError as error:
+            return validation_error_response(error)
+        except OutOfStockError as e:
+            db.session.rollback()
+            return make_response(
+                {
+                    "error": str(e),
+                    "product_id": e.product_id,
+                    "requested": e.requested,
+                    "available": e.available,
+                },
+                409,
+            )
+        except ReservationError as e:
+            db.session.rollback()
+            return make_response({"error": str(e)}, 400)
+        except Exception as e:
+            db.session.rollback()
+            return make_response({"error": "Reservation failed: " + str(e)}, 500)
+
 
+class ReservationByID(Resource):
+    def delete(self, id):
+        try:
+            cart = request.args.get("cart")
+            if not cart:
+                return make_response({"error": "The cart is required"}, 400)
+            if not release_reservation(db.session, id, cart):
+                db.session.rollback()
+                return make_response({"error": "Reservation not found"}, 404)
+            commit_session(db.session)
+            return make_response({"message": "Reservation released"}, 200)
+        except Exception as e:
+            db.session.rollback()
+            return make_response({"error": str(e)}, 500)
+
+
+class OrdersBatch(Resource):
+    # Places many orders (e.g. imported B2B orders) in one transaction. Either
+    # every order is created and its stock taken, or nothing is.
+    def post(self):
+        try:
+            orders = load_payload(order_batch_schema, request.get_json(silent=True))[
+                "orders"
+            ]
+            order_ids = place_orders(db.session, orders)
             commit_session(db.session)
-            return make_response({"message": "Order created successfully"}, 201)
+            return make_response(
+                {"message": "Orders created successfully", "order_ids": order_ids},
+                201,
+            )
+        except ValidationError as error:
+            return validation_error_response(error)
+        except InsufficientStockError as e:
+            return make_response({"error": str(e), "shortages": e.shortages}, 409)
+        except CheckoutError as e:
+            db.session.rollback()
+            return make_response({"error": str(e)}, 400)
         except Exception as e:
             db.session.rollback()
             return make_response({"error": "Order creation failed: " + str(e)}, 500)
 
 
-class OrderSchema(Schema):
-    id = fields.Int(dump_only=True)
-    user_id = fields.Int(load_only=True)
-    created_at = fields.DateTime(dump_only=True)
-    order_details = fields.Nested("OrderDetailSchema", many=True)
+# Fields the order history endpoint returns, looked up once at import time. Serializing through these tuples touches only eagerly loaded attributes, unlike SerializerMixin.to_dict() which walks every relationship and lazy loads as it goes.
+ORDER_HISTORY_FIELDS = ("id", "user_id", "created_at")
+ORDER_HISTORY_DETAIL_FIELDS = ("id", "product_id", "quantity")
+ORDER_HISTORY_PRODUCT_FIELDS = ("name", "price", "image_url")
+ORDER_HISTORY_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_order_history_values = attrgetter(*ORDER_HISTORY_FIELDS)
+_order_history_detail_values = attrgetter(*ORDER_HISTORY_DETAIL_FIELDS)
+_order_history_product_values = attrgetter(*ORDER_HISTORY_PRODUCT_FIELDS)
+_order_history_product_keys = tuple(
+    f"product_{field}" for field in ORDER_HISTORY_PRODUCT_FIELDS
+)
+
+
+def serialize_order_history(order):
+    data = dict(zip(ORDER_HISTORY_FIELDS, _order_history_values(order)))
+    if data["created_at"] is not None:
+        data["created_at"] = data["created_at"].strftime(ORDER_HISTORY_DATETIME_FORMAT)
+
+    details = []
+    for detail in order.order_details:
+        item = dict(
+            zip(ORDER_HISTORY_DETAIL_FIELDS, _order_history_detail_values(detail))
+        )
+        if detail.product is not None:
+            item.update(
+                zip(
+                    _order_history_product_keys,
+                    _order_history_product_values(detail.product),
+                )
+            )
+        details.append(item)
+    data["order_details"] = details
+    return data
+
+
+class OrderHistory(Resource):
+    # Loads orders, their details and the detail products in two queries no
+    # matter how many orders there are: one for the orders and one selectin
+    # query for the details with their products joined in. A user's own
+    # history needs that user's bearer token.
+    def get(self, user_id=None):
+        try:
+            query = Order.query.options(
+                selectinload(Order.order_details).joinedload(OrderDetail.product)
+            )
+            if user_id is not None:
+                if require_user_id() != user_id:
+                    return make_response(
+                        {"error": "Order history is only visible to its owner"}, 403
+                    )
+                if db.session.get(User, user_id) is None:
+                    return make_response({"error": "User not found"}, 404)
+                query = query.filter(Order.user_id == user_id)
+
+            orders = query.order_by(Order.id).all()
+            return make_response(
+                [serialize_order_history(order) for order in orders], 200
+            )
+        except AuthError as error:
+            return make_response({"error": str(error)}, 401)
+        except Exception as error:
+            return make_response({"error": str(error)}, 500)
 
-    class Meta:
-        model = Order
-        include_fk = True
+
+class UserOrders(Resource):
+    # One page of a user's orders, newest first, with their totals, for the
+    # user's own bearer token only. Pass the next_cursor of a page as ?after=
+    # to get the one after it.
+    def get(self, user_id):
+        try:
+            if require_user_id() != user_id:
+                return make_response(
+                    {"error": "Orders are only visible to their owner"}, 403
+                )
+            if db.session.get(User, user_id) is None:
+                return make_response({"error": "User not found"}, 404)
+            return make_response(paginate_user_orders(user_id, request.args), 200)
+        except AuthError as error:
+            return make_response({"error": str(error)}, 401)
+        except ValueError as error:
+            return make_response({"error": str(error)}, 400)
+        except Exception as error:
+            return make_response({"error": str(error)}, 500)
 
 
 class OrderDetails(Resource):
     # TESTED ✅
     def get(self):
         try:
+            if fast_serializers_enabled():
+                return make_response(order_detail_serializer.all(db.session), 200)
             order_details = OrderDetail.query.all()
             return make_response([detail.to_dict() for detail in order_details], 200)
         except Exception as error:
             return make_response({"error": str(error)}, 500)
 
 
+class OrdersExport(Resource):
+    # Streams orders placed in [since, until) as NDJSON (default) or CSV.
+    def get(self):
+        try:
+            since, until = parse_export_range(request.args)
+            return export_response(
+                order_export_query(since, until),
+                request.args.get("format", "ndjson"),
+                "orders",
+            )
+        except ValueError as error:
+            return make_response({"error": str(error)}, 400)
+
+
+class OrderDetailsExport(Resource):
+    # Streams the details of orders placed in [since, until), with each order's user and time.
+    def get(self):
+        try:
+            since, until = parse_export_range(request.args)
+            return export_response(
+                order_detail_export_query(since, until),
+                request.args.get("format", "ndjson"),
+                "order_details",
+            )
+        except ValueError as error:
+            return make_response({"error": str(error)}, 400)
+
+
 class Categories(Resource):
     # TESTED ✅
     def get(self):
-        Categories = Category.query.all()
-        return make_response([category.to_dict() for category in Categories], 200)
+        def load():
+            if fast_serializers_enabled():
+                return EncodedPayload(category_serializer.all(db.session))
+            return EncodedPayload(
+                [category.to_dict() for category in Category.query.all()]
+            )
+
+        categories = catalog_cache.get_or_load(("categories",), load)
+        return payload_response(categories)
 
     # TESTED ✅
     def post(self):
-        category_data = request.get_json()
-        name = category_data.get("name")
-
         try:
+            name = load_payload(category_schema, request.get_json(silent=True))["name"]
             validate_not_blank(name, "name")
             new_category = Category(name=name)
             db.session.add(new_category)
             db.session.commit()
             return make_response({"message": "Category created successfully"}, 201)
+        except ValidationError as error:
+            return validation_error_response(error)
         except ValueError as e:
             return make_response({"error": str(e)}, 400)
         except Exception as e:
@@ -306,9 +721,21 @@ class Categories(Resource):
             return make_response({"error": "Failed to create category: " + str(e)}, 500)
 
 
+class CategoryProducts(Resource):
+    def get(self, id):
+        try:
+            return category_products_response(id, request.args)
+        except ValueError as error:
+            return make_response({"error": str(error)}, 400)
+        except Exception as error:
+            return make_response({"error": str(error)}, 500)
+
+
 class ProductCategories(Resource):
     # TESTED ✅
     def get(self):
+        if fast_serializers_enabled():
+            return make_response(product_category_serializer.all(db.session), 200)
         product_categories = ProductCategory.query.all()
         return make_response(
             [product_category.to_dict() for product_category in product_categories], 200
@@ -316,13 +743,10 @@ class ProductCategories(Resource):
 
     # TESTED ✅
     def post(self):
-        data = request.get_json()
-        product_id = data.get("product_id")
-        category_id = data.get("category_id")
-
         try:
-            validate_type(product_id, "product_id", int)
-            validate_type(category_id, "category_id", int)
+            data = load_payload(product_category_schema, request.get_json(silent=True))
+            product_id = data["product_id"]
+            category_id = data["category_id"]
 
             new_product_category = ProductCategory(
                 product_id=product_id, category_id=category_id
@@ -332,8 +756,15 @@ class ProductCategories(Resource):
             return make_response(
                 {"message": "ProductCategory created successfully"}, 201
             )
+        except ValidationError as error:
+            return validation_error_response(error)
         except ValueError as e:
             return make_response({"error": str(e)}, 400)
+        except IntegrityError:
+            db.session.rollback()
+            return make_response(
+                {"error": "The product is already in this category."}, 409
+            )
         except Exception as e:
             db.session.rollback()
             return make_response(
@@ -341,19 +772,9 @@ class ProductCategories(Resource):
             )
 
 
-# OrderDetail Schema
-class OrderDetailSchema(Schema):
-    id = fields.Int(dump_only=True)
-    order_id = fields.Int(load_only=True, validate=validate.Range(min=1))
-    product_id = fields.Int(required=True, validate=validate.Range(min=1))
-    quantity = fields.Int(required=True, validate=validate.Range(min=1))
-
-    class Meta:
-        model = OrderDetail
-        include_fk = True
-
-    def __repr__(self):
-        return f"<OrderDetail Order: {self.order_id}, Product: {self.product_id}>"
+# This function answers a payload that failed schema validation (see schemas.py). The errors map each offending field to what is wrong with it, so clients can show them next to their form fields.
+def validation_error_response(error):
+    return make_response({"error": "Invalid payload", "errors": error.messages}, 400)
 
 
 # This utility function attempts to commit changes to the database but if an error occurs it will roll back the session to avoid leaving the database in an inconsistent state. Then it re-raises the exception to be handled by the caller.
@@ -365,6 +786,227 @@ def commit_session(session):
         raise exc
 
 
+# Columns the paginated product listing can be sorted on. Every sort is tie-broken on the primary key so the (value, id) pair of the last row is a stable keyset cursor.
+PRODUCT_SORT_COLUMNS = {"id": Product.id, "price": Product.price, "name": Product.name}
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+# This function returns one page of products using keyset pagination. Instead of OFFSET, which makes the database walk every skipped row, it filters on the (sort value, id) of the last row the client saw, so each page is a single bounded index range scan no matter how deep into the catalog the client is.
+def paginate_products(args):
+    limit = parse_limit(args.get("limit"), DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+    sort = args.get("sort", "id")
+    descending = sort.startswith("-")
+    sort_key = sort[1:] if descending else sort
+    if sort_key not in PRODUCT_SORT_COLUMNS:
+        raise ValueError(
+            f"The sort must be one of {', '.join(PRODUCT_SORT_COLUMNS)} optionally prefixed with '-'."
+        )
+    column = PRODUCT_SORT_COLUMNS[sort_key]
+
+    query = Product.query
+    if args.get("after"):
+        last_value, last_id = decode_cursor(args["after"], sort)
+        if sort_key == "id":
+            position, boundary = Product.id, last_id
+        else:
+            position, boundary = tuple_(column, Product.id), (last_value, last_id)
+        query = query.filter(position < boundary if descending else position > boundary)
+
+    if sort_key == "id":
+        ordering = (Product.id.desc(),) if descending else (Product.id,)
+    elif descending:
+        ordering = (column.desc(), Product.id.desc())
+    else:
+        ordering = (column, Product.id)
+
+    # One extra row tells us whether another page exists without a COUNT query.
+    rows = query.order_by(*ordering).limit(limit + 1).all()
+    page = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        last = page[-1]
+        next_cursor = encode_cursor(sort, getattr(last, sort_key), last.id)
+
+    return {
+        "products": [
+            product.to_dict(convert_price_to_dollars=True) for product in page
+        ],
+        "next_cursor": next_cursor,
+        "limit": limit,
+    }
+
+
+# This function answers a write that lost a race against another write to the same product. The client gets the current state and version so it can re-apply its change.
+def stale_product_response(product):
+    return make_response(
+        {
+            "error": "The product was changed by someone else. Reload it and try again.",
+            "product": product.to_dict() if product else None,
+        },
+        409,
+    )
+
+
+# This function sets a new password and revokes every session the user had open, since those were opened with the old password. The caller gets a fresh token so the current session carries on.
+def update_password(user, new_password):
+    user.password = new_password
+    commit_session(db.session)
+    revocations.revoke_user(user.id)
+    return make_response(
+        {"message": "Password updated successfully", "token": issue_token(user.id)},
+        200,
+    )
+
+
+# This function returns product dicts (prices in dollars) for the given ids, in the same order, skipping ids that don't exist. Products already in the catalog cache cost nothing; the rest are fetched with one IN query and cached for the next caller.
+def load_product_dicts(ids):
+    cached = catalog_cache.get_many([("product", id) for id in ids])
+    missing = [id for id in ids if ("product", id) not in cached]
+    if missing:
+        version = catalog_cache.version
+        found = {
+            product.id: product
+            for product in Product.query.filter(Product.id.in_(missing))
+        }
+        for id in missing:
+            product = found.get(id)
+            payload = (
+                EncodedPayload(product.to_dict(convert_price_to_dollars=True))
+                if product
+                else None
+            )
+            catalog_cache.set(("product", id), payload, version=version)
+            cached[("product", id)] = payload
+    return [
+        cached[("product", id)].data
+        for id in ids
+        if cached[("product", id)] is not None
+    ]
+
+
+# This function answers GET /products?ids=3,1,2, which carts and checkout use to refresh the prices and stock of all their items in one round trip. Products come back in the order asked for, through load_product_dicts, so ids already in the catalog cache cost nothing and the rest one IN query; ids that don't exist are listed under "missing".
+def product_batch_response(raw_ids):
+    ids = parse_id_list(raw_ids, "ids", MAX_PAGE_SIZE)
+    products = load_product_dicts(ids)
+    found = {product["id"] for product in products}
+    return payload_response(
+        EncodedPayload(
+            {
+                "products": products,
+                "missing": [id for id in ids if id not in found],
+            }
+        )
+    )
+
+
+# This function returns one page of a category's products. The product ids come from the in-memory category index and the products themselves from the catalog cache, so a warm category page runs no queries at all. Returns None if the category doesn't exist.
+def paginate_category_products(category_id, args):
+    limit = parse_limit(args.get("limit"), DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+    ids = category_index.product_ids(category_id)
+    if ids is None:
+        return None
+
+    start = 0
+    if args.get("after"):
+        _, last_id = decode_cursor(args["after"], "id")
+        start = bisect_right(ids, last_id)
+    page_ids = ids[start : start + limit]
+    next_cursor = None
+    if start + limit < len(ids):
+        next_cursor = encode_cursor("id", page_ids[-1], page_ids[-1])
+
+    return {
+        "products": load_product_dicts(page_ids),
+        "next_cursor": next_cursor,
+        "limit": limit,
+    }
+
+
+def category_products_response(category_id, args):
+    key = ("category_products", category_id, args.get("after"), args.get("limit"))
+
+    def load():
+        page = paginate_category_products(category_id, args)
+        return EncodedPayload(page) if page is not None else None
+
+    page = catalog_cache.get_or_load(key, load, tags=payload_product_tags)
+    if page is None:
+        return make_response({"error": "Category not found"}, 404)
+    return payload_response(page)
+
+
+# This function returns the expression a user's orders are paged on. SQLite stores created_at as text, written with microseconds by some code paths and without by others, and a bound datetime always renders with them, so comparing against the raw stored text is the only way a cursor lands exactly on the row it came from. It is still the indexed column, so the page stays an index range scan.
+def order_time_key(session):
+    if session.get_bind().dialect.name == "sqlite":
+        return type_coerce(Order.created_at, String), str
+    return Order.created_at, datetime.fromisoformat
+
+
+# This function returns one page of a user's orders with their totals. The page is picked first, by keyset on (created_at, id) over ix_orders_user_id_created_at, which covers it without touching the table; only the orders on the page are then joined to their details and products, and SQL sums the line totals (quantity times current price, in cents) per order.
+def paginate_user_orders(user_id, args):
+    limit = parse_limit(args.get("limit"), DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+    time_key, parse_time = order_time_key(db.session)
+    page = select(Order.id, Order.created_at, time_key.label("time_key")).where(
+        Order.user_id == user_id
+    )
+    if args.get("after"):
+        last_time, last_id = decode_cursor(args["after"], "-created_at")
+        if not isinstance(last_time, str):
+            raise ValueError("The cursor is invalid.")
+        page = page.where(tuple_(time_key, Order.id) < (parse_time(last_time), last_id))
+    # One extra row tells us whether another page exists without a COUNT query.
+    page = (
+        page.order_by(Order.created_at.desc(), Order.id.desc())
+        .limit(limit + 1)
+        .subquery()
+    )
+
+    rows = db.session.execute(
+        select(
+            page.c.id,
+            page.c.created_at,
+            page.c.time_key,
+            func.count(OrderDetail.id).label("items"),
+            func.coalesce(func.sum(OrderDetail.quantity), 0).label("units"),
+            func.coalesce(func.sum(OrderDetail.quantity * Product.price), 0).label(
+                "total"
+            ),
+        )
+        .select_from(page)
+        .outerjoin(OrderDetail, OrderDetail.order_id == page.c.id)
+        .outerjoin(Product, Product.id == OrderDetail.product_id)
+        .group_by(page.c.id, page.c.created_at, page.c.time_key)
+        .order_by(page.c.created_at.desc(), page.c.id.desc())
+    ).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor("-created_at", str(last.time_key), last.id)
+
+    return {
+        "orders": [
+            {
+                "id": row.id,
+                "created_at": (
+                    row.created_at.strftime(ORDER_HISTORY_DATETIME_FORMAT)
+                    if row.created_at is not None
+                    else None
+                ),
+                "items": row.items,
+                "units": row.units,
+                "total_cents": row.total,
+                "total": row.total / 100,
+            }
+            for row in rows
+        ],
+        "next_cursor": next_cursor,
+        "limit": limit,
+    }
+
+
 # This function is used to create a category if it does not exist. It first tries to find the category by name. If it's not found, it creates a new one, commits the session
 def get_or_create_category(category_name):
     category = (
@@ -380,10 +1022,10 @@ def get_or_create_category(category_name):
 class Login(Resource):
     # TESTED ✅
     def post(self):
-        data = request.get_json()
-
-        if not all(key in data for key in ("username", "password")):
-            return make_response({"error": "Username and password are required"}, 400)
+        try:
+            data = load_payload(credentials_schema, request.get_json(silent=True))
+        except ValidationError as error:
+            return validation_error_response(error)
 
         username = data["username"]
         password = data["password"]
@@ -391,21 +1033,122 @@ class Login(Resource):
         user = User.query.filter_by(username=username).first()
 
         if user and user.authenticate(password):
+            # The password is known to be right here, so this is the one moment a
+            # hash made with an outdated cost can be replaced transparently.
+            if user.password_needs_rehash():
+                try:
+                    user.password = password
+                    commit_session(db.session)
+                except Exception:
+                    db.session.rollback()
             return make_response(
-                {"message": "Login successful", "user_id": user.id}, 200
+                {
+                    "message": "Login successful",
+                    "user_id": user.id,
+                    "token": issue_token(user.id),
+                    "expires_in": app.config["AUTH_TOKEN_TTL"],
+                },
+                200,
             )
         else:
             return make_response({"error": "Invalid credentials"}, 401)
 
 
+class Logout(Resource):
+    def post(self):
+        try:
+            revoke_current_token()
+            return make_response({"message": "Logout successful"}, 200)
+        except AuthError as error:
+            return make_response({"error": str(error)}, 401)
+
+
+class CatalogCacheStats(Resource):
+    def get(self):
+        return make_response(catalog_cache.stats(), 200)
+
+
+class SalesReport(Resource):
+    # Orders, units and revenue per day, product or category between two days
+    # (the last 30 by default), read from the rollups checkout maintains.
+    def get(self):
+        try:
+            group = request.args.get("group", "day")
+            start, end = parse_report_range(request.args)
+            limit = parse_limit(
+                request.args.get("limit"), MAX_REPORT_ROWS, MAX_REPORT_ROWS
+            )
+            rows = sales_report(db.session, group, start, end, limit)
+            return make_response(
+                {
+                    "group": group,
+                    "start": start.isoformat(),
+                    "end": end.isoformat(),
+                    "rows": rows,
+                },
+                200,
+            )
+        except ValueError as error:
+            return make_response({"error": str(error)}, 400)
+        except Exception as error:
+            return make_response({"error": str(error)}, 500)
+
+
+class Metrics(Resource):
+    # Prometheus scrape endpoint, only registered when REQUEST_METRICS is on.
+    def get(self):
+        stats = catalog_cache.stats()
+        cache_metrics = [
+            (
+                f"montluxe_catalog_cache_{name}_total",
+                "counter",
+                f"Catalog cache {name}.",
+                stats[name],
+            )
+            for name in ("hits", "misses", "evictions", "expirations", "invalidations")
+        ]
+        cache_metrics.append(
+            (
+                "montluxe_catalog_cache_entries",
+                "gauge",
+                "Payloads in the catalog cache.",
+                stats["size"],
+            )
+        )
+        return Response(
+            metrics_registry.render(cache_metrics),
+            mimetype="text/plain; version=0.0.4",
+        )
+
+
 api.add_resource(Products, "/products")
 api.add_resource(Users, "/users")
 api.add_resource(Orders, "/orders")
+api.add_resource(OrdersBatch, "/orders/batch")
 api.add_resource(OrderDetails, "/order_details")
+api.add_resource(OrdersExport, "/orders/export")
+api.add_resource(OrderDetailsExport, "/order_details/export")
+api.add_resource(OrderHistory, "/order_history", "/users/<int:user_id>/order_history")
+api.add_resource(UserOrders, "/users/<int:user_id>/orders")
+api.add_resource(Reservations, "/reservations")
+api.add_resource(ReservationByID, "/reservations/<int:id>")
 api.add_resource(ProductByID, "/products/<int:id>")
+api.add_resource(ProductSearch, "/products/search")
 api.add_resource(Login, "/login")
+api.add_resource(Logout, "/logout")
 api.add_resource(Categories, "/categories")
+api.add_resource(CategoryProducts, "/categories/<int:id>/products")
 api.add_resource(ProductCategories, "/product_categories")
+api.add_resource(CatalogCacheStats, "/catalog_cache")
+api.add_resource(SalesReport, "/reports/sales")
+
+if app.config["REQUEST_METRICS"]:
+    install_instrumentation(app)
+    api.add_resource(Metrics, "/metrics")
+
+# After the instrumentation hooks, so rejected requests are still measured.
+if app.config["RATE_LIMIT"]:
+    install_rate_limits(app, rate_limiter)
 
 if __name__ == "__main__":
     app.run(port=5555, debug=True)
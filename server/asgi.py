@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# asgi.py
+# Production entry point: serves the Flask app under an ASGI server.
+#   uvicorn asgi:application --host 0.0.0.0 --port 5555 --workers 4
+#   python asgi.py   (same thing, configured from HOST, PORT and WEB_CONCURRENCY)
+# The event loop owns the sockets, so thousands of idle or slow clients cost a
+# few kilobytes each instead of a thread each. Requests are handed to the
+# unchanged WSGI app on a bounded thread pool (ASGI_THREADS per worker process)
+# where blocking database work runs; bcrypt runs on its own pool in
+# passwords.py. When more than ASGI_MAX_PENDING requests are waiting for a
+# thread, new ones are turned away with 503 instead of queueing without bound.
+
+import asyncio
+import io
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+from app import app
+
+# Response bodies are pulled from the WSGI iterator this many bytes at a time,
+# so a streamed response doesn't cost a thread hop per small chunk.
+RESPONSE_BUFFER_SIZE = 64 * 1024
+
+
+class WSGIBridge:
+    """
+    Adapts a WSGI app to ASGI, running each request on a bounded thread pool.
+
+    Unlike asgiref's WsgiToAsgi, which runs every request through one
+    sync-to-async thread by default, requests here run concurrently on up to
+    max_threads threads.
+    """
+
+    def __init__(self, wsgi_app, max_threads, max_pending, max_body_size):
+        self.wsgi_app = wsgi_app
+        self.max_threads = max_threads
+        self.max_pending = max_pending
+        self.max_body_size = max_body_size
+        self.pending = 0
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_threads, thread_name_prefix="asgi-worker"
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            await self._http(scope, receive, send)
+        elif scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self._executor.shutdown(wait=True)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _http(self, scope, receive, send):
+        # The pending count is only touched on the event loop thread.
+        if self.pending >= self.max_pending:
+            await self._error(
+                send, HTTPStatus.SERVICE_UNAVAILABLE, [(b"retry-after", b"1")]
+            )
+            return
+        self.pending += 1
+        try:
+            body = await self._read_body(receive)
+            if body is None:
+                await self._error(send, HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+                return
+            loop = asyncio.get_running_loop()
+            status, headers, result, iterator, chunk, more = await loop.run_in_executor(
+                self._executor, self._start, self._environ(scope, body)
+            )
+            try:
+                await send(
+                    {
+                        "type": "http.response.start",
+                        "status": status,
+                        "headers": headers,
+                    }
+                )
+                await send(
+                    {"type": "http.response.body", "body": chunk, "more_body": more}
+                )
+                while more:
+                    chunk, more = await loop.run_in_executor(
+                        self._executor, self._read, iterator
+                    )
+                    await send(
+                        {"type": "http.response.body", "body": chunk, "more_body": more}
+                    )
+            finally:
+                if hasattr(result, "close"):
+                    await loop.run_in_executor(self._executor, result.close)
+        finally:
+            self.pending -= 1
+
+    async def _read_body(self, receive):
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                break
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > self.max_body_size:
+                return None
+            chunks.append(chunk)
+            if not message.get("more_body", False):
+                break
+        return b"".join(chunks)
+
+    async def _error(self, send, status, headers=()):
+        body = f'{{"error": "{status.phrase}"}}'.encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status.value,
+                "headers": [(b"content-type", b"application/json"), *headers],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+    def _environ(self, scope, body):
+        server = scope.get("server") or ("localhost", 80)
+        client = scope.get("client") or ("", 0)
+        environ = {
+            "REQUEST_METHOD": scope["method"],
+            "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+            "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+            "QUERY_STRING": scope["query_string"].decode("latin-1"),
+            "SERVER_NAME": server[0],
+            "SERVER_PORT": str(server[1]),
+            "SERVER_PROTOCOL": f"HTTP/{scope['http_version']}",
+            "REMOTE_ADDR": client[0],
+            "REMOTE_PORT": str(client[1]),
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.input": io.BytesIO(body),
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": True,
+            "wsgi.run_once": False,
+        }
+        for name, value in scope["headers"]:
+            name = name.decode("latin-1").upper().replace("-", "_")
+            value = value.decode("latin-1")
+            if name not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+                name = f"HTTP_{name}"
+            environ[name] = f"{environ[name]},{value}" if name in environ else value
+        return environ
+
+    # The methods below run on the thread pool.
+
+    def _start(self, environ):
+        response = {}
+
+        # Nothing is sent until the app returns, so an error page started with
+        # exc_info may always replace the headers given earlier.
+        def start_response(status, headers, exc_info=None):
+            response["status"] = int(status.split(" ", 1)[0])
+            response["headers"] = [
+                (name.lower().encode("latin-1"), value.encode("latin-1"))
+                for name, value in headers
+            ]
+            return lambda data: None  # The legacy write() callable isn't supported.
+
+        result = self.wsgi_app(environ, start_response)
+        iterator = iter(result)
+        # start_response may be called lazily, on the first iteration.
+        chunk, more = self._read(iterator)
+        return response["status"], response["headers"], result, iterator, chunk, more
+
+    def _read(self, iterator):
+        """Returns the next buffered part of the body and whether more may follow."""
+        chunks = []
+        size = 0
+        for chunk in iterator:
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= RESPONSE_BUFFER_SIZE:
+                return b"".join(chunks), True
+        return b"".join(chunks), False
+
+
+application = WSGIBridge(
+    app,
+    max_threads=app.config["ASGI_THREADS"],
+    max_pending=app.config["ASGI_MAX_PENDING"],
+    max_body_size=app.config["ASGI_MAX_BODY_SIZE"],
+)
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(
+        "asgi:application",
+        host=os.environ.get("HOST", "127.0.0.1"),
+        port=int(os.environ.get("PORT", 5555)),
+        workers=int(os.environ.get("WEB_CONCURRENCY", 1)),
+        log_level="warning",
+    )
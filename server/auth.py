@@ -0,0 +1,159 @@
+# auth.py
+# Signed session tokens.
+# Login pays for one bcrypt verification and hands out an HMAC-signed token
+# (itsdangerous, keyed with app.secret_key) that carries the user id and expires
+# after AUTH_TOKEN_TTL seconds. Later requests send it as "Authorization: Bearer
+# <token>" and are authenticated by checking the signature, which takes
+# microseconds instead of a full bcrypt run.
+
+import secrets
+import threading
+import time
+
+from config import app
+from flask import request
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+
+TOKEN_SALT = "montluxe-session-token"
+
+
+class AuthError(Exception):
+    """Raised when a bearer token is malformed, expired or revoked."""
+
+
+class RevocationCache:
+    """
+    Tokens revoked before they expire, kept in memory.
+
+    Single tokens are revoked by id (logout), and all tokens a user holds are
+    revoked by recording a cutoff time (password change, account deletion).
+    Entries are dropped once the tokens they cover would have expired anyway,
+    so the cache stays small. It is per process, like the catalog cache.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._tokens = {}
+        self._user_cutoffs = {}
+        self._lock = threading.Lock()
+
+    def revoke_token(self, token_id, issued_at):
+        with self._lock:
+            self._purge()
+            self._tokens[token_id] = issued_at + self.ttl
+
+    def revoke_user(self, user_id):
+        with self._lock:
+            self._purge()
+            self._user_cutoffs[user_id] = time.time()
+
+    def is_revoked(self, token_id, user_id, issued_at):
+        with self._lock:
+            if token_id in self._tokens:
+                return True
+            cutoff = self._user_cutoffs.get(user_id)
+            return cutoff is not None and issued_at <= cutoff
+
+    def _purge(self):
+        now = time.time()
+        self._tokens = {
+            token_id: expires_at
+            for token_id, expires_at in self._tokens.items()
+            if expires_at > now
+        }
+        self._user_cutoffs = {
+            user_id: cutoff
+            for user_id, cutoff in self._user_cutoffs.items()
+            if cutoff + self.ttl > now
+        }
+
+
+revocations = RevocationCache(ttl=app.config["AUTH_TOKEN_TTL"])
+
+
+def _serializer():
+    return URLSafeTimedSerializer(app.secret_key, salt=TOKEN_SALT)
+
+
+def issue_token(user_id):
+    """
+    Issues a signed session token for a user.
+
+    Args:
+    user_id (int): The authenticated user's id.
+
+    Returns:
+    str: The token.
+    """
+    return _serializer().dumps(
+        {"uid": user_id, "jti": secrets.token_urlsafe(12), "iat": time.time()}
+    )
+
+
+def _load_token(token):
+    try:
+        claims = _serializer().loads(token, max_age=app.config["AUTH_TOKEN_TTL"])
+        return claims["uid"], claims["jti"], claims["iat"]
+    except SignatureExpired:
+        raise AuthError("Session has expired.")
+    except (BadSignature, KeyError, TypeError):
+        raise AuthError("Invalid session token.")
+
+
+def bearer_token():
+    header = request.headers.get("Authorization", "")
+    scheme, _, token = header.partition(" ")
+    if scheme.lower() != "bearer" or not token.strip():
+        return None
+    return token.strip()
+
+
+def token_user_id():
+    """
+    Authenticates the current request from its bearer token, if it sent one.
+
+    Returns:
+    int or None: The user id, or None when no bearer token was sent.
+
+    Raises:
+    AuthError: If a token was sent but is invalid, expired or revoked.
+    """
+    token = bearer_token()
+    if token is None:
+        return None
+    user_id, token_id, issued_at = _load_token(token)
+    if revocations.is_revoked(token_id, user_id, issued_at):
+        raise AuthError("Session has been revoked.")
+    return user_id
+
+
+def require_user_id():
+    """
+    Authenticates the current request from its bearer token, which it must send.
+
+    Returns:
+    int: The user id.
+
+    Raises:
+    AuthError: If no token was sent or it is invalid, expired or revoked.
+    """
+    user_id = token_user_id()
+    if user_id is None:
+        raise AuthError("A bearer token is required.")
+    return user_id
+
+
+def revoke_current_token():
+    """
+    Revokes the bearer token of the current request.
+
+    Raises:
+    AuthError: If no valid token was sent.
+    """
+    token = bearer_token()
+    if token is None:
+        raise AuthError("A bearer token is required.")
+    user_id, token_id, issued_at = _load_token(token)
+    if revocations.is_revoked(token_id, user_id, issued_at):
+        raise AuthError("Session has been revoked.")
+    revocations.revoke_token(token_id, issued_at)
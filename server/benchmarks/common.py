@@ -0,0 +1,70 @@
+# benchmarks/common.py
+# Shared setup for the benchmark scripts. Run them from the server directory:
+#   python -m benchmarks.<script>
+# Each script points the app at its own scratch SQLite database, so the
+# development database is never touched.
+
+import os
+import secrets
+import tempfile
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+
+def load_app(db_path=None):
+    """
+    Imports the Flask app against a scratch database and creates its tables.
+
+    Must be called before anything imports config, since the database URI is
+    read from DB_URI when config is first imported. Rate limits are switched
+    off unless RATE_LIMIT is already set, and SECRET_KEY gets a random value
+    unless it is already set.
+
+    Args:
+    db_path (str): Path of the SQLite file to use. A temporary one is created if omitted.
+
+    Returns:
+    tuple: The (app, db) pair.
+    """
+    if db_path is None:
+        db_path = os.path.join(tempfile.mkdtemp(prefix="montluxe-bench-"), "bench.db")
+    os.environ["DB_URI"] = f"sqlite:///{db_path}"
+    # Benchmarks log in and sign up far faster than the rate limits allow.
+    os.environ.setdefault("RATE_LIMIT", "0")
+    # Shared with any server processes a benchmark starts, so they accept its tokens.
+    os.environ.setdefault("SECRET_KEY", secrets.token_hex(32))
+
+    import app as app_module
+    from config import db
+
+    with app_module.app.app_context():
+        db.create_all()
+    return app_module.app, db
+
+
+class QueryCounter:
+    """Counts the SQL statements sent to an engine while active."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def __enter__(self):
+        self.count = 0
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+
+
+@contextmanager
+def timed(results, name):
+    start = time.perf_counter()
+    yield
+    results[name] = time.perf_counter() - start
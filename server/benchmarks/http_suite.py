@@ -0,0 +1,474 @@
+# benchmarks/http_suite.py
+# End-to-end HTTP benchmark for the main API resources.
+#   python -m benchmarks.http_suite --save benchmarks/baseline.json
+#   python -m benchmarks.http_suite --compare benchmarks/baseline.json
+# Seeds a scratch database with seed.py's bulk generators, then drives every
+# scenario twice: through the Flask test client, one request at a time, which
+# isolates handler cost and counts queries per request; and over real HTTP
+# against a pre-forked werkzeug server with several worker processes, which
+# measures throughput under concurrent clients. Reports p50/p95/p99 latency,
+# requests per second and queries per request (read from the Server-Timing
+# header in server mode, so the suite turns on REQUEST_METRICS), along with the
+# time spent validating request payloads (the "val" phase of Server-Timing).
+# --compare exits non-zero if any scenario's p95 or throughput got worse than
+# the tolerance allows.
+
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import platform
+import random
+import re
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import QueryCounter, load_app
+
+BENCH_PASSWORD = "bench-password"
+SERVER_TIMING_QUERIES = re.compile(r'db;[^,]*desc="(\d+) queries"')
+SERVER_TIMING_VALIDATION = re.compile(r"val;dur=([\d.]+)")
+
+
+class Scenario:
+    """
+    One kind of request to measure.
+
+    The request factory is called once per request with a random.Random, so
+    scenarios can vary ids and payloads without sharing state across threads.
+    Weight scales the number of requests for scenarios that are much slower
+    than the rest (GET /orders returns every order).
+    """
+
+    def __init__(self, name, method, request, weight=1.0, expect=(200,)):
+        self.name = name
+        self.method = method
+        self.request = request
+        self.weight = weight
+        self.expect = expect
+
+    def count(self, requests):
+        return max(1, int(requests * self.weight))
+
+
+def build_scenarios(fixture):
+    product_ids = fixture["product_ids"]
+    user_ids = fixture["user_ids"]
+    category_ids = fixture["category_ids"]
+
+    def product(rng):
+        return f"/products/{rng.choice(product_ids)}", None
+
+    def order(rng):
+        return "/orders", {
+            "user_id": rng.choice(user_ids),
+            "order_details": [
+                {"product_id": rng.choice(product_ids), "quantity": 1}
+                for _ in range(rng.randint(1, 3))
+            ],
+        }
+
+    def product_update(rng):
+        return f"/products/{rng.choice(product_ids)}", {
+            "description": f"Updated description {rng.randint(1, 1_000_000)}"
+        }
+
+    def category_page(rng):
+        return f"/products?category={rng.choice(category_ids)}&limit=20", None
+
+    login = {"username": fixture["username"], "password": BENCH_PASSWORD}
+    return [
+        Scenario("GET /products", "GET", lambda rng: ("/products", None)),
+        Scenario(
+            "GET /products?limit", "GET", lambda rng: ("/products?limit=20", None)
+        ),
+        Scenario("GET /products?category", "GET", category_page),
+        Scenario("GET /products/<id>", "GET", product),
+        Scenario("GET /categories", "GET", lambda rng: ("/categories", None)),
+        Scenario("POST /login", "POST", lambda rng: ("/login", login)),
+        Scenario("GET /orders", "GET", lambda rng: ("/orders", None), weight=0.1),
+        Scenario("POST /orders", "POST", order, expect=(201,)),
+        # Concurrent clients updating the same product get 409 from the version check.
+        Scenario("PATCH /products/<id>", "PATCH", product_update, expect=(202, 409)),
+        Scenario(
+            "GET /reports/sales",
+            "GET",
+            lambda rng: (
+                f"/reports/sales?group={rng.choice(('day', 'product', 'category'))}",
+                None,
+            ),
+            weight=0.1,
+        ),
+    ]
+
+
+def seed(app, db, products, users, orders):
+    import seed as seeder
+    from models import Category, Product, ProductCategory, User
+    from reports import rebuild_sales_rollups
+    from sqlalchemy import insert, select, update
+
+    with app.app_context():
+        seeder.create_synthetic_products(products)
+        seeder.generate_users(users, chunk_size=10_000)
+        seeder.generate_orders(orders, max_details=4, days=365, chunk_size=10_000)
+
+        categories = [{"name": f"Bench Category {i}"} for i in range(5)]
+        db.session.execute(insert(Category), categories)
+        category_ids = db.session.execute(select(Category.id)).scalars().all()
+        product_ids = db.session.execute(select(Product.id)).scalars().all()
+        db.session.execute(
+            insert(ProductCategory),
+            [
+                {
+                    "product_id": product_id,
+                    "category_id": category_ids[number % len(category_ids)],
+                }
+                for number, product_id in enumerate(product_ids)
+            ],
+        )
+        # POST /orders must not start failing with 409 halfway through a run.
+        db.session.execute(update(Product).values(item_quantity=10_000_000))
+
+        user = User(
+            username="bench.user",
+            email="bench.user@example.com",
+            last_name="Bench",
+            shipping_address="1 Bench St",
+            shipping_city="Geneva",
+            shipping_state="GE",
+            shipping_zip="1200",
+        )
+        user.password = BENCH_PASSWORD
+        db.session.add(user)
+        rebuild_sales_rollups(db.session)
+        db.session.commit()
+
+        return {
+            "product_ids": product_ids,
+            "user_ids": db.session.execute(select(User.id)).scalars().all(),
+            "category_ids": category_ids,
+            "username": user.username,
+        }
+
+
+def percentile(sorted_values, fraction):
+    # Nearest-rank percentile, which is exact for the small samples used here.
+    index = max(0, min(len(sorted_values) - 1, int(fraction * len(sorted_values))))
+    return sorted_values[index]
+
+
+def validation_ms(server_timing):
+    match = SERVER_TIMING_VALIDATION.search(server_timing or "")
+    return float(match.group(1)) if match else None
+
+
+def summarize(latencies, elapsed, queries=None, validation=None):
+    latencies = sorted(latencies)
+    summary = {
+        "requests": len(latencies),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "rps": round(len(latencies) / elapsed, 1),
+    }
+    if queries is not None:
+        summary["queries_per_request"] = round(sum(queries) / len(queries), 2)
+    if validation:
+        summary["validation_ms"] = round(sum(validation) / len(validation), 3)
+    return summary
+
+
+def run_client(app, db, scenarios, requests, warmup, rng_seed):
+    client = app.test_client()
+    with app.app_context():
+        engine = db.engine
+    results = {}
+    for scenario in scenarios:
+        rng = random.Random(rng_seed)
+        latencies, queries, validation = [], [], []
+        total = scenario.count(requests)
+        for number in range(warmup + total):
+            path, body = scenario.request(rng)
+            with QueryCounter(engine) as counter:
+                start = time.perf_counter()
+                response = client.open(path, method=scenario.method, json=body)
+                latency = time.perf_counter() - start
+            if response.status_code not in scenario.expect:
+                raise RuntimeError(
+                    f"{scenario.name} returned {response.status_code}: {response.get_data(as_text=True)[:200]}"
+                )
+            if number >= warmup:
+                latencies.append(latency)
+                queries.append(counter.count)
+                validation.append(validation_ms(response.headers.get("Server-Timing")))
+        elapsed = sum(latencies)
+        results[scenario.name] = summarize(
+            latencies, elapsed, queries, [ms for ms in validation if ms is not None]
+        )
+        print_row("client", scenario.name, results[scenario.name])
+    return results
+
+
+def serve(app, sock, threads):
+    import logging
+
+    from werkzeug.serving import make_server
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    # Every worker accepts on the same inherited listening socket, like a
+    # pre-forking production server.
+    server = make_server(
+        "127.0.0.1",
+        sock.getsockname()[1],
+        app,
+        threaded=threads > 1,
+        fd=sock.fileno(),
+    )
+    server.serve_forever()
+
+
+def start_server(app, db, workers, threads):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("127.0.0.1", 0))
+    sock.listen(1024)
+    sock.set_inheritable(True)
+
+    # Connections opened by the parent while seeding must not be shared with
+    # the forked workers.
+    with app.app_context():
+        db.engine.dispose()
+
+    context = multiprocessing.get_context("fork")
+    processes = [
+        context.Process(target=serve, args=(app, sock, threads), daemon=True)
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    return sock, processes
+
+
+class HTTPClient(threading.local):
+    """One keep-alive connection per load generator thread."""
+
+    def __init__(self, port):
+        self.port = port
+        self.connection = None
+
+    def request(self, method, path, body):
+        payload = json.dumps(body) if body is not None else None
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(
+                    "127.0.0.1", self.port, timeout=60
+                )
+            try:
+                self.connection.request(method, path, payload, headers)
+                response = self.connection.getresponse()
+                data = response.read()
+                if response.getheader("Connection", "").lower() == "close":
+                    self.connection.close()
+                    self.connection = None
+                return response.status, data, response.getheader("Server-Timing")
+            except (http.client.HTTPException, ConnectionError):
+                self.connection.close()
+                self.connection = None
+                if attempt:
+                    raise
+
+
+def run_server(port, scenarios, requests, warmup, concurrency, rng_seed):
+    client = HTTPClient(port)
+    results = {}
+    for scenario in scenarios:
+        total = scenario.count(requests)
+
+        def one(rng_seed_offset):
+            rng = random.Random(rng_seed + rng_seed_offset)
+            path, body = scenario.request(rng)
+            start = time.perf_counter()
+            status, data, server_timing = client.request(scenario.method, path, body)
+            latency = time.perf_counter() - start
+            if status not in scenario.expect:
+                raise RuntimeError(
+                    f"{scenario.name} returned {status}: {data[:200].decode(errors='replace')}"
+                )
+            match = SERVER_TIMING_QUERIES.search(server_timing or "")
+            return (
+                latency,
+                int(match.group(1)) if match else None,
+                validation_ms(server_timing),
+            )
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(one, range(warmup)))
+            start = time.perf_counter()
+            samples = list(pool.map(one, range(warmup, warmup + total)))
+            elapsed = time.perf_counter() - start
+        latencies = [latency for latency, _, _ in samples]
+        queries = [count for _, count, _ in samples if count is not None]
+        validation = [ms for _, _, ms in samples if ms is not None]
+        results[scenario.name] = summarize(
+            latencies, elapsed, queries or None, validation
+        )
+        print_row("server", scenario.name, results[scenario.name])
+    return results
+
+
+def print_header():
+    print(
+        f"{'mode':<7} {'scenario':<26} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} "
+        f"{'p99 ms':>9} {'req/s':>9} {'queries':>8} {'val ms':>7}"
+    )
+
+
+def print_row(mode, name, summary):
+    queries = summary.get("queries_per_request")
+    validation = summary.get("validation_ms")
+    print(
+        f"{mode:<7} {name:<26} {summary['requests']:>5} {summary['p50_ms']:>9.2f} "
+        f"{summary['p95_ms']:>9.2f} {summary['p99_ms']:>9.2f} {summary['rps']:>9.1f} "
+        f"{'-' if queries is None else queries:>8} "
+        f"{'-' if validation is None else validation:>7}"
+    )
+
+
+def compare(baseline, current, tolerance):
+    """
+    Prints the change of every scenario against a baseline.
+
+    Args:
+    baseline (dict): Results loaded from a previous --save.
+    current (dict): Results of this run.
+    tolerance (float): Allowed relative slowdown, e.g. 0.2 for 20%.
+
+    Returns:
+    list: The "mode scenario: reason" strings of the scenarios that regressed.
+    """
+    regressions = []
+    print(f"\n{'mode':<7} {'scenario':<26} {'p95 change':>11} {'req/s change':>13}")
+    for mode, scenarios in current["results"].items():
+        for name, summary in scenarios.items():
+            before = baseline.get("results", {}).get(mode, {}).get(name)
+            if before is None:
+                print(f"{mode:<7} {name:<26} {'new':>11}")
+                continue
+            p95_change = summary["p95_ms"] / before["p95_ms"] - 1
+            rps_change = summary["rps"] / before["rps"] - 1
+            flag = ""
+            if p95_change > tolerance:
+                regressions.append(f"{mode} {name}: p95 {p95_change:+.0%}")
+                flag = "  <-- slower"
+            elif rps_change < -tolerance:
+                regressions.append(f"{mode} {name}: req/s {rps_change:+.0%}")
+                flag = "  <-- slower"
+            queries = summary.get("queries_per_request")
+            if (
+                queries is not None
+                and before.get("queries_per_request") is not None
+                and queries > before["queries_per_request"]
+            ):
+                regressions.append(
+                    f"{mode} {name}: queries {before['queries_per_request']} -> {queries}"
+                )
+                flag = "  <-- more queries"
+            print(
+                f"{mode:<7} {name:<26} {p95_change:>+11.0%} {rps_change:>+13.0%}{flag}"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP benchmark for the API.")
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--mode", choices=("client", "server", "both"), default="both")
+    parser.add_argument("--only", nargs="+", help="scenario names to run")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="compare with a JSON file from --save")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    os.environ.setdefault("REQUEST_METRICS", "1")
+    app, db = load_app()
+    random.seed(args.seed)
+    fixture = seed(app, db, args.products, args.users, args.orders)
+    scenarios = build_scenarios(fixture)
+    if args.only:
+        scenarios = [scenario for scenario in scenarios if scenario.name in args.only]
+
+    from passwords import password_hasher
+
+    results = {}
+    print_header()
+    if args.mode in ("client", "both"):
+        results["client"] = run_client(
+            app, db, scenarios, args.requests, args.warmup, args.seed
+        )
+    if args.mode in ("server", "both"):
+        sock, processes = start_server(app, db, args.workers, args.threads)
+        try:
+            results["server"] = run_server(
+                sock.getsockname()[1],
+                scenarios,
+                args.requests,
+                args.warmup,
+                args.concurrency,
+                args.seed,
+            )
+        finally:
+            for process in processes:
+                process.terminate()
+            sock.close()
+
+    current = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "bcrypt_rounds": password_hasher.rounds,
+            **{
+                key: getattr(args, key)
+                for key in (
+                    "products",
+                    "users",
+                    "orders",
+                    "requests",
+                    "workers",
+                    "threads",
+                    "concurrency",
+                    "seed",
+                )
+            },
+        },
+        "results": results,
+    }
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(current, file, indent=2)
+        print(f"\nSaved results to {args.save}")
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(json.load(file), current, args.tolerance)
+        if regressions:
+            print("\nRegressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+# benchmarks/inventory_contention.py
+# Many buyers racing for the last units of one watch.
+#   python -m benchmarks.inventory_contention --stock 10 --buyers 200 --threads 32
+# Each buyer tries to take one unit, either straight through POST /orders or
+# by reserving it first with POST /reservations and checking out the cart.
+# Exactly --stock buyers must succeed, everyone else must get a clean 409, and
+# the product must end at zero stock. Exits non-zero if any of that fails.
+
+import argparse
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import load_app
+
+
+def create_product(db, stock):
+    from models import Product
+
+    product = Product(
+        name="Limited Edition",
+        description="Only a few were made.",
+        price=1000,
+        item_quantity=stock,
+        image_url="/img/bench.png",
+        imageAlt="Limited edition watch",
+    )
+    db.session.add(product)
+    db.session.commit()
+    return product.id
+
+
+def create_buyers(db, buyers):
+    from models import User
+
+    users = [
+        User(
+            username=f"buyer{number}",
+            email=f"buyer{number}@example.com",
+            last_name="Buyer",
+            _password_hash="unused",
+            shipping_address="1 Bench St",
+            shipping_city="Geneva",
+            shipping_state="GE",
+            shipping_zip="1200",
+        )
+        for number in range(buyers)
+    ]
+    db.session.add_all(users)
+    db.session.commit()
+    return [user.id for user in users]
+
+
+def buy_directly(client, product_id, user_id):
+    response = client.post(
+        "/orders",
+        json={
+            "user_id": user_id,
+            "order_details": [{"product_id": product_id, "quantity": 1}],
+        },
+    )
+    return response.status_code
+
+
+def buy_with_reservation(client, product_id, user_id):
+    response = client.post("/reservations", json={"product_id": product_id})
+    if response.status_code != 201:
+        return response.status_code
+    response = client.post(
+        "/orders",
+        json={
+            "user_id": user_id,
+            "cart": response.get_json()["cart"],
+            "order_details": [{"product_id": product_id, "quantity": 1}],
+        },
+    )
+    return response.status_code
+
+
+def run(app, db, mode, stock, user_ids, threads):
+    from models import OrderDetail, Product
+
+    with app.app_context():
+        product_id = create_product(db, stock)
+    buy = buy_with_reservation if mode == "reservation" else buy_directly
+
+    def attempt(user_id):
+        return buy(app.test_client(), product_id, user_id)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        statuses = Counter(pool.map(attempt, user_ids))
+    elapsed = time.perf_counter() - start
+
+    with app.app_context():
+        remaining = db.session.get(Product, product_id).item_quantity
+        sold = (
+            db.session.query(db.func.sum(OrderDetail.quantity))
+            .filter(OrderDetail.product_id == product_id)
+            .scalar()
+            or 0
+        )
+    problems = []
+    if statuses[201] != stock or sold != stock:
+        problems.append(f"{statuses[201]} orders for {sold} units, expected {stock}")
+    if remaining != 0:
+        problems.append(f"{remaining} units left, expected 0")
+    if set(statuses) - {201, 409}:
+        problems.append(f"unexpected statuses {dict(statuses)}")
+    print(
+        f"{mode:<12} {len(user_ids):>7} {threads:>8} {statuses[201]:>5} {statuses[409]:>5} "
+        f"{remaining:>5} {len(user_ids) / elapsed:>9.1f}  {'; '.join(problems) or 'ok'}"
+    )
+    return not problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inventory contention benchmark.")
+    parser.add_argument("--stock", type=int, default=10)
+    parser.add_argument("--buyers", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=32)
+    args = parser.parse_args()
+
+    app, db = load_app()
+    with app.app_context():
+        user_ids = create_buyers(db, args.buyers)
+    print(
+        f"{'mode':<12} {'buyers':>7} {'threads':>8} {'201':>5} {'409':>5} "
+        f"{'left':>5} {'buyers/s':>9}"
+    )
+    results = [
+        run(app, db, mode, args.stock, user_ids, args.threads)
+        for mode in ("direct", "reservation")
+    ]
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# benchmarks/login_throughput.py
+# Measures POST /login throughput for a range of bcrypt cost factors.
+#   python -m benchmarks.login_throughput --costs 4 8 10 12 --clients 16 --requests 64
+# Every step up in cost doubles the hash time, so this shows how many logins a
+# worker can absorb per second at each setting on the current hardware.
+
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import load_app
+
+
+def create_user(db, username, password):
+    from models import User
+
+    user = User(
+        username=username,
+        email=f"{username}@example.com",
+        last_name="Bench",
+        shipping_address="1 Bench St",
+        shipping_city="Geneva",
+        shipping_state="GE",
+        shipping_zip="1200",
+    )
+    user.password = password
+    db.session.add(user)
+    db.session.commit()
+
+
+def run(app, username, password, clients, requests):
+    def login(_):
+        client = app.test_client()
+        start = time.perf_counter()
+        response = client.post(
+            "/login", json={"username": username, "password": password}
+        )
+        assert response.status_code == 200, response.get_json()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        latencies = list(pool.map(login, range(requests)))
+    elapsed = time.perf_counter() - start
+    return requests / elapsed, statistics.median(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--costs", type=int, nargs="+", default=[4, 8, 10, 12])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=64)
+    args = parser.parse_args()
+
+    app, db = load_app()
+    from passwords import password_hasher
+
+    print(f"hash pool: {password_hasher.max_workers} threads, clients: {args.clients}")
+    print(f"{'cost':>6} {'logins/s':>10} {'p50 ms':>10}")
+    for cost in args.costs:
+        password_hasher.rounds = cost
+        username = f"bench.cost{cost}"
+        with app.app_context():
+            create_user(db, username, "bench-password")
+        throughput, p50 = run(
+            app, username, "bench-password", args.clients, args.requests
+        )
+        print(f"{cost:>6} {throughput:>10.1f} {p50 * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
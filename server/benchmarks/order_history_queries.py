@@ -0,0 +1,89 @@
+# benchmarks/order_history_queries.py
+# Checks that the order history endpoint issues a fixed number of queries as
+# the number of orders grows, and compares it with the legacy GET /orders.
+#   python -m benchmarks.order_history_queries
+# Exits non-zero if the order history query count changes with the data size;
+# tests/test_order_history.py runs the same check under pytest.
+
+import sys
+
+from benchmarks.common import QueryCounter, load_app
+
+ORDER_COUNTS = (1, 10, 100, 500)
+DETAILS_PER_ORDER = 3
+
+
+def seed(db, num_orders):
+    from models import Order, OrderDetail, Product, User
+
+    user = User(
+        username="bench.user",
+        email="bench@example.com",
+        last_name="Bench",
+        shipping_address="1 Bench St",
+        shipping_city="Geneva",
+        shipping_state="GE",
+        shipping_zip="1200",
+    )
+    user._password_hash = "unused"
+    products = [
+        Product(
+            name=f"Bench Watch {i}",
+            description="Benchmark product",
+            price=1000,
+            item_quantity=10,
+            image_url="/img/bench.png",
+            imageAlt="Benchmark watch",
+        )
+        for i in range(DETAILS_PER_ORDER)
+    ]
+    db.session.add(user)
+    db.session.add_all(products)
+    db.session.flush()
+    for _ in range(num_orders):
+        order = Order(user_id=user.id)
+        order.order_details = [
+            OrderDetail(product_id=product.id, quantity=1) for product in products
+        ]
+        db.session.add(order)
+    db.session.commit()
+    return user.id
+
+
+def main():
+    app, db = load_app()
+    from auth import issue_token
+
+    client = app.test_client()
+    history_counts = []
+
+    print(
+        f"{'orders':>8} {'/order_history':>16} {'/users/<id>/...':>16} {'/orders':>10}"
+    )
+    for num_orders in ORDER_COUNTS:
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            user_id = seed(db, num_orders)
+            engine = db.engine
+
+        with app.app_context():
+            headers = {"Authorization": f"Bearer {issue_token(user_id)}"}
+        counts = []
+        for path in ("/order_history", f"/users/{user_id}/order_history", "/orders"):
+            with QueryCounter(engine) as counter:
+                response = client.get(path, headers=headers)
+            assert response.status_code == 200, (path, response.status_code)
+            counts.append(counter.count)
+        history_counts.append(tuple(counts[:2]))
+        print(f"{num_orders:>8} {counts[0]:>16} {counts[1]:>16} {counts[2]:>10}")
+
+    if len(set(history_counts)) != 1:
+        print("FAIL: order history query count grows with the number of orders")
+        return 1
+    print("OK: order history query count is constant")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
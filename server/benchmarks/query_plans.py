@@ -0,0 +1,125 @@
+# benchmarks/query_plans.py
+# Query-plan regression check for the hot queries of the API.
+#   python -m benchmarks.query_plans
+# Builds the schema from the models, runs EXPLAIN QUERY PLAN for each query in
+# hot_queries() and exits non-zero if any of them scans a whole table instead of
+# using an index; tests/test_query_plans.py asserts the same under pytest. Add
+# new hot queries here along with the indexes they need.
+
+import re
+import sys
+
+from benchmarks.common import load_app
+from sqlalchemy import String, func, select, tuple_, type_coerce
+from sqlalchemy.dialects import sqlite
+
+# "SCAN products" is a full table scan; "SCAN products USING INDEX ..." walks
+# an index in order and is fine, as is any "SEARCH". FTS5 lookups show up as
+# "SCAN products_fts VIRTUAL TABLE INDEX ..." and are index lookups too.
+FULL_SCAN = re.compile(
+    r"\bSCAN (\w+)(?! USING (?:COVERING )?INDEX| VIRTUAL TABLE)(?:\s|$)"
+)
+
+
+def hot_queries():
+    from datetime import date, datetime
+
+    from models import (
+        Category,
+        InventoryReservation,
+        Order,
+        OrderDetail,
+        Product,
+        ProductCategory,
+        ProductSalesDaily,
+        SalesDaily,
+    )
+    from search import FTS_SEARCH
+
+    return {
+        "product by name": select(Product).where(Product.name == "Alpine Elegance"),
+        "products page by price": select(Product)
+        .where(tuple_(Product.price, Product.id) > (50000, 10))
+        .order_by(Product.price, Product.id)
+        .limit(21),
+        "products page by name": select(Product)
+        .where(tuple_(Product.name, Product.id) > ("Alpine", 10))
+        .order_by(Product.name, Product.id)
+        .limit(21),
+        "orders of a user": select(Order).where(Order.user_id == 1),
+        "orders page of a user": select(Order.id, Order.created_at)
+        .where(
+            Order.user_id == 1,
+            tuple_(type_coerce(Order.created_at, String), Order.id)
+            < ("2026-01-01 00:00:00", 10),
+        )
+        .order_by(Order.created_at.desc(), Order.id.desc())
+        .limit(21),
+        "details of orders": select(OrderDetail).where(
+            OrderDetail.order_id.in_([1, 2, 3])
+        ),
+        "details of a product": select(OrderDetail).where(OrderDetail.product_id == 1),
+        "categories of a product": select(ProductCategory).where(
+            ProductCategory.product_id == 1
+        ),
+        "products of a category": select(ProductCategory).where(
+            ProductCategory.category_id == 1
+        ),
+        "category by name": select(Category).where(Category.name == "Genesis"),
+        "reservations of a cart": select(InventoryReservation).where(
+            InventoryReservation.cart == "cart",
+            InventoryReservation.expires_at > datetime(2026, 1, 1),
+        ),
+        "expired reservations": select(InventoryReservation).where(
+            InventoryReservation.expires_at <= datetime(2026, 1, 1)
+        ),
+        "sales per day": select(SalesDaily).where(
+            SalesDaily.day.between(date(2026, 1, 1), date(2026, 1, 31))
+        ),
+        "sales per product": select(
+            ProductSalesDaily.product_id,
+            Product.name,
+            func.sum(ProductSalesDaily.units),
+        )
+        .outerjoin(Product, Product.id == ProductSalesDaily.product_id)
+        .where(ProductSalesDaily.day.between(date(2026, 1, 1), date(2026, 1, 31)))
+        .group_by(ProductSalesDaily.product_id, Product.name),
+        "product search": FTS_SEARCH.bindparams(
+            query='"alpine"* "eleg"*', limit=21, offset=0
+        ),
+    }
+
+
+def explain(connection, statement):
+    sql = str(
+        statement.compile(
+            dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True}
+        )
+    )
+    rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").all()
+    return [row[-1] for row in rows]
+
+
+def full_scans(plan):
+    return [step for step in plan if FULL_SCAN.search(step)]
+
+
+def main():
+    app, db = load_app()
+    failures = 0
+    with app.app_context(), db.engine.connect() as connection:
+        for name, statement in hot_queries().items():
+            plan = explain(connection, statement)
+            scans = full_scans(plan)
+            status = "FAIL" if scans else "ok"
+            failures += bool(scans)
+            print(f"{status:<5} {name}: {' | '.join(plan)}")
+
+    if failures:
+        print(f"{failures} hot queries fall back to a full table scan")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+# benchmarks/search.py
+# Product search latency on a synthetic catalog.
+#   python -m benchmarks.search --products 100000
+# Seeds the catalog with seed.create_synthetic_products, then times
+# GET /products/search through the test client with the catalog cache cleared
+# before every request, next to a LIKE scan over the same columns for reference.
+
+import argparse
+import statistics
+import time
+
+from benchmarks.common import load_app
+from sqlalchemy import and_, or_, select
+
+QUERIES = (
+    "alpine",
+    "alp",
+    "urban enforcer",
+    "haute 424",
+    "precision 99999",
+    "tourbillon",
+)
+
+
+def timed_ms(function, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    app, db = load_app()
+    from catalog_cache import catalog_cache
+    from models import Product
+    from seed import create_synthetic_products
+
+    start = time.perf_counter()
+    with app.app_context():
+        create_synthetic_products(args.products)
+    print(f"seeded {args.products} products in {time.perf_counter() - start:.1f}s")
+
+    client = app.test_client()
+
+    def search(query):
+        catalog_cache.clear()
+        response = client.get("/products/search", query_string={"q": query})
+        assert response.status_code == 200, response.get_json()
+        return response.get_json()
+
+    def like_scan(query):
+        columns = (Product.name, Product.description, Product.imageAlt)
+        condition = and_(
+            *(
+                or_(*(column.icontains(term) for column in columns))
+                for term in query.split()
+            )
+        )
+        with app.app_context():
+            db.session.execute(
+                select(Product.id).where(condition).order_by(Product.id).limit(21)
+            ).all()
+
+    print(f"{'query':<24} {'hits':>6} {'search ms':>10} {'LIKE ms':>10}")
+    for query in QUERIES:
+        hits = len(search(query)["products"])
+        search_ms = timed_ms(lambda: search(query), args.repeat)
+        like_ms = timed_ms(lambda: like_scan(query), max(1, args.repeat // 4))
+        print(f"{query:<24} {hits:>6} {search_ms:>10.2f} {like_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# benchmarks/serializers.py
+# SerializerMixin.to_dict() against the Core-row serializers in serializers.py.
+#   python -m benchmarks.serializers --rows 10000
+# Seeds --rows users, orders, categories and product-category links, then times
+# what each list endpoint does to build its payload (query plus serialization,
+# without the HTTP layer) both ways, checking that the two produce the same
+# output. The session is reset before every run so the ORM path can't reuse
+# objects loaded by the previous one.
+
+import argparse
+import statistics
+import time
+
+from benchmarks.common import QueryCounter, load_app
+
+
+def seed(db, rows):
+    import seed as seeder
+    from models import Category, Product, ProductCategory
+    from sqlalchemy import insert, select
+
+    seeder.create_synthetic_products(rows)
+    seeder.generate_users(rows, chunk_size=10_000)
+    seeder.generate_orders(rows, max_details=3, days=365, chunk_size=10_000)
+    db.session.execute(
+        insert(Category), [{"name": f"Bench Category {i}"} for i in range(rows)]
+    )
+    category_ids = db.session.execute(select(Category.id)).scalars().all()
+    product_ids = db.session.execute(select(Product.id)).scalars().all()
+    db.session.execute(
+        insert(ProductCategory),
+        [
+            {"product_id": product_id, "category_id": category_id}
+            for product_id, category_id in zip(product_ids, category_ids)
+        ],
+    )
+    db.session.commit()
+
+
+def cases(db):
+    from models import Category, Order, OrderDetail, ProductCategory, User
+    from serializers import (
+        category_serializer,
+        order_detail_serializer,
+        product_category_serializer,
+        serialize_orders,
+        user_serializer,
+    )
+
+    def legacy(model):
+        return lambda: [row.to_dict() for row in model.query.all()]
+
+    return {
+        "users": (legacy(User), lambda: user_serializer.all(db.session)),
+        "orders": (legacy(Order), lambda: serialize_orders(db.session)),
+        "order details": (
+            legacy(OrderDetail),
+            lambda: order_detail_serializer.all(db.session),
+        ),
+        "categories": (legacy(Category), lambda: category_serializer.all(db.session)),
+        "product categories": (
+            legacy(ProductCategory),
+            lambda: product_category_serializer.all(db.session),
+        ),
+    }
+
+
+def measure(db, function, repeat):
+    samples = []
+    with QueryCounter(db.engine) as counter:
+        for _ in range(repeat):
+            db.session.remove()
+            start = time.perf_counter()
+            result = function()
+            samples.append(time.perf_counter() - start)
+    return result, statistics.median(samples), counter.count // repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serializer benchmark.")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    app, db = load_app()
+    with app.app_context():
+        seed(db, args.rows)
+        print(
+            f"{'endpoint':<20} {'rows':>7} {'mixin ms':>10} {'queries':>8} "
+            f"{'fast ms':>9} {'queries':>8} {'speedup':>8}"
+        )
+        for name, (legacy, fast) in cases(db).items():
+            expected, legacy_time, legacy_queries = measure(db, legacy, args.repeat)
+            result, fast_time, fast_queries = measure(db, fast, args.repeat)
+            # Both paths return rows in primary key order, so the lists compare directly.
+            assert result == expected, f"{name}: serializers disagree"
+            print(
+                f"{name:<20} {len(result):>7} {legacy_time * 1000:>10.1f} "
+                f"{legacy_queries:>8} {fast_time * 1000:>9.1f} {fast_queries:>8} "
+                f"{legacy_time / fast_time:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+# benchmarks/serving_concurrency.py
+# Compares the Flask development server with the ASGI entry point (asgi.py)
+# as the number of concurrent client connections grows.
+#   python -m benchmarks.serving_concurrency --connections 10 100 500 --seconds 5
+# Every connection is a keep-alive client sending requests back to back for the
+# given time, so the dev server needs one thread per connection while uvicorn
+# keeps them all on its event loop. Reports throughput, p50/p99 latency and
+# failed requests (timeouts, refused or reset connections) per level.
+# Requires uvicorn (in the Pipfile).
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.common import load_app
+from benchmarks.http_suite import BENCH_PASSWORD, percentile, seed
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REQUEST_TIMEOUT = 10
+
+
+def server_command(kind, port, workers):
+    if kind == "dev":
+        # What app.py's __main__ runs, minus the debugger and reloader.
+        return [
+            sys.executable,
+            "-c",
+            f"from app import app; app.run(port={port}, threaded=True)",
+        ]
+    return [
+        sys.executable,
+        "-m",
+        "uvicorn",
+        "asgi:application",
+        "--port",
+        str(port),
+        "--workers",
+        str(workers),
+        "--log-level",
+        "warning",
+        "--no-access-log",
+    ]
+
+
+async def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"The server on port {port} didn't start.")
+
+
+async def read_response(reader):
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ", 2)[1])
+    headers = dict(
+        (name.strip().lower(), value.strip())
+        for name, _, value in (line.partition(":") for line in lines[1:] if line)
+    )
+    await reader.readexactly(int(headers.get("content-length", 0)))
+    return status, headers.get("connection", "").lower() != "close"
+
+
+async def client(port, request, stop_at, latencies, failures):
+    connection = None
+    while time.monotonic() < stop_at:
+        start = time.perf_counter()
+        try:
+            if connection is None:
+                connection = await asyncio.wait_for(
+                    asyncio.open_connection("127.0.0.1", port), REQUEST_TIMEOUT
+                )
+            reader, writer = connection
+            writer.write(request)
+            status, keep_alive = await asyncio.wait_for(
+                read_response(reader), REQUEST_TIMEOUT
+            )
+            if status >= 400:
+                failures.append(status)
+            else:
+                latencies.append(time.perf_counter() - start)
+            if not keep_alive:
+                writer.close()
+                connection = None
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError) as error:
+            failures.append(type(error).__name__)
+            if connection is not None:
+                connection[1].close()
+            connection = None
+            await asyncio.sleep(0.05)
+    if connection is not None:
+        connection[1].close()
+
+
+async def load(port, request, connections, seconds):
+    latencies, failures = [], []
+    stop_at = time.monotonic() + seconds
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            client(port, request, stop_at, latencies, failures)
+            for _ in range(connections)
+        )
+    )
+    return latencies, failures, time.perf_counter() - start
+
+
+def http_request(method, path, body=b""):
+    lines = [f"{method} {path} HTTP/1.1", "Host: 127.0.0.1"]
+    if body:
+        lines += ["Content-Type: application/json", f"Content-Length: {len(body)}"]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode() + body
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serving concurrency benchmark.")
+    parser.add_argument("--connections", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--workers", type=int, default=2, help="uvicorn processes")
+    parser.add_argument("--servers", nargs="+", default=["dev", "asgi"])
+    parser.add_argument("--port", type=int, default=5610)
+    args = parser.parse_args()
+
+    # The servers are separate processes, so they need the database's path.
+    db_path = os.path.join(tempfile.mkdtemp(prefix="montluxe-serving-"), "bench.db")
+    app, db = load_app(db_path)
+    fixture = seed(app, db, products=200, users=200, orders=200)
+    with app.app_context():
+        db.engine.dispose()
+
+    scenarios = {
+        "GET /products/<id>": http_request(
+            "GET", f"/products/{fixture['product_ids'][0]}"
+        ),
+        "POST /login": http_request(
+            "POST",
+            "/login",
+            f'{{"username": "{fixture["username"]}", "password": "{BENCH_PASSWORD}"}}'.encode(),
+        ),
+    }
+
+    print(
+        f"{'server':<6} {'scenario':<20} {'conns':>6} {'req/s':>9} "
+        f"{'p50 ms':>9} {'p99 ms':>9} {'failed':>7}"
+    )
+    for kind in args.servers:
+        port = args.port
+        env = dict(os.environ, DB_URI=f"sqlite:///{db_path}")
+        server = subprocess.Popen(
+            server_command(kind, port, args.workers),
+            cwd=SERVER_DIR,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            asyncio.run(wait_for_port(port))
+            for name, request in scenarios.items():
+                for connections in args.connections:
+                    latencies, failures, elapsed = asyncio.run(
+                        load(port, request, connections, args.seconds)
+                    )
+                    latencies.sort()
+                    p50, p99 = (
+                        (
+                            percentile(latencies, 0.5) * 1000,
+                            percentile(latencies, 0.99) * 1000,
+                        )
+                        if latencies
+                        else (float("nan"), float("nan"))
+                    )
+                    print(
+                        f"{kind:<6} {name:<20} {connections:>6} "
+                        f"{len(latencies) / elapsed:>9.1f} {p50:>9.1f} {p99:>9.1f} "
+                        f"{len(failures):>7}"
+                    )
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
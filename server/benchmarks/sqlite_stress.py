@@ -0,0 +1,161 @@
+# benchmarks/sqlite_stress.py
+# Multi-threaded read/write stress test against a local SQLite file.
+#   python -m benchmarks.sqlite_stress --readers 8 --writers 2 --seconds 10
+# Runs the same workload twice, once with SQLite's default rollback journal and
+# once with the pragmas from config.SQLITE_PRAGMAS, each on a fresh file.
+# Readers page through products and total up order lines. Writers place orders
+# through checkout.place_orders. The report shows throughput, read latency and
+# how many operations failed with "database is locked".
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+
+from benchmarks.common import load_app
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+NUM_PRODUCTS = 200
+
+
+def seed(engine):
+    from config import db
+    from models import Product, User
+
+    db.metadata.create_all(engine)
+    with Session(engine) as session:
+        user = User(
+            username="stress.user",
+            email="stress@example.com",
+            last_name="Stress",
+            shipping_address="1 Stress St",
+            shipping_city="Geneva",
+            shipping_state="GE",
+            shipping_zip="1200",
+        )
+        user._password_hash = "unused"
+        session.add(user)
+        session.add_all(
+            Product(
+                name=f"Stress Watch {i}",
+                description="Stress test product",
+                price=1000,
+                item_quantity=1_000_000,
+                image_url="/img/stress.png",
+                imageAlt="Stress watch",
+            )
+            for i in range(NUM_PRODUCTS)
+        )
+        session.commit()
+        return user.id
+
+
+def run_workload(engine, user_id, readers, writers, seconds):
+    from checkout import place_orders
+    from models import OrderDetail, Product
+
+    stop = time.monotonic() + seconds
+    stats = {"reads": 0, "writes": 0, "locked": 0, "read_latencies": []}
+    lock = threading.Lock()
+
+    def record(key, latency=None):
+        with lock:
+            stats[key] += 1
+            if latency is not None:
+                stats["read_latencies"].append(latency)
+
+    def reader():
+        while time.monotonic() < stop:
+            start = time.perf_counter()
+            try:
+                with Session(engine) as session:
+                    after = random.randrange(NUM_PRODUCTS)
+                    session.execute(
+                        select(Product.id, Product.name, Product.item_quantity)
+                        .where(Product.id > after)
+                        .order_by(Product.id)
+                        .limit(20)
+                    ).all()
+                    session.execute(select(func.sum(OrderDetail.quantity))).scalar()
+                record("reads", time.perf_counter() - start)
+            except OperationalError:
+                record("locked")
+
+    def writer():
+        while time.monotonic() < stop:
+            try:
+                with Session(engine) as session:
+                    products = random.sample(range(1, NUM_PRODUCTS + 1), 3)
+                    place_orders(
+                        session,
+                        [
+                            {
+                                "user_id": user_id,
+                                "order_details": [
+                                    {"product_id": product_id, "quantity": 1}
+                                    for product_id in products
+                                ],
+                            }
+                        ],
+                    )
+                    session.commit()
+                record("writes")
+            except OperationalError:
+                record("locked")
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads += [threading.Thread(target=writer) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    app, _ = load_app()
+    tuned_pragmas = dict(app.config["SQLITE_PRAGMAS"])
+    modes = {
+        "default journal": {"journal_mode": "DELETE"},
+        "tuned pragmas": tuned_pragmas,
+    }
+
+    print(f"{args.readers} readers, {args.writers} writers, {args.seconds:g}s per mode")
+    print(
+        f"{'mode':<16} {'reads/s':>10} {'writes/s':>10} {'read p50 ms':>12}"
+        f" {'read p95 ms':>12} {'locked':>8}"
+    )
+    for mode, pragmas in modes.items():
+        app.config["SQLITE_PRAGMAS"] = pragmas
+        path = os.path.join(tempfile.mkdtemp(prefix="montluxe-stress-"), "stress.db")
+        engine = create_engine(
+            f"sqlite:///{path}", pool_size=args.readers + args.writers
+        )
+        user_id = seed(engine)
+        stats = run_workload(engine, user_id, args.readers, args.writers, args.seconds)
+        engine.dispose()
+
+        latencies = stats["read_latencies"] or [0.0, 0.0]
+        p95 = statistics.quantiles(latencies, n=20)[-1]
+        print(
+            f"{mode:<16} {stats['reads'] / args.seconds:>10.1f}"
+            f" {stats['writes'] / args.seconds:>10.1f}"
+            f" {statistics.median(latencies) * 1000:>12.2f}"
+            f" {p95 * 1000:>12.2f} {stats['locked']:>8}"
+        )
+    app.config["SQLITE_PRAGMAS"] = tuned_pragmas
+
+
+if __name__ == "__main__":
+    main()
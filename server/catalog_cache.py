@@ -0,0 +1,235 @@
+# catalog_cache.py
+# In-process cache for product catalog reads.
+# The catalog changes rarely compared to how often the storefront reads it, so
+# product and listing payloads are kept in memory and dropped whenever a commit
+# touches a catalog table. Stock changes from checkout and reservations only
+# drop the payloads that show the products concerned. Each worker process has
+# its own cache; writes made by other processes (seed.py, another worker) are
+# picked up once the TTL expires.
+
+import threading
+import time
+from collections import OrderedDict
+from itertools import chain
+
+from config import app
+from models import Category, Product, ProductCategory
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Models whose writes make cached catalog payloads stale.
+CATALOG_MODELS = (Product, Category, ProductCategory)
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Thread-safe least-recently-used cache whose entries expire after a TTL.
+
+    Entries can be stored with tags, e.g. the ids of the products a listing
+    contains, and invalidate() drops every entry carrying one of the given
+    tags (an entry is always tagged with its own key too).
+
+    Every clear() and invalidate() bumps a version counter. get_or_load()
+    remembers the version it started with and drops its result if the cache
+    was changed while the loader was running, so a read racing a write can't
+    store a stale value.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._tagged = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value, _ = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, version=None, tags=(), ttl=None):
+        # ttl shortens the lifetime of this entry, e.g. to that of the row it
+        # was read from; it never extends it past the cache's own.
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        with self._lock:
+            if version is not None and version != self.version:
+                return
+            if key in self._entries:
+                self._remove(key)
+            if ttl <= 0:
+                return
+            tags = frozenset(tags)
+            self._entries[key] = (time.monotonic() + ttl, value, tags)
+            for tag in tags:
+                self._tagged.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tagged[tag]
+            keys.discard(key)
+            if not keys:
+                del self._tagged[tag]
+
+    def get_or_load(self, key, loader, tags=None):
+        """
+        Returns the cached value of a key, calling loader() to fill it on a miss.
+
+        Args:
+        key: The cache key.
+        loader (callable): Builds the value.
+        tags (callable): Given the loaded value, returns the tags to store it with.
+
+        Returns:
+        The cached or loaded value.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        version = self.version
+        value = loader()
+        self.set(key, value, version=version, tags=tags(value) if tags else ())
+        return value
+
+    def get_many(self, keys):
+        found = {}
+        for key in keys:
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                found[key] = value
+        return found
+
+    def invalidate(self, tags):
+        """
+        Drops every entry whose key is one of the tags or that was stored with one of them.
+
+        Args:
+        tags (iterable): The tags, e.g. [("product", 3)].
+        """
+        with self._lock:
+            keys = set()
+            for tag in tags:
+                if tag in self._entries:
+                    keys.add(tag)
+                keys.update(self._tagged.get(tag, ()))
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+            self.version += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tagged.clear()
+            self.version += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "version": self.version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+catalog_cache = LRUCache(
+    maxsize=app.config["CATALOG_CACHE_SIZE"], ttl=app.config["CATALOG_CACHE_TTL"]
+)
+
+
+def mark_catalog_changed(session):
+    """
+    Flags a session so the catalog cache is cleared when it commits.
+
+    Flushed ORM objects are detected automatically; this is for Core
+    statements (bulk UPDATE/INSERT) that bypass the unit of work.
+    """
+    session.info["catalog_changed"] = True
+
+
+def product_tags(ids):
+    return [("product", product_id) for product_id in ids]
+
+
+def payload_product_tags(payload):
+    """
+    Tags a cached listing payload with the ids of the products it contains.
+
+    Args:
+    payload (EncodedPayload or None): A payload whose data has a "products" list.
+
+    Returns:
+    list: One ("product", id) tag per product.
+    """
+    if payload is None:
+        return []
+    return product_tags(product["id"] for product in payload.data["products"])
+
+
+def mark_stock_changed(session, product_ids):
+    """
+    Flags a session so the cached payloads of these products are dropped when it commits.
+
+    For stock-only writes (checkout, reservations). Stock doesn't decide the
+    order of any listing, so only the payloads that show these products go,
+    unlike mark_catalog_changed(), which clears the whole cache.
+
+    Args:
+    session: The SQLAlchemy session doing the write.
+    product_ids (iterable): The products whose stock changed.
+    """
+    session.info.setdefault("stock_changed", set()).update(product_ids)
+
+
+# Session-level hooks cover every writer that goes through SQLAlchemy,
+# including the API resources and seed.py.
+@event.listens_for(Session, "after_flush")
+def _track_catalog_writes(session, flush_context):
+    if any(
+        isinstance(obj, CATALOG_MODELS)
+        for obj in chain(session.new, session.dirty, session.deleted)
+    ):
+        mark_catalog_changed(session)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_catalog_cache(session):
+    stock_changed = session.info.pop("stock_changed", None)
+    if session.info.pop("catalog_changed", False):
+        catalog_cache.clear()
+    elif stock_changed:
+        catalog_cache.invalidate(product_tags(stock_changed))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_catalog_writes(session):
+    session.info.pop("catalog_changed", None)
+    session.info.pop("stock_changed", None)
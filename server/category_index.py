@@ -0,0 +1,132 @@
+# category_index.py
+# In-memory category -> product id index.
+# Category pages need the ids of the products in a category, in order. Instead
+# of joining product_categories on every request, the whole mapping is loaded
+# with one query and kept as sorted id lists. Commits that add or remove
+# product/category links, products or categories patch the lists in place. The
+# index is rebuilt from the database after CATALOG_CACHE_TTL seconds so writes
+# made by other processes show up too.
+
+import bisect
+import threading
+import time
+
+from config import app, db
+from models import Category, Product, ProductCategory
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+
+class CategoryIndex:
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._products = None
+        self._expires_at = 0
+        self._lock = threading.Lock()
+
+    def _load(self):
+        products = {
+            category_id: []
+            for category_id in db.session.execute(select(Category.id)).scalars()
+        }
+        rows = db.session.execute(
+            select(ProductCategory.category_id, ProductCategory.product_id).order_by(
+                ProductCategory.category_id, ProductCategory.product_id
+            )
+        )
+        for category_id, product_id in rows:
+            products.setdefault(category_id, []).append(product_id)
+        return products
+
+    def product_ids(self, category_id):
+        """
+        Returns the sorted product ids of a category.
+
+        Args:
+        category_id (int): The category to look up.
+
+        Returns:
+        list or None: A copy of the sorted ids, or None if the category doesn't exist.
+        """
+        with self._lock:
+            if self._products is None or self._expires_at <= time.monotonic():
+                self._products = self._load()
+                self._expires_at = time.monotonic() + self.ttl
+            ids = self._products.get(category_id)
+            return list(ids) if ids is not None else None
+
+    def apply(self, changes):
+        with self._lock:
+            if self._products is None:
+                return
+            for change, *args in changes:
+                if change == "rebuild":
+                    self._products = None
+                    return
+                getattr(self, f"_{change}")(*args)
+
+    def _link(self, category_id, product_id):
+        ids = self._products.setdefault(category_id, [])
+        position = bisect.bisect_left(ids, product_id)
+        if position == len(ids) or ids[position] != product_id:
+            ids.insert(position, product_id)
+
+    def _unlink(self, category_id, product_id):
+        ids = self._products.get(category_id, [])
+        position = bisect.bisect_left(ids, product_id)
+        if position < len(ids) and ids[position] == product_id:
+            del ids[position]
+
+    def _add_category(self, category_id):
+        self._products.setdefault(category_id, [])
+
+    def _remove_category(self, category_id):
+        self._products.pop(category_id, None)
+
+    def _remove_product(self, product_id):
+        for category_id in self._products:
+            self._unlink(category_id, product_id)
+
+    def invalidate(self):
+        with self._lock:
+            self._products = None
+
+
+category_index = CategoryIndex(ttl=app.config["CATALOG_CACHE_TTL"])
+
+
+# Changes are collected per flush and only applied once the transaction commits.
+@event.listens_for(Session, "after_flush")
+def _collect_category_changes(session, flush_context):
+    changes = session.info.setdefault("category_index_changes", [])
+    for obj in session.new:
+        if isinstance(obj, ProductCategory):
+            changes.append(("link", obj.category_id, obj.product_id))
+        elif isinstance(obj, Category):
+            changes.append(("add_category", obj.id))
+    for obj in session.deleted:
+        if isinstance(obj, ProductCategory):
+            changes.append(("unlink", obj.category_id, obj.product_id))
+        elif isinstance(obj, Category):
+            changes.append(("remove_category", obj.id))
+        elif isinstance(obj, Product):
+            changes.append(("remove_product", obj.id))
+    # Re-pointing an existing link at another product or category is rare
+    # enough that rebuilding is simpler than tracking the old ids.
+    if any(
+        isinstance(obj, ProductCategory) and session.is_modified(obj)
+        for obj in session.dirty
+    ):
+        changes.append(("rebuild",))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_category_changes(session):
+    changes = session.info.pop("category_index_changes", None)
+    if changes:
+        category_index.apply(changes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_category_changes(session):
+    session.info.pop("category_index_changes", None)
@@ -0,0 +1,184 @@
+# checkout.py
+# Order placement with batched statements in a single transaction.
+# However many orders and line items a request carries, checkout costs a fixed
+# number of round trips: one lookup for products, one for users, one batched
+# conditional stock UPDATE (see inventory.py), one multi-row INSERT for orders
+# and one for details. Units a cart has reserved are used before stock is taken.
+# The orders are added to the sales rollups (see reports.py) in the same
+# transaction, with one upsert per rollup table.
+
+from collections import Counter
+from datetime import datetime
+
+from catalog_cache import mark_stock_changed
+from helpers import validate_type
+from inventory import consume_reservations, stock_levels, take_stock
+from models import Order, OrderDetail, Product, User
+from reports import record_sales
+from sqlalchemy import insert, select
+
+MAX_ORDERS_PER_BATCH = 500
+
+
+class CheckoutError(ValueError):
+    """Raised when an order payload can't be placed as submitted."""
+
+
+class InsufficientStockError(CheckoutError):
+    """Raised when one or more products don't have enough stock left."""
+
+    def __init__(self, shortages):
+        super().__init__("Insufficient stock for one or more products.")
+        self.shortages = shortages
+
+
+def normalize_orders(orders_data):
+    """
+    Validates order payloads and converts their ids and quantities to ints.
+
+    Args:
+    orders_data (list): Orders shaped like {"user_id": 1, "order_details": [{"product_id": 1, "quantity": 2}]}.
+
+    Returns:
+    list: The normalized orders.
+
+    Raises:
+    CheckoutError: If the payload is malformed.
+    """
+    if not isinstance(orders_data, list) or not orders_data:
+        raise CheckoutError("At least one order is required.")
+    if len(orders_data) > MAX_ORDERS_PER_BATCH:
+        raise CheckoutError(
+            f"A batch may contain at most {MAX_ORDERS_PER_BATCH} orders."
+        )
+
+    orders = []
+    for order_data in orders_data:
+        if not isinstance(order_data, dict):
+            raise CheckoutError("Each order must be an object.")
+        details = order_data.get("order_details")
+        if not isinstance(details, list) or not details:
+            raise CheckoutError("Each order needs at least one order detail.")
+        try:
+            user_id = validate_type(order_data.get("user_id"), "user_id", int)
+            lines = [
+                {
+                    "product_id": validate_type(
+                        detail.get("product_id"), "product_id", int
+                    ),
+                    "quantity": validate_type(detail.get("quantity"), "quantity", int),
+                }
+                for detail in details
+            ]
+        except (ValueError, AttributeError) as error:
+            raise CheckoutError(str(error) or "Malformed order detail.")
+        if any(line["quantity"] < 1 for line in lines):
+            raise CheckoutError("The quantity must be at least 1.")
+        orders.append({"user_id": user_id, "order_details": lines})
+    return orders
+
+
+def _missing_ids(session, column, ids):
+    found = set(session.execute(select(column).where(column.in_(ids))).scalars())
+    return sorted(set(ids) - found)
+
+
+def _take_stock(session, requested):
+    # Products are updated in id order so concurrent checkouts lock their rows
+    # in the same order and can't deadlock each other.
+    params = [
+        {"b_product_id": product_id, "b_quantity": quantity}
+        for product_id, quantity in sorted(requested.items())
+    ]
+    if session.get_bind().dialect.supports_sane_multi_rowcount:
+        return session.execute(take_stock, params).rowcount == len(params)
+    # Drivers that can't report rowcounts for executemany get one UPDATE per product.
+    return all(session.execute(take_stock, param).rowcount == 1 for param in params)
+
+
+def place_orders(session, orders_data, cart=None):
+    """
+    Creates orders and their details and takes their stock, all in the session's transaction.
+
+    The caller commits. On a stock shortage the session is rolled back here so
+    any stock already taken by the batched UPDATE is returned.
+
+    Args:
+    session: The SQLAlchemy session to use.
+    orders_data (list): Order payloads, see normalize_orders.
+    cart (str): A cart whose reservations cover (part of) the ordered quantities.
+
+    Returns:
+    list: The ids of the new orders, in the order they were submitted.
+
+    Raises:
+    CheckoutError: If the payload is malformed or references unknown users or products.
+    InsufficientStockError: If any product doesn't have enough stock.
+    """
+    orders = normalize_orders(orders_data)
+
+    requested = Counter()
+    for order in orders:
+        for line in order["order_details"]:
+            requested[line["product_id"]] += line["quantity"]
+
+    # Prices are read along with the ids for the sales rollups.
+    prices = dict(
+        session.execute(
+            select(Product.id, Product.price).where(Product.id.in_(list(requested)))
+        ).all()
+    )
+    missing_products = sorted(set(requested) - set(prices))
+    if missing_products:
+        raise CheckoutError(f"Unknown product ids: {missing_products}")
+    missing_users = _missing_ids(
+        session, User.id, list({order["user_id"] for order in orders})
+    )
+    if missing_users:
+        raise CheckoutError(f"Unknown user ids: {missing_users}")
+
+    if cart is not None and not isinstance(cart, str):
+        raise CheckoutError("The cart must be a string.")
+    covered = consume_reservations(session, cart, requested) if cart else Counter()
+    # Counter subtraction drops the products reservations fully cover.
+    needed = requested - covered
+    if needed and not _take_stock(session, needed):
+        session.rollback()
+        available = stock_levels(session, needed)
+        raise InsufficientStockError(
+            [
+                {
+                    "product_id": product_id,
+                    "requested": quantity,
+                    "available": available.get(product_id) or 0,
+                }
+                for product_id, quantity in sorted(needed.items())
+                if (available.get(product_id) or 0) < quantity
+            ]
+        )
+    mark_stock_changed(session, needed)
+
+    created = session.execute(
+        insert(Order).returning(
+            Order.id, Order.created_at, sort_by_parameter_order=True
+        ),
+        [{"user_id": order["user_id"]} for order in orders],
+    ).all()
+    order_ids = [order_id for order_id, _ in created]
+    session.execute(
+        insert(OrderDetail),
+        [
+            {"order_id": order_id, **line}
+            for order_id, order in zip(order_ids, orders)
+            for line in order["order_details"]
+        ],
+    )
+    record_sales(
+        session,
+        [
+            ((created_at or datetime.utcnow()).date(), order["order_details"])
+            for (_, created_at), order in zip(created, orders)
+        ],
+        prices,
+    )
+    return order_ids
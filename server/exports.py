@@ -0,0 +1,169 @@
+# exports.py
+# Streaming exports of the order history.
+#   GET /orders/export?format=csv&since=2026-10-01&until=2026-11-01
+#   GET /order_details/export?format=ndjson&since=2026-10-01T00:00:00
+# Orders.get and OrderDetails.get build every row and its to_dict() in memory
+# before answering. These endpoints fetch rows through a server-side cursor in
+# batches of EXPORT_BATCH_SIZE and write each batch out before fetching the
+# next, so a worker holds one batch at a time however long the history is.
+
+import csv
+import io
+import json
+from datetime import date, datetime, timezone
+
+from config import db
+from flask import Response, stream_with_context
+from helpers import timestamp_bounds
+from models import Order, OrderDetail
+from sqlalchemy import select
+
+EXPORT_BATCH_SIZE = 1000
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+EXPORT_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# json.dumps() with non-default options builds a new encoder per call.
+_json_encoder = json.JSONEncoder(separators=(",", ":"))
+
+
+def parse_export_range(args):
+    """
+    Parses the time range of an export from query parameters.
+
+    Args:
+    args (dict): The query parameters; since (inclusive) and until (exclusive) are ISO dates or date-times, in UTC.
+
+    Returns:
+    tuple: The (since, until) datetimes, either of which may be None.
+
+    Raises:
+    ValueError: If a bound can't be parsed or the range is reversed.
+    """
+    bounds = []
+    for name in ("since", "until"):
+        value = args.get(name)
+        if not value:
+            bounds.append(None)
+            continue
+        try:
+            bound = datetime.fromisoformat(value)
+        except ValueError:
+            raise ValueError(
+                f"The {name} must be a date or date-time like 2026-10-18T12:00:00."
+            )
+        # Timestamps are stored as naive UTC.
+        if bound.tzinfo is not None:
+            bound = bound.astimezone(timezone.utc).replace(tzinfo=None)
+        bounds.append(bound)
+    since, until = bounds
+    if since and until and since >= until:
+        raise ValueError("The since must be before the until.")
+    return since, until
+
+
+def _in_range(statement, since, until):
+    created_at, bind = timestamp_bounds(db.session, Order.created_at)
+    if since is not None:
+        statement = statement.where(created_at >= bind(since))
+    if until is not None:
+        statement = statement.where(created_at < bind(until))
+    return statement
+
+
+def order_export_query(since=None, until=None):
+    return _in_range(
+        select(Order.id, Order.user_id, Order.created_at).order_by(Order.id),
+        since,
+        until,
+    )
+
+
+def order_detail_export_query(since=None, until=None):
+    # Details carry their order's user and time, so they can be exported on their own.
+    return _in_range(
+        select(
+            OrderDetail.id,
+            OrderDetail.order_id,
+            Order.user_id,
+            Order.created_at,
+            OrderDetail.product_id,
+            OrderDetail.quantity,
+        )
+        .join(Order, Order.id == OrderDetail.order_id)
+        .order_by(OrderDetail.id),
+        since,
+        until,
+    )
+
+
+def _plain(value):
+    if isinstance(value, datetime):
+        return value.strftime(EXPORT_DATETIME_FORMAT)
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def _ndjson_chunks(columns, batches):
+    for rows in batches:
+        yield "".join(
+            _json_encoder.encode(dict(zip(columns, map(_plain, row)))) + "\n"
+            for row in rows
+        )
+
+
+def _csv_chunks(columns, batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in batches:
+        writer.writerows([_plain(value) for value in row] for row in rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # The header alone, for an empty export.
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_response(statement, export_format, filename):
+    """
+    Streams the rows of a query as NDJSON or CSV.
+
+    Rows are fetched EXPORT_BATCH_SIZE at a time with yield_per, which makes
+    SQLAlchemy use a server-side cursor where the driver has one, and every
+    batch is sent as one chunk.
+
+    Args:
+    statement: A Core select; its column names become the fields or CSV header.
+    export_format (str): "ndjson" or "csv".
+    filename (str): The download name, without extension.
+
+    Returns:
+    Response: A streamed response.
+
+    Raises:
+    ValueError: If the format is unknown.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"The format must be one of {', '.join(EXPORT_FORMATS)}.")
+    columns = [column.name for column in statement.selected_columns]
+    chunks = _csv_chunks if export_format == "csv" else _ndjson_chunks
+
+    def generate():
+        result = db.session.execute(
+            statement.execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        try:
+            yield from chunks(columns, result.partitions())
+        finally:
+            result.close()
+
+    response = Response(
+        stream_with_context(generate()), mimetype=EXPORT_FORMATS[export_format]
+    )
+    response.headers["Content-Disposition"] = (
+        f'attachment; filename="{filename}.{export_format}"'
+    )
+    response.headers["Cache-Control"] = "no-store"
+    return response
@@ -1,3 +1,10 @@
+import base64
+import binascii
+import json
+
+from sqlalchemy import String, type_coerce
+
+
 def validate_not_blank(value, field_name):
     """
     Validates that a given value is not blank.
@@ -113,3 +120,118 @@ def normalize_price_input(price_input):
     ValueError: If the price input is invalid.
     """
     return dollar_to_cents(price_input)
+
+
+def encode_cursor(sort, value, row_id):
+    """
+    Encodes the position of the last row of a page into an opaque cursor.
+
+    Args:
+    sort (str): The sort key the page was produced with, e.g. "price" or "-name".
+    value: The sort column value of the last row.
+    row_id (int): The primary key of the last row, used as a tie-breaker.
+
+    Returns:
+    str: A URL-safe cursor string.
+    """
+    payload = json.dumps({"s": sort, "v": value, "id": row_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor, sort):
+    """
+    Decodes a cursor produced by encode_cursor for the given sort key.
+
+    Args:
+    cursor (str): The cursor string sent back by the client.
+    sort (str): The sort key of the current request.
+
+    Returns:
+    tuple: The (value, row_id) pair the next page starts after.
+
+    Raises:
+    ValueError: If the cursor is malformed or was issued for a different sort.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        value, row_id = payload["v"], validate_type(payload["id"], "cursor", int)
+    except (ValueError, TypeError, KeyError, binascii.Error):
+        raise ValueError("The cursor is invalid.")
+    if payload.get("s") != sort:
+        raise ValueError("The cursor does not match the requested sort.")
+    return value, row_id
+
+
+def parse_limit(value, default, maximum):
+    """
+    Parses a page size query parameter.
+
+    Args:
+    value (str or None): The raw query parameter.
+    default (int): The page size used when no value is given.
+    maximum (int): The largest page size a client may request.
+
+    Returns:
+    int: The page size.
+
+    Raises:
+    ValueError: If the value is not an integer between 1 and maximum.
+    """
+    if value is None:
+        return default
+    limit = validate_type(value, "limit", int)
+    if limit < 1 or limit > maximum:
+        raise ValueError(f"The limit must be between 1 and {maximum}.")
+    return limit
+
+
+def parse_id_list(value, field_name, maximum):
+    """
+    Parses a comma-separated list of ids, e.g. "3,1,2".
+
+    Args:
+    value (str): The raw query parameter.
+    field_name (str): The name of the parameter for error messages.
+    maximum (int): The largest number of distinct ids a client may request.
+
+    Returns:
+    list: The distinct ids as ints, in the order first given.
+
+    Raises:
+    ValueError: If an id is not an integer or there are none or too many.
+    """
+    ids = list(
+        dict.fromkeys(
+            validate_type(part.strip(), field_name, int)
+            for part in value.split(",")
+            if part.strip()
+        )
+    )
+    if not ids or len(ids) > maximum:
+        raise ValueError(f"The {field_name} must list between 1 and {maximum} ids.")
+    return ids
+
+
+def timestamp_bounds(session, column):
+    """
+    Prepares a DateTime column for range comparisons with datetimes.
+
+    SQLite stores datetimes as text, without microseconds when the database
+    filled in CURRENT_TIMESTAMP and with them when Python wrote the value,
+    while a bound datetime is always sent with them: the row stored as
+    "2026-10-01 00:00:00" sorts before the bound "2026-10-01 00:00:00.000000".
+    There the raw text is compared with the bound in isoformat(" "), which
+    leaves out zero microseconds, so every stored form falls on the right side
+    and the column's indexes still apply.
+
+    Args:
+    session: The SQLAlchemy session the comparison will run on.
+    column: The DateTime column, e.g. Order.created_at.
+
+    Returns:
+    tuple: (expression, bind), where bind converts a datetime into the value to compare the expression with.
+    """
+    if session.get_bind().dialect.name == "sqlite":
+        return type_coerce(column, String), lambda value: value.isoformat(" ")
+    return column, lambda value: value
@@ -0,0 +1,224 @@
+# idempotency.py
+# Idempotency-Key support for order submission.
+# A client that doesn't hear back from POST /orders can't tell whether the
+# order went through, so it retries, and every retry used to place another
+# order. A client that sends an Idempotency-Key header (any unique string, e.g.
+# a UUID, reused for the retries of one submission) gets the response of the
+# first request that succeeded with that key, and the order is placed once.
+#
+# The response is inserted into idempotency_keys in the same transaction as the
+# order, so the two commit together or not at all: of two requests racing with
+# one key, the second fails on the primary key and rolls back its order. Only
+# successful responses are stored; a request that failed can be retried as is.
+# Stored responses are also kept in an in-process LRU cache, so most retries
+# don't query the database, and rows are deleted IDEMPOTENCY_KEY_TTL seconds
+# after they were stored.
+
+import hashlib
+import json
+import threading
+import time
+from datetime import timedelta
+
+from catalog_cache import LRUCache
+from config import app
+from flask import make_response
+from inventory import utcnow
+from models import IdempotencyKey
+from sqlalchemy import delete, event, insert, select
+from sqlalchemy.orm import Session
+
+MAX_KEY_LENGTH = 255
+
+keys_table = IdempotencyKey.__table__
+
+
+class IdempotencyError(ValueError):
+    """Raised when an Idempotency-Key header is malformed."""
+
+
+class IdempotencyConflict(IdempotencyError):
+    """Raised when a key is sent again with a different request."""
+
+
+def parse_idempotency_key(value):
+    """
+    Validates the Idempotency-Key header of a request.
+
+    Args:
+    value (str or None): The raw header value.
+
+    Returns:
+    str or None: The key, or None if the header wasn't sent.
+
+    Raises:
+    IdempotencyError: If the key is empty, too long or not printable ASCII.
+    """
+    if value is None:
+        return None
+    key = value.strip()
+    if (
+        not key
+        or len(key) > MAX_KEY_LENGTH
+        or not (key.isascii() and key.isprintable())
+    ):
+        raise IdempotencyError(
+            f"The Idempotency-Key must be 1 to {MAX_KEY_LENGTH} printable ASCII characters."
+        )
+    return key
+
+
+def request_fingerprint(*parts):
+    """
+    Hashes what a request asks for, to tell a retry from a different request reusing its key.
+
+    Args:
+    parts: The validated payload and anything else that determines the outcome, e.g. the user.
+
+    Returns:
+    str: A hex SHA-256 digest.
+    """
+    canonical = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    Stored responses by idempotency key.
+
+    Args:
+    ttl (int): How long a response is kept, in seconds.
+    purge_interval (int): At most how often expired rows are deleted, in seconds.
+    cache (LRUCache): The in-process cache in front of the table.
+    """
+
+    def __init__(self, ttl, purge_interval, cache):
+        self.ttl = ttl
+        self.purge_interval = purge_interval
+        self.cache = cache
+        self._next_purge = 0
+        self._lock = threading.Lock()
+
+    def replay(self, session, key, request_hash):
+        """
+        Returns the stored response of a key, if there is one.
+
+        Args:
+        session: The SQLAlchemy session to use.
+        key (str): The idempotency key.
+        request_hash (str): The request_fingerprint() of the current request.
+
+        Returns:
+        Response or None: The original response, marked with an Idempotent-Replayed header.
+
+        Raises:
+        IdempotencyConflict: If the key was stored for a different request.
+        """
+        entry = self.cache.get(key)
+        if entry is None:
+            now = utcnow()
+            row = session.execute(
+                select(
+                    keys_table.c.request_hash,
+                    keys_table.c.status_code,
+                    keys_table.c.response_body,
+                    keys_table.c.expires_at,
+                ).where(keys_table.c.key == key, keys_table.c.expires_at > now)
+            ).first()
+            if row is None:
+                return None
+            *entry, expires_at = row
+            entry = tuple(entry)
+            # Cached no longer than the row, which stops replaying at expires_at.
+            self.cache.set(key, entry, ttl=(expires_at - now).total_seconds())
+        stored_hash, status_code, response_body = entry
+        if stored_hash != request_hash:
+            raise IdempotencyConflict(
+                "This Idempotency-Key was already used for a different request."
+            )
+        response = make_response(json.loads(response_body), status_code)
+        response.headers["Idempotent-Replayed"] = "true"
+        return response
+
+    def save(self, session, key, request_hash, status_code, body):
+        """
+        Stores the response of a key in the current transaction.
+
+        The caller commits. A concurrent request that stored the same key first
+        makes this raise IntegrityError, after which replay() returns its response.
+
+        Args:
+        session: The SQLAlchemy session whose transaction produced the response.
+        key (str): The idempotency key.
+        request_hash (str): The request_fingerprint() of the request.
+        status_code (int): The response status.
+        body (dict): The response body.
+        """
+        now = utcnow()
+        expires_at = now + timedelta(seconds=self.ttl)
+        # An expired row may still hold the key until the next purge.
+        session.execute(
+            delete(keys_table).where(
+                keys_table.c.key == key, keys_table.c.expires_at <= now
+            )
+        )
+        response_body = json.dumps(body, separators=(",", ":"))
+        session.execute(
+            insert(keys_table).values(
+                key=key,
+                request_hash=request_hash,
+                status_code=status_code,
+                response_body=response_body,
+                created_at=now,
+                expires_at=expires_at,
+            )
+        )
+        if self._purge_due():
+            self.purge(session, now)
+        session.info.setdefault("idempotent_responses", {})[key] = (
+            (request_hash, status_code, response_body),
+            expires_at,
+        )
+
+    def _purge_due(self):
+        with self._lock:
+            if time.monotonic() < self._next_purge:
+                return False
+            self._next_purge = time.monotonic() + self.purge_interval
+            return True
+
+    def purge(self, session, now=None):
+        """
+        Deletes expired keys, without committing.
+
+        Returns:
+        int: How many keys were deleted.
+        """
+        return session.execute(
+            delete(keys_table).where(keys_table.c.expires_at <= (now or utcnow()))
+        ).rowcount
+
+
+idempotency_store = IdempotencyStore(
+    ttl=app.config["IDEMPOTENCY_KEY_TTL"],
+    purge_interval=app.config["IDEMPOTENCY_PURGE_INTERVAL"],
+    cache=LRUCache(
+        maxsize=app.config["IDEMPOTENCY_CACHE_SIZE"],
+        ttl=app.config["IDEMPOTENCY_KEY_TTL"],
+    ),
+)
+
+
+# Responses only reach the cache once the transaction that stored them commits.
+@event.listens_for(Session, "after_commit")
+def _cache_committed_responses(session):
+    now = utcnow()
+    for key, (entry, expires_at) in session.info.pop(
+        "idempotent_responses", {}
+    ).items():
+        idempotency_store.cache.set(key, entry, ttl=(expires_at - now).total_seconds())
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_responses(session):
+    session.info.pop("idempotent_responses", None)
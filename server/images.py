@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# images.py
+# Responsive product image pipeline.
+#   python images.py            (from the server directory, after changing images)
+# The source PNGs in client/src/assets/img are 1.5-3 MB each. This script
+# writes resized WebP and AVIF copies of each one to img/optimized, named after
+# a hash of their content (alpine_elegance.640.1a2b3c4d5e.webp), plus a
+# manifest.json listing them. Because a file's name changes whenever its
+# content does, the server can tell browsers to cache them forever. Product
+# payloads list the variants from the manifest as srcset strings, so clients
+# can pick the smallest file that fits the screen.
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+
+from config import app
+from flask import request
+
+try:
+    from PIL import Image, features
+except ImportError:  # Pillow is only needed to build the variants, not to serve them
+    Image = None
+
+ASSETS_DIR = app.static_folder
+SOURCE_DIR = os.path.join(ASSETS_DIR, "img")
+OUTPUT_DIR = os.path.join(SOURCE_DIR, "optimized")
+MANIFEST_PATH = os.path.join(OUTPUT_DIR, "manifest.json")
+
+WIDTHS = (320, 640, 960, 1280)
+# Format, MIME type and encoder options, best compression first.
+FORMATS = (
+    ("avif", "image/avif", {"quality": 55, "speed": 6}),
+    ("webp", "image/webp", {"quality": 80, "method": 6}),
+)
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# How often the server looks for a rebuilt manifest, in seconds.
+MANIFEST_CHECK_INTERVAL = 5
+
+
+def _digest(data):
+    return hashlib.blake2b(data, digest_size=5).hexdigest()
+
+
+def build_variants(source_path, widths=WIDTHS, formats=FORMATS):
+    """
+    Writes the resized, re-encoded copies of one source image.
+
+    Args:
+    source_path (str): Path of the source image.
+    widths (tuple): Target widths in pixels; widths above the source's are skipped.
+    formats (tuple): (extension, MIME type, encoder options) triples.
+
+    Returns:
+    dict: The manifest entry for the image.
+    """
+    with open(source_path, "rb") as file:
+        source_bytes = file.read()
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    entry = {"source_hash": _digest(source_bytes), "variants": {}}
+
+    with Image.open(io.BytesIO(source_bytes)) as source:
+        source.load()
+        entry["width"], entry["height"] = source.size
+        if source.mode not in ("RGB", "RGBA"):
+            source = source.convert("RGBA")
+        targets = [width for width in widths if width < source.width] or [source.width]
+
+        for extension, mime_type, options in formats:
+            if not features.check(extension):
+                continue
+            variants = []
+            for width in targets:
+                height = round(source.height * width / source.width)
+                buffer = io.BytesIO()
+                source.resize((width, height), Image.LANCZOS).save(
+                    buffer, extension.upper(), **options
+                )
+                data = buffer.getvalue()
+                name = f"{stem}.{width}.{_digest(data)}.{extension}"
+                with open(os.path.join(OUTPUT_DIR, name), "wb") as file:
+                    file.write(data)
+                variants.append({"width": width, "file": name, "bytes": len(data)})
+            entry["variants"][mime_type] = variants
+    return entry
+
+
+def build_all(widths=WIDTHS, force=False):
+    """
+    Builds variants for every PNG/JPEG in SOURCE_DIR and rewrites the manifest.
+
+    Images whose content hasn't changed since the last run are skipped, and
+    variant files no longer listed in the manifest are deleted.
+
+    Args:
+    widths (tuple): Target widths in pixels.
+    force (bool): Rebuild every image even if it hasn't changed.
+
+    Returns:
+    dict: The new manifest.
+
+    Raises:
+    RuntimeError: If Pillow isn't installed.
+    """
+    if Image is None:
+        raise RuntimeError("Building image variants requires Pillow.")
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    previous = {} if force else _read_manifest()
+
+    manifest = {}
+    for filename in sorted(os.listdir(SOURCE_DIR)):
+        if not filename.lower().endswith((".png", ".jpg", ".jpeg")):
+            continue
+        path = os.path.join(SOURCE_DIR, filename)
+        key = f"img/{filename}"
+        with open(path, "rb") as file:
+            source_hash = _digest(file.read())
+        old = previous.get(key)
+        if (
+            old
+            and old["source_hash"] == source_hash
+            and old.get("widths") == list(widths)
+        ):
+            manifest[key] = old
+            continue
+        entry = build_variants(path, widths)
+        entry["widths"] = list(widths)
+        manifest[key] = entry
+        total = sum(v["bytes"] for vs in entry["variants"].values() for v in vs)
+        print(
+            f"{key}: {os.path.getsize(path) // 1024} KiB -> "
+            f"{sum(len(vs) for vs in entry['variants'].values())} variants, {total // 1024} KiB"
+        )
+
+    in_use = {
+        variant["file"]
+        for entry in manifest.values()
+        for variants in entry["variants"].values()
+        for variant in variants
+    }
+    for filename in os.listdir(OUTPUT_DIR):
+        if filename != "manifest.json" and filename not in in_use:
+            os.remove(os.path.join(OUTPUT_DIR, filename))
+
+    with open(MANIFEST_PATH, "w") as file:
+        json.dump(manifest, file, indent=2, sort_keys=True)
+    return manifest
+
+
+def _read_manifest():
+    try:
+        with open(MANIFEST_PATH) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+class ImageManifest:
+    """
+    The variant manifest as the server sees it, as srcset strings per image.
+
+    The file is re-read when its modification time changes, so running the
+    pipeline doesn't need a restart (cached product payloads pick the new
+    variants up within CATALOG_CACHE_TTL). Without a manifest every lookup returns
+    an empty dict and clients fall back to image_url.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._mtime = None
+        self._checked_at = 0
+        self._srcsets = {}
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        # Product lists call this once per product, so the file is stat'ed at
+        # most every MANIFEST_CHECK_INTERVAL seconds.
+        now = time.monotonic()
+        if now - self._checked_at < MANIFEST_CHECK_INTERVAL:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+        url_prefix = f"{app.static_url_path}/img/optimized/"
+        srcsets = {}
+        for key, entry in _read_manifest().items():
+            srcsets[key] = {
+                mime_type: ", ".join(
+                    f"{url_prefix}{variant['file']} {variant['width']}w"
+                    for variant in variants
+                )
+                for mime_type, variants in entry["variants"].items()
+            }
+        self._srcsets, self._mtime = srcsets, mtime
+
+    def srcsets(self, image_url):
+        """
+        Returns the srcset strings of an image, keyed by MIME type.
+
+        Args:
+        image_url (str): The image path as stored on the product, e.g. "/img/alpine_elegance.png".
+
+        Returns:
+        dict: e.g. {"image/webp": "/assets/img/optimized/alpine_elegance.320.1a2b3c4d5e.webp 320w, ..."}.
+        """
+        if not image_url:
+            return {}
+        with self._lock:
+            self._refresh()
+            return self._srcsets.get(image_url.lstrip("/"), {})
+
+
+image_manifest = ImageManifest(MANIFEST_PATH)
+
+
+# Variant names change with their content, so browsers and CDNs may keep them forever.
+@app.after_request
+def cache_optimized_images(response):
+    if (
+        request.endpoint == "static"
+        and request.path.startswith(f"{app.static_url_path}/img/optimized/")
+        and not request.path.endswith("/manifest.json")
+        and response.status_code in (200, 206, 304)
+    ):
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+    return response
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build responsive image variants.")
+    parser.add_argument("--widths", type=int, nargs="+", default=list(WIDTHS))
+    parser.add_argument("--force", action="store_true", help="rebuild every image")
+    args = parser.parse_args()
+    build_all(tuple(args.widths), args.force)
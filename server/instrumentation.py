@@ -0,0 +1,317 @@
+# instrumentation.py
+# Opt-in per-request timing, enabled with REQUEST_METRICS=1.
+# While a request is handled, every SQL statement is counted and timed through
+# SQLAlchemy's cursor events, and time spent in SerializerMixin.to_dict() and
+# JSON encoding and in validating request payloads (schemas.py) is added up
+# separately. Lazy loads triggered by to_dict() show
+# up as queries (and their time as serialization time too), so an N+1
+# regression is visible as a jump in the query count.
+# Each response carries the numbers in a Server-Timing header (browser dev
+# tools display it), and per-route totals and histograms are kept in memory
+# for GET /metrics in the Prometheus text format. Like the catalog cache, the
+# totals are per process; Prometheus adds them up across workers.
+
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy_serializer import SerializerMixin
+
+# Histogram bucket upper bounds for request duration (seconds) and queries per request.
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+class RequestTiming:
+    """What one request has spent so far, in seconds."""
+
+    __slots__ = (
+        "started",
+        "queries",
+        "db",
+        "serialization",
+        "validation",
+        "_depth",
+        "_since",
+    )
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db = 0.0
+        self.serialization = 0.0
+        self.validation = 0.0
+        self._depth = 0
+        self._since = 0.0
+
+    # Serialization nests (to_dict calls to_dict for relationships, and the
+    # result is then JSON encoded), so only the outermost section is timed.
+    def start_serialization(self):
+        if self._depth == 0:
+            self._since = time.perf_counter()
+        self._depth += 1
+
+    def stop_serialization(self):
+        self._depth -= 1
+        if self._depth == 0:
+            self.serialization += time.perf_counter() - self._since
+
+
+def current_timing():
+    if has_request_context():
+        return g.get("request_timing")
+    return None
+
+
+@contextmanager
+def serialization_timer():
+    """Counts the enclosed block as serialization time of the current request, if it is being timed."""
+    timing = current_timing()
+    if timing is None:
+        yield
+        return
+    timing.start_serialization()
+    try:
+        yield
+    finally:
+        timing.stop_serialization()
+
+
+@contextmanager
+def validation_timer():
+    """Counts the enclosed block as validation time of the current request, if it is being timed."""
+    timing = current_timing()
+    if timing is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.validation += time.perf_counter() - started
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.sum += value
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                return
+        self.counts[-1] += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets + ("+Inf",), self.counts):
+            total += count
+            yield bound, total
+
+
+class RouteMetrics:
+    def __init__(self):
+        self.statuses = {}
+        self.duration = Histogram(DURATION_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.db_seconds = 0.0
+        self.serialization_seconds = 0.0
+        self.validation_seconds = 0.0
+
+
+class MetricsRegistry:
+    """Per-route request totals, kept in memory and rendered for Prometheus."""
+
+    def __init__(self):
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def record(self, route, method, status, timing, duration):
+        with self._lock:
+            metrics = self._routes.get((route, method))
+            if metrics is None:
+                metrics = self._routes[(route, method)] = RouteMetrics()
+            metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+            metrics.duration.observe(duration)
+            metrics.queries.observe(timing.queries)
+            metrics.db_seconds += timing.db
+            metrics.serialization_seconds += timing.serialization
+            metrics.validation_seconds += timing.validation
+
+    def render(self, extra=()):
+        """
+        Renders every metric in the Prometheus text exposition format.
+
+        Args:
+        extra (iterable): Additional (name, type, help, value) samples without labels.
+
+        Returns:
+        str: The metrics page.
+        """
+        lines = []
+
+        def header(name, type_, help_):
+            lines.append(f"# HELP {name} {help_}")
+            lines.append(f"# TYPE {name} {type_}")
+
+        with self._lock:
+            routes = sorted(self._routes.items())
+
+            header(
+                "montluxe_http_requests_total",
+                "counter",
+                "Requests handled, by route, method and status.",
+            )
+            for (route, method), metrics in routes:
+                for status, count in sorted(metrics.statuses.items()):
+                    lines.append(
+                        f'montluxe_http_requests_total{{route="{route}",method="{method}",status="{status}"}} {count}'
+                    )
+
+            for name, attribute, help_ in (
+                (
+                    "montluxe_http_request_duration_seconds",
+                    "duration",
+                    "Time to handle a request.",
+                ),
+                (
+                    "montluxe_db_queries_per_request",
+                    "queries",
+                    "SQL statements issued per request.",
+                ),
+            ):
+                header(name, "histogram", help_)
+                for (route, method), metrics in routes:
+                    histogram = getattr(metrics, attribute)
+                    labels = f'route="{route}",method="{method}"'
+                    for bound, count in histogram.cumulative():
+                        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+                    lines.append(f"{name}_sum{{{labels}}} {histogram.sum}")
+                    lines.append(f"{name}_count{{{labels}}} {sum(histogram.counts)}")
+
+            for name, attribute, help_ in (
+                (
+                    "montluxe_db_duration_seconds_total",
+                    "db_seconds",
+                    "Time spent executing SQL.",
+                ),
+                (
+                    "montluxe_serialization_duration_seconds_total",
+                    "serialization_seconds",
+                    "Time spent in to_dict() and JSON encoding.",
+                ),
+                (
+                    "montluxe_validation_duration_seconds_total",
+                    "validation_seconds",
+                    "Time spent validating request payloads.",
+                ),
+            ):
+                header(name, "counter", help_)
+                for (route, method), metrics in routes:
+                    lines.append(
+                        f'{name}{{route="{route}",method="{method}"}} {getattr(metrics, attribute)}'
+                    )
+
+        for name, type_, help_, value in extra:
+            header(name, type_, help_)
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+metrics_registry = MetricsRegistry()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_timing() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timing = current_timing()
+    started = conn.info.get("query_started")
+    if timing is not None and started:
+        timing.queries += 1
+        timing.db += time.perf_counter() - started.pop()
+
+
+def _discard_query_start(exception_context):
+    # A failed statement never reaches after_cursor_execute.
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_started"):
+        connection.info["query_started"].pop()
+
+
+def _timed_to_dict(to_dict):
+    def wrapper(self, *args, **kwargs):
+        with serialization_timer():
+            return to_dict(self, *args, **kwargs)
+
+    wrapper.__wrapped__ = to_dict
+    return wrapper
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    def dumps(self, obj, **kwargs):
+        with serialization_timer():
+            return super().dumps(obj, **kwargs)
+
+
+def _start_timing():
+    g.request_timing = RequestTiming()
+
+
+def _finish_timing(response):
+    timing = g.pop("request_timing", None)
+    if timing is None or request.endpoint == "metrics":
+        return response
+    duration = time.perf_counter() - timing.started
+    response.headers["Server-Timing"] = ", ".join(
+        (
+            f'db;dur={timing.db * 1000:.2f};desc="{timing.queries} queries"',
+            f"ser;dur={timing.serialization * 1000:.2f}",
+            f"val;dur={timing.validation * 1000:.2f}",
+            f"app;dur={duration * 1000:.2f}",
+        )
+    )
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    metrics_registry.record(
+        route, request.method, response.status_code, timing, duration
+    )
+    return response
+
+
+def install_instrumentation(app):
+    """
+    Starts timing every request of the app.
+
+    Hooks the SQLAlchemy cursor events, the to_dict() methods of the models and
+    the app's JSON provider, and adds the Server-Timing header to responses. Call it once
+    at startup, and only when REQUEST_METRICS is enabled, since the hooks cost
+    a little on every query.
+
+    Args:
+    app (Flask): The application to instrument.
+    """
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Engine, "handle_error", _discard_query_start)
+    # Models that override to_dict() (Product) don't go through the mixin's.
+    classes = [SerializerMixin]
+    for cls in classes:
+        classes.extend(cls.__subclasses__())
+        if "to_dict" in vars(cls):
+            cls.to_dict = _timed_to_dict(vars(cls)["to_dict"])
+
+    provider = TimedJSONProvider(app)
+    provider.compact = app.json.compact
+    app.json = provider
+
+    app.before_request(_start_timing)
+    app.after_request(_finish_timing)
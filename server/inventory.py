@@ -0,0 +1,332 @@
+# inventory.py
+# Stock accounting without table locks.
+# Stock only ever changes through single-row conditional UPDATEs: units are
+# taken with "SET item_quantity = item_quantity - n WHERE id = ? AND
+# item_quantity >= n", which the database applies atomically per row, so two
+# buyers of the last unit can't both succeed and buyers of different products
+# never wait on each other. Every write also bumps Product.version, the
+# compare-and-swap token that ORM updates (e.g. an admin PATCH) are checked
+# against.
+#
+# Carts can hold stock for RESERVATION_TTL seconds. Reserved units are taken
+# off item_quantity right away; checkout turns the cart's reservations into
+# the order, and a background sweeper gives back the units of reservations
+# that expired. Reservations are deleted with conditional DELETEs, so a
+# checkout and the sweeper racing for the same reservation can't both use it.
+
+import logging
+import os
+import secrets
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+
+from catalog_cache import mark_stock_changed
+from config import app, db
+from helpers import validate_type
+from models import InventoryReservation, Product
+from sqlalchemy import bindparam, delete, select, update
+
+logger = logging.getLogger(__name__)
+
+products_table = Product.__table__
+reservations_table = InventoryReservation.__table__
+
+# Stock is only taken if enough is left, so two concurrent checkouts can't both
+# take the last unit: the loser's UPDATE matches no row.
+take_stock = (
+    products_table.update()
+    .where(
+        products_table.c.id == bindparam("b_product_id"),
+        products_table.c.item_quantity >= bindparam("b_quantity"),
+    )
+    .values(
+        item_quantity=products_table.c.item_quantity - bindparam("b_quantity"),
+        version=products_table.c.version + 1,
+    )
+)
+
+return_stock = (
+    products_table.update()
+    .where(products_table.c.id == bindparam("b_product_id"))
+    .values(
+        item_quantity=products_table.c.item_quantity + bindparam("b_quantity"),
+        version=products_table.c.version + 1,
+    )
+)
+
+
+class ReservationError(ValueError):
+    """Raised when a reservation request can't be carried out as submitted."""
+
+
+class OutOfStockError(ReservationError):
+    """Raised when a product doesn't have enough unreserved stock left."""
+
+    def __init__(self, product_id, requested, available):
+        super().__init__("Insufficient stock for this product.")
+        self.product_id = product_id
+        self.requested = requested
+        self.available = available
+
+
+def utcnow():
+    # Naive UTC, like the timestamps SQLite's CURRENT_TIMESTAMP produces.
+    return datetime.utcnow()
+
+
+def stock_levels(session, product_ids):
+    return dict(
+        session.execute(
+            select(Product.id, Product.item_quantity).where(
+                Product.id.in_(list(product_ids))
+            )
+        ).all()
+    )
+
+
+def reserve(session, product_id, quantity, cart=None, ttl=None):
+    """
+    Holds stock of a product for a cart, in the session's transaction.
+
+    Args:
+    session: The SQLAlchemy session to use. The caller commits.
+    product_id (int): The product to reserve.
+    quantity (int): How many units to hold.
+    cart (str): The cart to add the reservation to. A new cart is started if omitted.
+    ttl (int): Seconds until the reservation expires. Defaults to RESERVATION_TTL.
+
+    Returns:
+    InventoryReservation: The new reservation.
+
+    Raises:
+    ReservationError: If the payload is malformed or the product doesn't exist.
+    OutOfStockError: If not enough stock is left.
+    """
+    try:
+        product_id = validate_type(product_id, "product_id", int)
+        quantity = validate_type(quantity, "quantity", int)
+    except ValueError as error:
+        raise ReservationError(str(error))
+    if quantity < 1:
+        raise ReservationError("The quantity must be at least 1.")
+    if cart is not None and (not isinstance(cart, str) or not 0 < len(cart) <= 64):
+        raise ReservationError("The cart must be a string of at most 64 characters.")
+    if session.get(Product, product_id) is None:
+        raise ReservationError(f"Unknown product id: {product_id}")
+
+    params = {"b_product_id": product_id, "b_quantity": quantity}
+    if session.execute(take_stock, params).rowcount != 1:
+        # Expired reservations still hold their units until the sweeper runs;
+        # hand this product's back now rather than turn the buyer away.
+        if not (
+            release_expired(session, product_id=product_id)
+            and session.execute(take_stock, params).rowcount == 1
+        ):
+            available = stock_levels(session, [product_id]).get(product_id) or 0
+            raise OutOfStockError(product_id, quantity, available)
+
+    reservation = InventoryReservation(
+        cart=cart or secrets.token_urlsafe(16),
+        product_id=product_id,
+        quantity=quantity,
+        expires_at=utcnow()
+        + timedelta(seconds=ttl if ttl is not None else app.config["RESERVATION_TTL"]),
+    )
+    session.add(reservation)
+    session.flush()
+    mark_stock_changed(session, [product_id])
+    return reservation
+
+
+def active_reservations(session, cart):
+    return (
+        session.execute(
+            select(InventoryReservation)
+            .where(
+                InventoryReservation.cart == cart,
+                InventoryReservation.expires_at > utcnow(),
+            )
+            .order_by(InventoryReservation.id)
+        )
+        .scalars()
+        .all()
+    )
+
+
+def _give_back(session, rows):
+    totals = Counter()
+    for product_id, quantity in rows:
+        totals[product_id] += quantity
+    if totals:
+        session.execute(
+            return_stock,
+            [
+                {"b_product_id": product_id, "b_quantity": quantity}
+                for product_id, quantity in sorted(totals.items())
+            ],
+        )
+        mark_stock_changed(session, totals)
+    return sum(totals.values())
+
+
+def release_reservation(session, reservation_id, cart):
+    """
+    Cancels a reservation and returns its stock, in the session's transaction.
+
+    Args:
+    session: The SQLAlchemy session to use. The caller commits.
+    reservation_id (int): The reservation to cancel.
+    cart (str): The cart it belongs to; knowing it is what authorizes the release.
+
+    Returns:
+    bool: False if no such reservation is held by the cart (anymore).
+    """
+    rows = session.execute(
+        delete(InventoryReservation)
+        .where(
+            InventoryReservation.id == reservation_id,
+            InventoryReservation.cart == cart,
+        )
+        .returning(InventoryReservation.product_id, InventoryReservation.quantity)
+    ).all()
+    return _give_back(session, rows) > 0
+
+
+def release_expired(session, product_id=None):
+    """
+    Deletes expired reservations and returns their stock, in the session's transaction.
+
+    Args:
+    session: The SQLAlchemy session to use. The caller commits.
+    product_id (int): Only release this product's reservations.
+
+    Returns:
+    int: How many units were returned to stock.
+    """
+    statement = delete(InventoryReservation).where(
+        InventoryReservation.expires_at <= utcnow()
+    )
+    if product_id is not None:
+        statement = statement.where(InventoryReservation.product_id == product_id)
+    rows = session.execute(
+        statement.returning(
+            InventoryReservation.product_id, InventoryReservation.quantity
+        )
+    ).all()
+    return _give_back(session, rows)
+
+
+def consume_reservations(session, cart, requested):
+    """
+    Uses a cart's live reservations to cover the quantities being ordered.
+
+    Reservations that are used up are deleted and partly used ones shrink. Both
+    are conditional on the reservation still being live and unchanged, so a
+    reservation the sweeper or a parallel checkout got to first isn't counted.
+
+    Args:
+    session: The SQLAlchemy session to use. The caller commits.
+    cart (str): The cart whose reservations to use.
+    requested (Counter): Units ordered per product id.
+
+    Returns:
+    Counter: Units per product id that were covered by reservations.
+    """
+    now = utcnow()
+    rows = session.execute(
+        select(
+            InventoryReservation.id,
+            InventoryReservation.product_id,
+            InventoryReservation.quantity,
+        )
+        .where(
+            InventoryReservation.cart == cart,
+            InventoryReservation.expires_at > now,
+            InventoryReservation.product_id.in_(list(requested)),
+        )
+        .order_by(InventoryReservation.id)
+    ).all()
+
+    covered = Counter()
+    for reservation_id, product_id, quantity in rows:
+        needed = requested[product_id] - covered[product_id]
+        if needed <= 0:
+            continue
+        used = min(needed, quantity)
+        live = (
+            InventoryReservation.id == reservation_id,
+            InventoryReservation.expires_at > now,
+            InventoryReservation.quantity == quantity,
+        )
+        if used == quantity:
+            statement = delete(InventoryReservation).where(*live)
+        else:
+            statement = (
+                update(InventoryReservation)
+                .where(*live)
+                .values(quantity=quantity - used)
+            )
+        if session.execute(statement).rowcount == 1:
+            covered[product_id] += used
+    return covered
+
+
+class ReservationSweeper:
+    """
+    Background thread that returns the stock of expired reservations.
+
+    Every worker process runs its own; they can't double count, since each
+    expired reservation is deleted by exactly one DELETE. Started lazily on
+    the first request, because threads started before a pre-forking server
+    forks don't exist in its workers.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def ensure_running(self):
+        if self.interval <= 0:
+            return
+        if self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="reservation-sweeper", daemon=True
+            )
+            self._pid = os.getpid()
+            self._thread.start()
+
+    def _run(self):
+        stop = threading.Event()
+        while not stop.wait(self.interval):
+            self.sweep()
+
+    def sweep(self):
+        """
+        Releases every expired reservation in its own transaction.
+
+        Returns:
+        int: How many units were returned to stock.
+        """
+        with app.app_context():
+            try:
+                released = release_expired(db.session)
+                db.session.commit()
+                return released
+            except Exception:
+                db.session.rollback()
+                logger.exception("Releasing expired reservations failed.")
+                return 0
+            finally:
+                db.session.remove()
+
+
+reservation_sweeper = ReservationSweeper(
+    interval=app.config["RESERVATION_SWEEP_INTERVAL"]
+)
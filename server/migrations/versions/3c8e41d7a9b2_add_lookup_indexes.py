@@ -0,0 +1,41 @@
+"""add indexes on foreign keys and lookup columns
+
+Revision ID: 3c8e41d7a9b2
+Revises: 5d4b9e9105f9
+Create Date: 2026-10-18 12:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c8e41d7a9b2'
+down_revision = '5d4b9e9105f9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keep the oldest row of any duplicated product/category pair so the unique index can be built.
+    op.execute(
+        "DELETE FROM product_categories WHERE id NOT IN "
+        "(SELECT MIN(id) FROM product_categories GROUP BY product_id, category_id)"
+    )
+    op.create_index('uq_product_categories_product_id_category_id', 'product_categories', ['product_id', 'category_id'], unique=True)
+    op.create_index(op.f('ix_product_categories_category_id'), 'product_categories', ['category_id'], unique=False)
+    op.create_index(op.f('ix_order_details_order_id'), 'order_details', ['order_id'], unique=False)
+    op.create_index(op.f('ix_order_details_product_id'), 'order_details', ['product_id'], unique=False)
+    op.create_index(op.f('ix_orders_user_id'), 'orders', ['user_id'], unique=False)
+    op.create_index(op.f('ix_products_name'), 'products', ['name'], unique=False)
+    op.create_index(op.f('ix_products_price'), 'products', ['price'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_products_price'), table_name='products')
+    op.drop_index(op.f('ix_products_name'), table_name='products')
+    op.drop_index(op.f('ix_orders_user_id'), table_name='orders')
+    op.drop_index(op.f('ix_order_details_product_id'), table_name='order_details')
+    op.drop_index(op.f('ix_order_details_order_id'), table_name='order_details')
+    op.drop_index(op.f('ix_product_categories_category_id'), table_name='product_categories')
+    op.drop_index('uq_product_categories_product_id_category_id', table_name='product_categories')
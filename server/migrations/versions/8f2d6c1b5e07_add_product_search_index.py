@@ -0,0 +1,62 @@
+"""add full-text search index for products
+
+Revision ID: 8f2d6c1b5e07
+Revises: 3c8e41d7a9b2
+Create Date: 2026-10-18 12:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8f2d6c1b5e07'
+down_revision = '3c8e41d7a9b2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # FTS5 is SQLite only; other backends search with LIKE until they get their own index.
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute("""
+        CREATE VIRTUAL TABLE products_fts USING fts5(
+            name, description, imageAlt,
+            content='products', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+    """)
+    op.execute("""
+        CREATE TRIGGER products_fts_insert AFTER INSERT ON products BEGIN
+            INSERT INTO products_fts(rowid, name, description, imageAlt)
+            VALUES (new.id, new.name, new.description, new.imageAlt);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER products_fts_delete AFTER DELETE ON products BEGIN
+            INSERT INTO products_fts(products_fts, rowid, name, description, imageAlt)
+            VALUES ('delete', old.id, old.name, old.description, old.imageAlt);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER products_fts_update
+        AFTER UPDATE OF name, description, imageAlt ON products BEGIN
+            INSERT INTO products_fts(products_fts, rowid, name, description, imageAlt)
+            VALUES ('delete', old.id, old.name, old.description, old.imageAlt);
+            INSERT INTO products_fts(rowid, name, description, imageAlt)
+            VALUES (new.id, new.name, new.description, new.imageAlt);
+        END
+    """)
+    # Index the products that already exist.
+    op.execute("INSERT INTO products_fts(products_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute("DROP TRIGGER IF EXISTS products_fts_update")
+    op.execute("DROP TRIGGER IF EXISTS products_fts_delete")
+    op.execute("DROP TRIGGER IF EXISTS products_fts_insert")
+    op.execute("DROP TABLE IF EXISTS products_fts")
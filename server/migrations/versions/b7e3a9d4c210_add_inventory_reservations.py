@@ -0,0 +1,47 @@
+"""add product version column and inventory reservations
+
+Revision ID: b7e3a9d4c210
+Revises: 8f2d6c1b5e07
+Create Date: 2026-10-18 13:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e3a9d4c210'
+down_revision = '8f2d6c1b5e07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # A plain ADD COLUMN; batch mode would rebuild products and drop its full-text search triggers.
+    op.add_column('products', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+    op.create_table('inventory_reservations',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('cart', sa.String(length=64), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], name=op.f('fk_inventory_reservations_product_id_products')),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_inventory_reservations_cart'), 'inventory_reservations', ['cart'], unique=False)
+    op.create_index(op.f('ix_inventory_reservations_expires_at'), 'inventory_reservations', ['expires_at'], unique=False)
+    op.create_index(op.f('ix_inventory_reservations_product_id'), 'inventory_reservations', ['product_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_inventory_reservations_product_id'), table_name='inventory_reservations')
+    op.drop_index(op.f('ix_inventory_reservations_expires_at'), table_name='inventory_reservations')
+    op.drop_index(op.f('ix_inventory_reservations_cart'), table_name='inventory_reservations')
+    op.drop_table('inventory_reservations')
+    if op.get_bind().dialect.name == 'sqlite':
+        # SQLite 3.35+ drops columns in place, which keeps the search triggers.
+        op.execute('ALTER TABLE products DROP COLUMN version')
+    else:
+        op.drop_column('products', 'version')
@@ -0,0 +1,53 @@
+"""add sales rollups
+
+Revision ID: d804600014dc
+Revises: b7e3a9d4c210
+Create Date: 2026-10-18 14:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd804600014dc'
+down_revision = 'b7e3a9d4c210'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The rollups start empty; run "python reports.py" to fill them from existing orders.
+    op.create_table('sales_daily',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('orders', sa.Integer(), nullable=False),
+    sa.Column('units', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('day')
+    )
+    op.create_table('product_sales_daily',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('orders', sa.Integer(), nullable=False),
+    sa.Column('units', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'product_id')
+    )
+    op.create_index(op.f('ix_product_sales_daily_product_id'), 'product_sales_daily', ['product_id'], unique=False)
+    op.create_table('category_sales_daily',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('category_id', sa.Integer(), nullable=False),
+    sa.Column('orders', sa.Integer(), nullable=False),
+    sa.Column('units', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'category_id')
+    )
+    op.create_index(op.f('ix_category_sales_daily_category_id'), 'category_sales_daily', ['category_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_category_sales_daily_category_id'), table_name='category_sales_daily')
+    op.drop_table('category_sales_daily')
+    op.drop_index(op.f('ix_product_sales_daily_product_id'), table_name='product_sales_daily')
+    op.drop_table('product_sales_daily')
+    op.drop_table('sales_daily')
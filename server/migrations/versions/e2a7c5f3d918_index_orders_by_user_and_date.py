@@ -0,0 +1,27 @@
+"""index orders by user and creation time
+
+Revision ID: e2a7c5f3d918
+Revises: d804600014dc
+Create Date: 2026-10-18 15:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2a7c5f3d918'
+down_revision = 'd804600014dc'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Replaces the single-column index; user_id lookups use the new index's leading column.
+    op.create_index('ix_orders_user_id_created_at', 'orders', ['user_id', 'created_at'], unique=False)
+    op.drop_index(op.f('ix_orders_user_id'), table_name='orders')
+
+
+def downgrade():
+    op.create_index(op.f('ix_orders_user_id'), 'orders', ['user_id'], unique=False)
+    op.drop_index('ix_orders_user_id_created_at', table_name='orders')
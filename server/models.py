@@ -4,13 +4,15 @@
 # Import necessary modules from SQLAlchemy and SerializerMixin for serialization.
 import re
 
-from config import bcrypt, db
+from config import db
 from helpers import (
     dollar_to_cents,
     validate_not_blank,
     validate_positive_number,
     validate_type,
 )
+from images import image_manifest
+from passwords import password_hasher
 from sqlalchemy import MetaData, null
 from sqlalchemy.ext.associationproxy import association_proxy
 from sqlalchemy.orm import validates
@@ -34,12 +36,17 @@ class Product(db.Model, SerializerMixin):
     __tablename__ = "products"
 
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(255), nullable=False)
+    name = db.Column(db.String(255), nullable=False, index=True)
     description = db.Column(db.Text)
-    price = db.Column(db.Integer, nullable=False)
+    price = db.Column(db.Integer, nullable=False, index=True)
     item_quantity = db.Column(db.Integer, default=0)
     image_url = db.Column(db.String(255))
     imageAlt = db.Column(db.String(255))
+    # Bumped on every write. ORM updates only apply if the row still has the
+    # version they loaded, so a blind overwrite can't undo a concurrent sale.
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+
+    __mapper_args__ = {"version_id_col": version}
 
     product_categories = db.relationship(
         "ProductCategory", back_populates="product", cascade="all, delete-orphan"
@@ -69,9 +76,13 @@ class Product(db.Model, SerializerMixin):
             "name": self.name,
             "description": self.description,
             "price": self.price / 100 if convert_price_to_dollars else self.price,
+            "price_cents": self.price,
             "item_quantity": self.item_quantity,
             "image_url": self.image_url,
             "imageAlt": self.imageAlt,
+            "version": self.version,
+            # Resized WebP/AVIF variants for <picture>/srcset, empty until images.py has run.
+            "image_srcset": image_manifest.srcsets(self.image_url),
         }
         return data
 
@@ -112,7 +123,20 @@ class ProductCategory(db.Model, SerializerMixin):
 
     id = db.Column(db.Integer, primary_key=True)
     product_id = db.Column(db.Integer, db.ForeignKey("products.id"), nullable=False)
-    category_id = db.Column(db.Integer, db.ForeignKey("categories.id"), nullable=False)
+    category_id = db.Column(
+        db.Integer, db.ForeignKey("categories.id"), nullable=False, index=True
+    )
+
+    # A product is in a category at most once. Product-side lookups use the
+    # leading product_id column of this index, so it needs no index of its own.
+    __table_args__ = (
+        db.Index(
+            "uq_product_categories_product_id_category_id",
+            "product_id",
+            "category_id",
+            unique=True,
+        ),
+    )
 
     product = db.relationship("Product", back_populates="product_categories")
     category = db.relationship("Category", back_populates="product_categories")
@@ -154,10 +178,14 @@ class User(db.Model, SerializerMixin):
 
     @password.setter
     def password(self, password):
-        self._password_hash = bcrypt.generate_password_hash(password).decode("utf-8")
+        self._password_hash = password_hasher.hash(password)
 
     def authenticate(self, password):
-        return bcrypt.check_password_hash(self._password_hash, password)
+        return password_hasher.verify(self._password_hash, password)
+
+    # True when the stored hash was made with a different cost than the configured one.
+    def password_needs_rehash(self):
+        return password_hasher.needs_rehash(self._password_hash)
 
     @validates("email")
     def validate_email(self, key, email):
@@ -169,7 +197,24 @@ class User(db.Model, SerializerMixin):
     def validate_username(self, key, username):
         return validate_not_blank(username, key)
 
-    serialize_rules = ("-orders",)
+    # The password hash never leaves the server.
+    serialize_rules = ("-orders", "-_password_hash")
+
+
+# InventoryReservation Model
+# Stock held for a shopping cart for a limited time. The units are taken off
+# Product.item_quantity when reserved and either turned into an order at
+# checkout or given back when the reservation expires or is released.
+class InventoryReservation(db.Model, SerializerMixin):
+    __tablename__ = "inventory_reservations"
+    id = db.Column(db.Integer, primary_key=True)
+    cart = db.Column(db.String(64), nullable=False, index=True)
+    product_id = db.Column(
+        db.Integer, db.ForeignKey("products.id"), nullable=False, index=True
+    )
+    quantity = db.Column(db.Integer, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
 
 
 # Order Model
@@ -179,6 +224,13 @@ class Order(db.Model, SerializerMixin):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+
+    # A user's orders newest first, straight from the index. Lookups by
+    # user_id alone use its leading column, so it needs no index of its own.
+    __table_args__ = (
+        db.Index("ix_orders_user_id_created_at", "user_id", "created_at"),
+    )
+
     order_details = db.relationship("OrderDetail", back_populates="order")
     user = db.relationship("User", back_populates="orders")
 
@@ -188,8 +240,12 @@ class Order(db.Model, SerializerMixin):
 class OrderDetail(db.Model, SerializerMixin):
     __tablename__ = "order_details"
     id = db.Column(db.Integer, primary_key=True)
-    order_id = db.Column(db.Integer, db.ForeignKey("orders.id"), nullable=False)
-    product_id = db.Column(db.Integer, db.ForeignKey("products.id"), nullable=False)
+    order_id = db.Column(
+        db.Integer, db.ForeignKey("orders.id"), nullable=False, index=True
+    )
+    product_id = db.Column(
+        db.Integer, db.ForeignKey("products.id"), nullable=False, index=True
+    )
     quantity = db.Column(db.Integer, nullable=False)
     order = db.relationship("Order", back_populates="order_details")
     product = db.relationship("Product")
@@ -198,3 +254,50 @@ class OrderDetail(db.Model, SerializerMixin):
         "-order",
         "-product",
     )
+
+
+# Sales rollups
+# Precomputed sales totals for /reports/sales, one row per day (and product or
+# category). Checkout adds each order to them in its own transaction, and
+# reports.py can rebuild them from order history. Revenue is in cents, at the
+# price the product had when the order was placed. There are no foreign keys,
+# so the history survives products and categories being deleted.
+class SalesDaily(db.Model, SerializerMixin):
+    __tablename__ = "sales_daily"
+    day = db.Column(db.Date, primary_key=True)
+    orders = db.Column(db.Integer, nullable=False, default=0)
+    units = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+class ProductSalesDaily(db.Model, SerializerMixin):
+    __tablename__ = "product_sales_daily"
+    day = db.Column(db.Date, primary_key=True)
+    product_id = db.Column(db.Integer, primary_key=True, index=True)
+    orders = db.Column(db.Integer, nullable=False, default=0)
+    units = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+class CategorySalesDaily(db.Model, SerializerMixin):
+    __tablename__ = "category_sales_daily"
+    day = db.Column(db.Date, primary_key=True)
+    category_id = db.Column(db.Integer, primary_key=True, index=True)
+    orders = db.Column(db.Integer, nullable=False, default=0)
+    units = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+# IdempotencyKey Model
+# The response to a request sent with an Idempotency-Key header, so a retry of
+# the same request gets the same answer instead of being carried out twice.
+# Stored in the transaction of the request it answers and kept until
+# expires_at; see idempotency.py.
+class IdempotencyKey(db.Model, SerializerMixin):
+    __tablename__ = "idempotency_keys"
+    key = db.Column(db.String(255), primary_key=True)
+    request_hash = db.Column(db.String(64), nullable=False)
+    status_code = db.Column(db.Integer, nullable=False)
+    response_body = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
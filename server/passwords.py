@@ -0,0 +1,70 @@
+# passwords.py
+# Password hashing service.
+# bcrypt is deliberately slow, and it releases the GIL while it works, so hashes
+# and verifications run on a bounded thread pool instead of the request thread.
+# The pool size caps how many CPU-bound hashes run at once, so a login storm
+# queues up there rather than starving every worker of CPU. The cost factor is
+# configurable, and hashes made with a different cost are upgraded on login.
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from config import app, bcrypt
+
+
+def hash_cost(password_hash):
+    """
+    Reads the cost factor out of a bcrypt hash such as "$2b$12$...".
+
+    Args:
+    password_hash (str): The stored hash.
+
+    Returns:
+    int or None: The cost factor, or None if the hash isn't a bcrypt hash.
+    """
+    try:
+        return int(password_hash.split("$")[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+class PasswordHasher:
+    def __init__(self, rounds, max_workers):
+        self.rounds = rounds
+        self.max_workers = max_workers
+        self._start_executor()
+        # A forked worker (pre-forking servers) inherits the pool but not its
+        # threads, so hashes submitted there would wait forever.
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._start_executor)
+
+    def _start_executor(self):
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="password-hasher"
+        )
+
+    def _hash(self, password, rounds):
+        return bcrypt.generate_password_hash(password, rounds).decode("utf-8")
+
+    def submit_hash(self, password):
+        return self._executor.submit(self._hash, password, self.rounds)
+
+    def submit_verify(self, password_hash, password):
+        return self._executor.submit(
+            bcrypt.check_password_hash, password_hash, password
+        )
+
+    def hash(self, password):
+        return self.submit_hash(password).result()
+
+    def verify(self, password_hash, password):
+        return self.submit_verify(password_hash, password).result()
+
+    def needs_rehash(self, password_hash):
+        return hash_cost(password_hash) != self.rounds
+
+
+password_hasher = PasswordHasher(
+    rounds=app.config["BCRYPT_LOG_ROUNDS"],
+    max_workers=app.config["PASSWORD_HASH_WORKERS"],
+)
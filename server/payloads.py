@@ -0,0 +1,110 @@
+# payloads.py
+# Pre-encoded JSON responses for cacheable endpoints.
+# A payload is serialized to compact JSON bytes once, tagged with a strong ETag
+# and compressed lazily per content-coding, so serving it again from the catalog
+# cache costs no serialization and a conditional request costs no body at all.
+
+import gzip
+import hashlib
+import json
+import threading
+
+from flask import Response, request
+from instrumentation import serialization_timer
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+# Bodies smaller than this are sent as-is; compressing them saves nothing.
+MIN_COMPRESS_SIZE = 512
+
+# Payloads are compressed on the request thread that first asks for a coding,
+# and again whenever the cache drops them, so these are the levels that give
+# most of the size reduction for a small fraction of the CPU time of the maximum
+# ones (gzip 9, brotli 11).
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+COMPRESSORS = {
+    "gzip": lambda body: gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+}
+if brotli is not None:
+    COMPRESSORS["br"] = lambda body: brotli.compress(body, quality=BROTLI_QUALITY)
+
+# Preference order when the client accepts several codings with equal weight.
+ENCODINGS = [name for name in ("br", "gzip") if name in COMPRESSORS] + ["identity"]
+
+
+class EncodedPayload:
+    """
+    A JSON-serializable value encoded once and reused across requests.
+
+    The ETag is a digest of the encoded bytes rather than the catalog version
+    counter alone: version numbers are per process, so two workers could hand
+    out the same tag for different content. The version counter still decides
+    when a payload is rebuilt, since the catalog cache drops payloads on every
+    bump.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        with serialization_timer():
+            self.body = json.dumps(data, separators=(",", ":")).encode("utf-8")
+        self.etag = hashlib.blake2b(self.body, digest_size=16).hexdigest()
+        self._encoded = {"identity": self.body}
+        self._lock = threading.Lock()
+
+    def encoded(self, encoding):
+        body = self._encoded.get(encoding)
+        if body is None:
+            with self._lock:
+                body = self._encoded.get(encoding)
+                if body is None:
+                    body = COMPRESSORS[encoding](self.body)
+                    self._encoded[encoding] = body
+        return body
+
+    def etag_for(self, encoding):
+        # Each content-coding is a different representation, so it gets its own strong tag.
+        return self.etag if encoding == "identity" else f"{self.etag}-{encoding}"
+
+    def matches(self, if_none_match):
+        return any(
+            if_none_match.contains_weak(self.etag_for(encoding))
+            for encoding in ENCODINGS
+        )
+
+
+def choose_encoding(payload):
+    if len(payload.body) < MIN_COMPRESS_SIZE:
+        return "identity"
+    return request.accept_encodings.best_match(ENCODINGS, default="identity")
+
+
+def payload_response(payload, status=200):
+    """
+    Builds a response for an EncodedPayload, honoring If-None-Match and Accept-Encoding.
+
+    Args:
+    payload (EncodedPayload): The pre-encoded body.
+    status (int): The status code for a full response.
+
+    Returns:
+    Response: A 304 when the client's cached copy is current, otherwise the encoded body.
+    """
+    encoding = choose_encoding(payload)
+    if request.if_none_match and payload.matches(request.if_none_match):
+        response = Response(status=304)
+    else:
+        response = Response(
+            payload.encoded(encoding), status=status, mimetype="application/json"
+        )
+        if encoding != "identity":
+            response.headers["Content-Encoding"] = encoding
+    response.set_etag(payload.etag_for(encoding))
+    response.vary.add("Accept-Encoding")
+    # Clients may keep the body but must revalidate it; a matching ETag costs a 304.
+    response.headers["Cache-Control"] = "no-cache"
+    return response
@@ -0,0 +1,240 @@
+# ratelimit.py
+# Token-bucket rate limits for the endpoints that run bcrypt.
+# Every POST /login and POST /users pays for a full bcrypt hash, so a
+# credential-stuffing burst can tie up every worker. Each request takes a token
+# from a bucket per client IP and, for logins, one per username; a request that
+# finds a bucket empty is answered with a 429 from before_request, before the
+# handler parses the payload, queries the database or hashes anything.
+# Buckets live in process memory by default, so each worker counts on its own;
+# set RATE_LIMIT_REDIS_URL to share them between workers through Redis or any
+# server that speaks its protocol and runs Lua scripts (Valkey, KeyDB, ...).
+
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from config import app
+from flask import make_response, request
+
+logger = logging.getLogger(__name__)
+
+# Usernames are only bucket keys; anything longer than a real one is cut short.
+MAX_KEY_LENGTH = 255
+
+
+class MemoryBucketStore:
+    """
+    Token buckets in process memory.
+
+    Buckets are kept in least-recently-used order, so taking a token is O(1)
+    and a bucket that has refilled completely, which is the same as having
+    none, is dropped from the front of the order. At most maxsize buckets are
+    kept; beyond that the least recently used one is dropped early, which only
+    ever gives a client back a full bucket.
+    """
+
+    def __init__(self, maxsize=100_000):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate):
+        """
+        Takes one token from a bucket.
+
+        Args:
+        key (str): The bucket, e.g. "login_ip:203.0.113.7".
+        capacity (int): The most tokens the bucket holds, i.e. the allowed burst.
+        rate (float): Tokens added back per second.
+
+        Returns:
+        tuple: (allowed, retry_after), where retry_after is the number of seconds until a token is available again, 0 if one was taken.
+        """
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.pop(key, None)
+            if bucket is None:
+                tokens = capacity
+            else:
+                tokens, updated_at, _ = bucket
+                tokens = min(capacity, tokens + (now - updated_at) * rate)
+            if tokens >= 1:
+                tokens -= 1
+                retry_after = 0
+            else:
+                retry_after = (1 - tokens) / rate
+            full_at = now + (capacity - tokens) / rate
+            self._buckets[key] = (tokens, now, full_at)
+            self._expire(now)
+            return retry_after == 0, retry_after
+
+    def _expire(self, now):
+        buckets = self._buckets
+        while buckets:
+            key, (_, _, full_at) = next(iter(buckets.items()))
+            if full_at > now and len(buckets) <= self.maxsize:
+                break
+            del buckets[key]
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+# Refill, take and store a bucket in one atomic step. The bucket expires once it
+# would be full again. Fractions don't survive Lua-to-Redis number conversion,
+# so retry_after comes back as a string.
+_REDIS_TAKE = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call("HMGET", KEYS[1], "tokens", "updated_at")
+local tokens = tonumber(bucket[1])
+if tokens == nil then
+    tokens = capacity
+else
+    tokens = math.min(capacity, tokens + math.max(0, now - tonumber(bucket[2])) * rate)
+end
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    retry_after = (1 - tokens) / rate
+end
+redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "updated_at", tostring(now))
+redis.call("PEXPIRE", KEYS[1], math.ceil((capacity - tokens) / rate * 1000) + 1000)
+return tostring(retry_after)
+"""
+
+
+class RedisBucketStore:
+    """
+    Token buckets in a Redis-compatible server, shared by every worker.
+
+    Each bucket is a hash that expires once it has refilled, so the server
+    does its own cleanup. If the server can't be reached, requests are let
+    through: an outage of the limiter shouldn't lock everyone out.
+    """
+
+    def __init__(self, url, prefix="ratelimit:"):
+        # Only needed when this backend is configured.
+        import redis
+
+        self.prefix = prefix
+        self._errors = (redis.RedisError,)
+        self._take = redis.Redis.from_url(url).register_script(_REDIS_TAKE)
+
+    def take(self, key, capacity, rate):
+        try:
+            retry_after = float(
+                self._take(keys=[self.prefix + key], args=[capacity, rate, time.time()])
+            )
+        except self._errors:
+            logger.exception(
+                "Rate limit store is unavailable; letting request through."
+            )
+            return True, 0
+        return retry_after == 0, retry_after
+
+
+class RateLimiter:
+    """
+    Checks requests against token buckets.
+
+    Args:
+    store: A bucket store with take(key, capacity, rate), e.g. MemoryBucketStore.
+    limits (dict): Bucket sizes by name, each a (burst, refills per minute) pair.
+    """
+
+    def __init__(self, store, limits):
+        self.store = store
+        self.limits = limits
+
+    def check(self, name, key):
+        """
+        Takes a token from the bucket of one client under one limit.
+
+        Args:
+        name (str): The limit, a key of self.limits.
+        key (str): The client, e.g. its IP address or the username it sent.
+
+        Returns:
+        float: 0 if the request may go ahead, else the seconds to wait before retrying.
+        """
+        burst, per_minute = self.limits[name]
+        allowed, retry_after = self.store.take(
+            f"{name}:{key[:MAX_KEY_LENGTH]}", burst, per_minute / 60
+        )
+        return 0 if allowed else retry_after
+
+    def login_retry_after(self):
+        retry_after = self.check("login_ip", client_ip())
+        if retry_after:
+            return retry_after
+        # A body that isn't JSON is left for Login.post to reject.
+        data = request.get_json(silent=True)
+        username = data.get("username") if isinstance(data, dict) else None
+        if isinstance(username, str) and username:
+            return self.check("login_username", username)
+        return 0
+
+    def signup_retry_after(self):
+        return self.check("signup_ip", client_ip())
+
+
+def client_ip():
+    # The peer address. Behind a reverse proxy, wrap the app in werkzeug's
+    # ProxyFix so this is the client rather than the proxy.
+    return request.remote_addr or "unknown"
+
+
+def rate_limited_response(retry_after):
+    seconds = max(1, math.ceil(retry_after))
+    response = make_response(
+        {"error": f"Too many attempts. Try again in {seconds} seconds."}, 429
+    )
+    response.headers["Retry-After"] = str(seconds)
+    return response
+
+
+def create_store(app):
+    url = app.config["RATE_LIMIT_REDIS_URL"]
+    if url:
+        return RedisBucketStore(url)
+    return MemoryBucketStore(maxsize=app.config["RATE_LIMIT_MAX_BUCKETS"])
+
+
+rate_limiter = RateLimiter(create_store(app), app.config["RATE_LIMITS"])
+
+
+def install_rate_limits(app, limiter):
+    """
+    Rate-limits logins and sign-ups.
+
+    Adds a before_request hook that answers POST /login and POST /users with
+    a 429 and a Retry-After header once the client's bucket is empty.
+
+    Args:
+    app (Flask): The application.
+    limiter (RateLimiter): The limiter to check requests against.
+    """
+    checks = {
+        ("login", "POST"): limiter.login_retry_after,
+        ("users", "POST"): limiter.signup_retry_after,
+    }
+
+    def enforce_rate_limits():
+        check = checks.get((request.endpoint, request.method))
+        if check is None:
+            return None
+        retry_after = check()
+        if retry_after:
+            return rate_limited_response(retry_after)
+        return None
+
+    app.before_request(enforce_rate_limits)
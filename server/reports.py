@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+# reports.py
+# Sales reporting from precomputed rollups.
+#   python reports.py                      (rebuild every rollup from order history)
+#   python reports.py --since 2026-10-01   (rebuild only that day and later)
+# Summing order_details for a dashboard means scanning every order line ever
+# placed on every refresh. Instead, checkout adds each order to three small
+# rollup tables (see models.py) in the same transaction that creates it, with
+# one upsert per table, and /reports/sales only reads those: a year of
+# per-product report is at most 365 rows per product, however many orders
+# there were.
+
+import argparse
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+
+from config import app, db
+from helpers import timestamp_bounds
+from models import (
+    Category,
+    CategorySalesDaily,
+    Order,
+    OrderDetail,
+    Product,
+    ProductCategory,
+    ProductSalesDaily,
+    SalesDaily,
+)
+from sqlalchemy import Date, cast, delete, func, insert, select
+
+ROLLUP_MODELS = (SalesDaily, ProductSalesDaily, CategorySalesDaily)
+ROLLUP_TOTALS = ("orders", "units", "revenue")
+REPORT_GROUPS = ("day", "product", "category")
+DEFAULT_REPORT_DAYS = 30
+MAX_REPORT_ROWS = 1000
+
+
+def _upsert_statement(session, model):
+    # INSERT ... ON CONFLICT DO UPDATE adds to an existing row atomically, so
+    # concurrent checkouts never lose each other's totals.
+    if session.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+
+    statement = dialect_insert(model.__table__)
+    return statement.on_conflict_do_update(
+        index_elements=[column.name for column in model.__table__.primary_key],
+        set_={
+            name: model.__table__.c[name] + statement.excluded[name]
+            for name in ROLLUP_TOTALS
+        },
+    )
+
+
+def _upsert(session, model, totals):
+    if not totals:
+        return
+    # Rows are written in key order so concurrent checkouts lock them in the
+    # same order and can't deadlock each other.
+    keys = [column.name for column in model.__table__.primary_key]
+    session.execute(
+        _upsert_statement(session, model),
+        [{**dict(zip(keys, key)), **values} for key, values in sorted(totals.items())],
+    )
+
+
+def record_sales(session, sales, prices):
+    """
+    Adds newly placed orders to the sales rollups, in the session's transaction.
+
+    Args:
+    session: The SQLAlchemy session to use. The caller commits.
+    sales (list): (day, lines) pairs, one per order, where lines are {"product_id": 1, "quantity": 2} dicts.
+    prices (dict): The current price in cents of each ordered product.
+    """
+    product_ids = {line["product_id"] for _, lines in sales for line in lines}
+    categories = defaultdict(list)
+    for product_id, category_id in session.execute(
+        select(ProductCategory.product_id, ProductCategory.category_id).where(
+            ProductCategory.product_id.in_(product_ids)
+        )
+    ):
+        categories[product_id].append(category_id)
+
+    daily = defaultdict(Counter)
+    by_product = defaultdict(Counter)
+    by_category = defaultdict(Counter)
+    for day, lines in sales:
+        units = Counter()
+        for line in lines:
+            units[line["product_id"]] += line["quantity"]
+
+        order_categories = set()
+        for product_id, quantity in units.items():
+            revenue = quantity * (prices.get(product_id) or 0)
+            daily[(day,)].update(units=quantity, revenue=revenue)
+            by_product[(day, product_id)].update(
+                orders=1, units=quantity, revenue=revenue
+            )
+            for category_id in categories[product_id]:
+                by_category[(day, category_id)].update(units=quantity, revenue=revenue)
+                order_categories.add(category_id)
+        daily[(day,)]["orders"] += 1
+        for category_id in order_categories:
+            by_category[(day, category_id)]["orders"] += 1
+
+    for model, totals in (
+        (SalesDaily, daily),
+        (ProductSalesDaily, by_product),
+        (CategorySalesDaily, by_category),
+    ):
+        _upsert(
+            session,
+            model,
+            {
+                key: {name: counts[name] for name in ROLLUP_TOTALS}
+                for key, counts in totals.items()
+            },
+        )
+
+
+def _order_day(session):
+    # CAST(... AS DATE) on SQLite would keep only the year.
+    if session.get_bind().dialect.name == "sqlite":
+        return func.date(Order.created_at)
+    return cast(Order.created_at, Date)
+
+
+def rebuild_sales_rollups(session, since=None):
+    """
+    Recomputes the sales rollups from order history, in the session's transaction.
+
+    Order details don't record the price paid, so rebuilt revenue uses each
+    product's current price; lines of deleted products count as units without
+    revenue. Checkouts committing during a rebuild may be counted twice or not
+    at all on databases that allow concurrent writers, so run it when the
+    store is quiet.
+
+    Args:
+    session: The SQLAlchemy session to use. The caller commits.
+    since (date): Only rebuild this day and later. Rebuilds everything if omitted.
+
+    Returns:
+    dict: The number of rows written per rollup table.
+    """
+    for model in ROLLUP_MODELS:
+        statement = delete(model)
+        if since is not None:
+            statement = statement.where(model.day >= since)
+        session.execute(statement)
+
+    day = _order_day(session).label("day")
+    units = func.sum(OrderDetail.quantity)
+    revenue = func.sum(OrderDetail.quantity * func.coalesce(Product.price, 0))
+    lines = (
+        select()
+        .select_from(Order)
+        .join(OrderDetail, OrderDetail.order_id == Order.id)
+        .outerjoin(Product, Product.id == OrderDetail.product_id)
+    )
+    if since is not None:
+        created_at, bind = timestamp_bounds(session, Order.created_at)
+        lines = lines.where(
+            created_at >= bind(datetime.combine(since, datetime.min.time()))
+        )
+
+    queries = {
+        SalesDaily: lines.add_columns(
+            day, func.count(func.distinct(Order.id)), units, revenue
+        ).group_by(day),
+        ProductSalesDaily: lines.add_columns(
+            day,
+            OrderDetail.product_id,
+            func.count(func.distinct(Order.id)),
+            units,
+            revenue,
+        ).group_by(day, OrderDetail.product_id),
+        CategorySalesDaily: lines.join(
+            ProductCategory, ProductCategory.product_id == OrderDetail.product_id
+        )
+        .add_columns(
+            day,
+            ProductCategory.category_id,
+            func.count(func.distinct(Order.id)),
+            units,
+            revenue,
+        )
+        .group_by(day, ProductCategory.category_id),
+    }
+
+    written = {}
+    for model, query in queries.items():
+        keys = [column.name for column in model.__table__.primary_key]
+        result = session.execute(
+            insert(model).from_select([*keys, *ROLLUP_TOTALS], query)
+        )
+        written[model.__tablename__] = result.rowcount
+    return written
+
+
+def parse_report_range(args, today=None):
+    """
+    Parses the start and end days of a report from query parameters.
+
+    Args:
+    args (dict): The query parameters; start and end are ISO dates and both inclusive.
+    today (date): The default end day. Defaults to the current UTC day.
+
+    Returns:
+    tuple: The (start, end) dates.
+
+    Raises:
+    ValueError: If a day isn't an ISO date or the range is reversed.
+    """
+    try:
+        end = date.fromisoformat(args["end"]) if args.get("end") else None
+        start = date.fromisoformat(args["start"]) if args.get("start") else None
+    except ValueError:
+        raise ValueError("The start and end must be dates like 2026-10-18.")
+    end = end or today or datetime.utcnow().date()
+    start = start or end - timedelta(days=DEFAULT_REPORT_DAYS - 1)
+    if start > end:
+        raise ValueError("The start must not be after the end.")
+    return start, end
+
+
+def _totals(row):
+    return {
+        "orders": row.orders,
+        "units": row.units,
+        "revenue_cents": row.revenue,
+        "revenue": row.revenue / 100,
+    }
+
+
+def sales_report(session, group, start, end, limit):
+    """
+    Reads sales totals from the rollups.
+
+    Args:
+    session: The SQLAlchemy session to use.
+    group (str): "day" for one row per day, or "product"/"category" for one row each, best selling first.
+    start (date): The first day included.
+    end (date): The last day included.
+    limit (int): The maximum number of rows.
+
+    Returns:
+    list: Report rows with orders, units and revenue (in cents and dollars).
+
+    Raises:
+    ValueError: If the group is unknown.
+    """
+    if group == "day":
+        rows = session.execute(
+            select(SalesDaily)
+            .where(SalesDaily.day.between(start, end))
+            .order_by(SalesDaily.day)
+            .limit(limit)
+        ).scalars()
+        return [{"day": row.day.isoformat(), **_totals(row)} for row in rows]
+
+    if group == "product":
+        model, key, names = ProductSalesDaily, "product_id", Product
+        key_column = ProductSalesDaily.product_id
+    elif group == "category":
+        model, key, names = CategorySalesDaily, "category_id", Category
+        key_column = CategorySalesDaily.category_id
+    else:
+        raise ValueError(f"The group must be one of {', '.join(REPORT_GROUPS)}.")
+
+    revenue = func.sum(model.revenue)
+    rows = session.execute(
+        select(
+            key_column.label("key"),
+            names.name,
+            func.sum(model.orders).label("orders"),
+            func.sum(model.units).label("units"),
+            revenue.label("revenue"),
+        )
+        .outerjoin(names, names.id == key_column)
+        .where(model.day.between(start, end))
+        .group_by(key_column, names.name)
+        .order_by(revenue.desc(), key_column)
+        .limit(limit)
+    )
+    return [{key: row.key, "name": row.name, **_totals(row)} for row in rows]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the sales rollups.")
+    parser.add_argument(
+        "--since",
+        type=date.fromisoformat,
+        help="only rebuild this day (YYYY-MM-DD) and later",
+    )
+    args = parser.parse_args()
+    with app.app_context():
+        written = rebuild_sales_rollups(db.session, args.since)
+        db.session.commit()
+    for table, rows in written.items():
+        print(f"{table}: {rows} rows")
@@ -0,0 +1,164 @@
+# schemas.py
+# Request payload schemas.
+# Building a marshmallow schema resolves its fields, nested schemas and
+# validators, so each one is instantiated once here and shared by every
+# request; load() itself is thread-safe. Handlers run load_payload() first
+# thing, so a malformed payload is turned away with a 400 before any query
+# runs, and only fields a schema declares reach the models: unknown fields are
+# an error rather than silently set.
+
+from checkout import MAX_ORDERS_PER_BATCH
+from instrumentation import validation_timer
+from marshmallow import RAISE, Schema, ValidationError, fields, validate
+
+
+# User Schema
+class UserSchema(Schema):
+    id = fields.Int(dump_only=True)
+    username = fields.Str(required=True, validate=validate.Length(min=3))
+    email = fields.Email(required=True)
+    first_name = fields.Str(required=False, validate=validate.Length(min=1))
+    last_name = fields.Str(required=False, validate=validate.Length(min=1))
+    password = fields.Str(
+        load_only=True, required=True, validate=validate.Length(min=6)
+    )
+    shipping_address = fields.Str(required=False, validate=validate.Length(min=1))
+    shipping_city = fields.Str(required=False, validate=validate.Length(min=1))
+    shipping_state = fields.Str(required=False, validate=validate.Length(min=1))
+    shipping_zip = fields.Str(required=False, validate=validate.Length(min=1))
+
+    class Meta:
+        unknown = RAISE
+
+
+# Credentials Schema
+# What login and the credential-checked account changes send.
+class CredentialsSchema(Schema):
+    username = fields.Str(required=True, validate=validate.Length(min=1))
+    password = fields.Str(required=True, validate=validate.Length(min=1))
+
+    class Meta:
+        unknown = RAISE
+
+
+# Password Change Schema
+# Signed-in clients may leave out the credentials; see Users.patch.
+class PasswordChangeSchema(CredentialsSchema):
+    newPassword = fields.Str(required=True, validate=validate.Length(min=6))
+
+
+# Product Schema
+# Prices are in dollars, as clients send them.
+class ProductSchema(Schema):
+    id = fields.Int(dump_only=True)
+    name = fields.Str(required=True, validate=validate.Length(min=1, max=255))
+    description = fields.Str(required=True, validate=validate.Length(min=1))
+    price = fields.Float(required=True, validate=validate.Range(min=0))
+    item_quantity = fields.Int(required=True, validate=validate.Range(min=0))
+    image_url = fields.Str(required=True, validate=validate.Length(min=1, max=255))
+    imageAlt = fields.Str(required=True, validate=validate.Length(min=1, max=255))
+    # Only used by updates: the version the client read, see ProductByID.patch.
+    version = fields.Int(load_only=True)
+
+    class Meta:
+        unknown = RAISE
+
+
+# OrderDetail Schema
+class OrderDetailSchema(Schema):
+    id = fields.Int(dump_only=True)
+    order_id = fields.Int(load_only=True, validate=validate.Range(min=1))
+    product_id = fields.Int(required=True, validate=validate.Range(min=1))
+    quantity = fields.Int(required=True, validate=validate.Range(min=1))
+
+    class Meta:
+        unknown = RAISE
+
+
+# Order Schema
+# user_id may be left out by signed-in clients; Orders.post fills it in.
+class OrderSchema(Schema):
+    id = fields.Int(dump_only=True)
+    user_id = fields.Int(load_only=True)
+    created_at = fields.DateTime(dump_only=True)
+    cart = fields.Str(load_only=True, validate=validate.Length(min=1, max=64))
+    order_details = fields.List(
+        fields.Nested(OrderDetailSchema),
+        required=True,
+        validate=validate.Length(min=1),
+    )
+
+    class Meta:
+        unknown = RAISE
+
+
+# Reservation Schema
+# A reservation without a cart starts a new one.
+class ReservationSchema(Schema):
+    product_id = fields.Int(required=True, validate=validate.Range(min=1))
+    quantity = fields.Int(load_default=1, validate=validate.Range(min=1))
+    cart = fields.Str(validate=validate.Length(min=1, max=64))
+
+    class Meta:
+        unknown = RAISE
+
+
+# Category Schema
+class CategorySchema(Schema):
+    name = fields.Str(required=True, validate=validate.Length(min=1, max=255))
+
+    class Meta:
+        unknown = RAISE
+
+
+# ProductCategory Schema
+class ProductCategorySchema(Schema):
+    product_id = fields.Int(required=True, strict=True, validate=validate.Range(min=1))
+    category_id = fields.Int(required=True, strict=True, validate=validate.Range(min=1))
+
+    class Meta:
+        unknown = RAISE
+
+
+class OrderBatchSchema(Schema):
+    orders = fields.List(
+        fields.Nested(OrderSchema(exclude=("cart",))),
+        required=True,
+        validate=validate.Length(min=1, max=MAX_ORDERS_PER_BATCH),
+    )
+
+    class Meta:
+        unknown = RAISE
+
+
+user_schema = UserSchema()
+credentials_schema = CredentialsSchema()
+password_change_schema = PasswordChangeSchema()
+token_password_change_schema = PasswordChangeSchema(partial=("username", "password"))
+product_schema = ProductSchema()
+product_update_schema = ProductSchema(partial=True)
+order_schema = OrderSchema()
+order_batch_schema = OrderBatchSchema()
+reservation_schema = ReservationSchema()
+category_schema = CategorySchema()
+product_category_schema = ProductCategorySchema()
+
+
+def load_payload(schema, data):
+    """
+    Validates a request payload and returns the fields the schema declares.
+
+    Args:
+    schema (Schema): One of the module-level schema instances.
+    data: The decoded JSON body, or None if the body was missing or not valid JSON.
+
+    Returns:
+    dict: The deserialized payload.
+
+    Raises:
+    ValidationError: If the payload is missing or not an object, misses required fields, has invalid values or unknown fields.
+    """
+    if data is None:
+        raise ValidationError({"_schema": ["The request body must be a JSON object."]})
+    with validation_timer():
+        return schema.load(data)
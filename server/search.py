@@ -0,0 +1,139 @@
+# search.py
+# Full-text product search.
+# On SQLite, products are indexed in an FTS5 table (products_fts) that stores no
+# text of its own. It points back at the products table, and triggers on
+# products keep it in sync. The table and triggers come from the migration for
+# migrated databases, and from the after_create hook below for databases built
+# with db.create_all(). Other backends fall back to case-insensitive LIKE
+# matching until they get a native index.
+
+import re
+
+from config import db
+from models import Product
+from sqlalchemy import DDL, and_, event, or_, select, text
+
+# Matches in the name count ten times as much as matches in the description,
+# and matches in the image alt text count three times as much.
+RANK_WEIGHTS = (10.0, 1.0, 3.0)
+
+FTS_DDL = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        name, description, imageAlt,
+        content='products', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, name, description, imageAlt)
+        VALUES (new.id, new.name, new.description, new.imageAlt);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, description, imageAlt)
+        VALUES ('delete', old.id, old.name, old.description, old.imageAlt);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_update
+    AFTER UPDATE OF name, description, imageAlt ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, description, imageAlt)
+        VALUES ('delete', old.id, old.name, old.description, old.imageAlt);
+        INSERT INTO products_fts(rowid, name, description, imageAlt)
+        VALUES (new.id, new.name, new.description, new.imageAlt);
+    END
+    """,
+)
+
+for statement in FTS_DDL:
+    event.listen(
+        Product.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite")
+    )
+# The triggers go away with the products table, but the FTS table doesn't.
+event.listen(
+    Product.__table__,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS products_fts").execute_if(dialect="sqlite"),
+)
+
+FTS_SEARCH = text(f"""
+    SELECT rowid FROM products_fts
+    WHERE products_fts MATCH :query
+    ORDER BY bm25(products_fts, {", ".join(map(str, RANK_WEIGHTS))}), rowid
+    LIMIT :limit OFFSET :offset
+    """)
+
+
+def search_terms(query):
+    """
+    Splits a search string into the words to match.
+
+    Args:
+    query (str): The raw search string.
+
+    Returns:
+    list: The words, lowercased.
+
+    Raises:
+    ValueError: If the query contains no words.
+    """
+    terms = re.findall(r"\w+", query or "", re.UNICODE)
+    if not terms:
+        raise ValueError("The search query must contain at least one word.")
+    return [term.lower() for term in terms]
+
+
+def fts_match_expression(terms):
+    # Each word is quoted so FTS5 operators in the input are taken literally,
+    # and starred so the last word can still be half typed ("alp" finds "Alpine").
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def search_product_ids(query, limit, offset=0):
+    """
+    Returns the ids of the products matching a search string, best match first.
+
+    Args:
+    query (str): The raw search string. Every word must match, as a prefix.
+    limit (int): The maximum number of ids to return.
+    offset (int): How many ranked matches to skip.
+
+    Returns:
+    list: Product ids.
+
+    Raises:
+    ValueError: If the query contains no words.
+    """
+    terms = search_terms(query)
+    if db.session.get_bind().dialect.name == "sqlite":
+        return list(
+            db.session.execute(
+                FTS_SEARCH,
+                {
+                    "query": fts_match_expression(terms),
+                    "limit": limit,
+                    "offset": offset,
+                },
+            ).scalars()
+        )
+
+    columns = (Product.name, Product.description, Product.imageAlt)
+    condition = and_(
+        *(
+            or_(*(column.icontains(term, autoescape=True) for column in columns))
+            for term in terms
+        )
+    )
+    return list(
+        db.session.execute(
+            select(Product.id)
+            .where(condition)
+            .order_by(Product.name, Product.id)
+            .limit(limit)
+            .offset(offset)
+        ).scalars()
+    )
@@ -1,15 +1,21 @@
 #!/usr/bin/env python3
 # seed.py
 # Standard library imports
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
 from random import choice as rc
 from random import randint
 
 from app import commit_session, get_or_create_category
 from config import app, db
 from faker import Faker
-from flask_bcrypt import Bcrypt
 from helpers import dollar_to_cents
 from models import Order, OrderDetail, Product, ProductCategory, User
+from passwords import password_hasher
+from reports import rebuild_sales_rollups
+from sqlalchemy import func, insert, select
 from sqlalchemy.exc import IntegrityError, NoResultFound
 
 products_data = [
@@ -70,13 +76,33 @@ products_data = [
 ]
 
 fake = Faker()
-bcrypt = Bcrypt(app)
 
+# Every seeded user gets the same password, hashed once. Hashing per user would
+# cost a full bcrypt run each and make large seeds take hours.
+SEED_PASSWORD = "montluxe-seed-password"
+_seed_password_hash = None
+
+
+def seed_password_hash():
+    global _seed_password_hash
+    if _seed_password_hash is None:
+        _seed_password_hash = password_hasher.hash(SEED_PASSWORD)
+    return _seed_password_hash
+
+
+# With --seed, order dates count back from this instant instead of the current
+# time, so the same options produce the same database on any day.
+SEED_EPOCH = datetime(2026, 1, 1)
+
+
+def create_fake_orders(num_orders=5, now=None):
+    user_ids = db.session.execute(select(User.id)).scalars().all()
+    if not user_ids:
+        print("No users available to create orders.")
+        return
 
-def create_fake_orders(num_orders=5):
     for _ in range(num_orders):
-        user_id = rc(User.query.all()).id
-        order = Order(user_id=user_id)
+        order = Order(user_id=rc(user_ids), created_at=now or datetime.utcnow())
         db.session.add(order)
 
     try:
@@ -87,14 +113,15 @@ def create_fake_orders(num_orders=5):
 
 
 def create_fake_order_details(num_details=10):
-    products = Product.query.all()
-    if not products:
-        print("No products available to create order details.")
+    product_ids = db.session.execute(select(Product.id)).scalars().all()
+    order_ids = db.session.execute(select(Order.id)).scalars().all()
+    if not product_ids or not order_ids:
+        print("No products or orders available to create order details.")
         return
 
     for _ in range(num_details):
-        order_id = rc(Order.query.all()).id
-        product_id = rc(products).id
+        order_id = rc(order_ids)
+        product_id = rc(product_ids)
         quantity = randint(1, 5)
 
         order_detail = OrderDetail(
@@ -132,8 +159,8 @@ def create_fake_users(num_users=2):
                 shipping_city=fake.city(),
                 shipping_state=fake.state(),
                 shipping_zip=fake.zipcode(),
-                password=bcrypt.generate_password_hash(fake.password()).decode("utf-8"),
             )
+            user._password_hash = seed_password_hash()
 
             db.session.add(user)
             db.session.commit()
@@ -187,11 +214,213 @@ def create_fake_products():
         print(f"Failed to add products. Error: {error}")
 
 
+# Synthetic catalog for load and search benchmarks. Names reuse the words of
+# the real collection so searches like "alpine" hit realistic numbers of rows.
+COLLECTION_WORDS = sorted(
+    {word for product in products_data for word in product["name"].split()}
+)
+
+
+def create_synthetic_products(count, chunk_size=10_000):
+    # Faker is slow per call, so descriptions are drawn from a pre-generated pool.
+    descriptions = [fake.paragraph(nb_sentences=4) for _ in range(1_000)]
+    created = 0
+    while created < count:
+        rows = []
+        for number in range(created + 1, min(created + chunk_size, count) + 1):
+            name = f"{rc(COLLECTION_WORDS)} {fake.word().title()} {number}"
+            rows.append(
+                {
+                    "name": name,
+                    "description": rc(descriptions),
+                    "price": fake.random_int(min=30000, max=150000),
+                    "item_quantity": fake.random_int(min=0, max=50),
+                    "image_url": f"/{rc(products_data)['imageSrc']}",
+                    "imageAlt": f"The {name} watch.",
+                }
+            )
+        db.session.execute(insert(Product), rows)
+        db.session.commit()
+        created += len(rows)
+    print(f"Added {count} synthetic products.")
+
+
+# Bulk generation for load testing. Rows are built in chunks and written with
+# one executemany INSERT per chunk and table, one transaction per chunk, so
+# memory stays flat and millions of rows take minutes. Ids are assigned up
+# front, so orders and details can point at rows without reading them back.
+# Faker values are drawn from pre-generated pools, since calling Faker per row
+# is the slowest part of generation.
+def _next_id(model):
+    return (db.session.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+
+def generate_users(count, chunk_size):
+    user_id = _next_id(User)
+    pool = [
+        (
+            fake.first_name(),
+            fake.last_name(),
+            fake.street_address(),
+            fake.city(),
+            fake.state(),
+            fake.zipcode(),
+        )
+        for _ in range(1_000)
+    ]
+    password_hash = seed_password_hash()
+
+    start = time.perf_counter()
+    created = 0
+    while created < count:
+        users = []
+        for _ in range(min(chunk_size, count - created)):
+            first, last, address, city, state, zipcode = rc(pool)
+            # The id suffix keeps usernames and emails unique.
+            username = f"{first.lower()}.{last.lower()}.{user_id}"
+            users.append(
+                {
+                    "id": user_id,
+                    "username": username,
+                    "email": f"{username}@example.com",
+                    "first_name": first,
+                    "last_name": last,
+                    "password_hash": password_hash,
+                    "shipping_address": address,
+                    "shipping_city": city,
+                    "shipping_state": state,
+                    "shipping_zip": zipcode,
+                }
+            )
+            user_id += 1
+        db.session.execute(User.__table__.insert(), users)
+        db.session.commit()
+        created += len(users)
+        print(f"  users: {created}/{count}", end="\r", flush=True)
+    print(f"\rAdded {created} users in {time.perf_counter() - start:.1f}s.")
+
+
+def generate_orders(count, max_details, days, chunk_size, now=None):
+    user_ids = db.session.execute(select(User.id)).scalars().all()
+    product_ids = db.session.execute(select(Product.id)).scalars().all()
+    if not user_ids or not product_ids:
+        print("Users and products are needed before orders can be generated.")
+        return
+    order_id = _next_id(Order)
+    detail_id = _next_id(OrderDetail)
+    now = now or datetime.utcnow()
+    span = days * 24 * 60 * 60
+
+    start = time.perf_counter()
+    created = detail_count = 0
+    while created < count:
+        orders, details = [], []
+        for _ in range(min(chunk_size, count - created)):
+            orders.append(
+                {
+                    "id": order_id,
+                    "user_id": rc(user_ids),
+                    "created_at": now - timedelta(seconds=randint(0, span)),
+                }
+            )
+            lines = min(randint(1, max_details), len(product_ids))
+            for product_id in random.sample(product_ids, lines):
+                details.append(
+                    {
+                        "id": detail_id,
+                        "order_id": order_id,
+                        "product_id": product_id,
+                        "quantity": randint(1, 5),
+                    }
+                )
+                detail_id += 1
+            order_id += 1
+        db.session.execute(Order.__table__.insert(), orders)
+        db.session.execute(OrderDetail.__table__.insert(), details)
+        db.session.commit()
+        created += len(orders)
+        detail_count += len(details)
+        print(f"  orders: {created}/{count}", end="\r", flush=True)
+    print(
+        f"\rAdded {created} orders with {detail_count} order details "
+        f"in {time.perf_counter() - start:.1f}s."
+    )
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Seed the Mont Luxe database. Without options, adds a small "
+        "demo data set; with --users/--orders/--products, bulk-generates "
+        "load-test data on top of the real catalog."
+    )
+    parser.add_argument(
+        "--products",
+        type=int,
+        default=0,
+        help="bulk-insert this many synthetic products",
+    )
+    parser.add_argument(
+        "--users", type=int, default=0, help="bulk-insert this many users"
+    )
+    parser.add_argument(
+        "--orders",
+        type=int,
+        default=0,
+        help="bulk-insert this many orders, each with order details",
+    )
+    parser.add_argument(
+        "--max-details",
+        type=int,
+        default=4,
+        help="most order details per generated order (default 4)",
+    )
+    parser.add_argument(
+        "--days",
+        type=int,
+        default=365,
+        help="spread generated orders over this many past days (default 365)",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=10_000,
+        help="rows per INSERT batch and transaction (default 10000)",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        help="random seed, so the same options generate the same data; "
+        f"order dates then count back from {SEED_EPOCH:%Y-%m-%d}",
+    )
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
+    args = parse_args()
+    now = None
+    if args.seed is not None:
+        Faker.seed(args.seed)
+        random.seed(args.seed)
+        now = SEED_EPOCH
     with app.app_context():
         db.create_all()
-        create_fake_users()
-        create_fake_orders()
-        create_fake_products()
-        create_fake_order_details()
+        if not (args.products or args.users or args.orders):
+            create_fake_users()
+            create_fake_orders(now=now)
+            create_fake_products()
+            create_fake_order_details()
+        else:
+            create_fake_products()
+            if args.products:
+                create_synthetic_products(args.products, args.chunk_size)
+            if args.users:
+                generate_users(args.users, args.chunk_size)
+            if args.orders:
+                generate_orders(
+                    args.orders, args.max_details, args.days, args.chunk_size, now
+                )
+        # Seeded orders bypass checkout, so the sales rollups are rebuilt from them.
+        rebuild_sales_rollups(db.session)
+        db.session.commit()
         print("Database seeded successfully!")
@@ -0,0 +1,62 @@
+# tests/conftest.py
+# Shared fixtures. Run the tests from the server directory:
+#   python -m pytest tests
+# The app is imported once against a scratch SQLite database (see
+# benchmarks.common.load_app, which also switches the rate limits off), and
+# every test starts from empty tables.
+
+import pytest
+from benchmarks.common import load_app
+from sqlalchemy import insert
+
+app, db = load_app()
+
+
+@pytest.fixture
+def client():
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    yield app.test_client()
+    with app.app_context():
+        db.session.remove()
+
+
+@pytest.fixture
+def catalog(client):
+    """Two users and three products with 10 units each, inserted without the model validators."""
+    from models import Product, User
+
+    with app.app_context():
+        db.session.execute(
+            insert(User),
+            [
+                {
+                    "username": name,
+                    "email": f"{name}@example.com",
+                    "last_name": name.title(),
+                    "_password_hash": "unused",
+                    "shipping_address": "1 Test St",
+                    "shipping_city": "Geneva",
+                    "shipping_state": "GE",
+                    "shipping_zip": "1200",
+                }
+                for name in ("alice", "bob")
+            ],
+        )
+        db.session.execute(
+            insert(Product),
+            [
+                {
+                    "name": f"Watch {i}",
+                    "description": "A watch.",
+                    "price": 100_00 * i,
+                    "item_quantity": 10,
+                    "image_url": f"watch{i}.png",
+                    "imageAlt": f"Watch {i}",
+                }
+                for i in (1, 2, 3)
+            ],
+        )
+        db.session.commit()
+    return client
@@ -0,0 +1,73 @@
+# tests/test_catalog_cache.py
+# Targeted invalidation of cached catalog payloads.
+
+import time
+
+from catalog_cache import LRUCache, catalog_cache
+
+
+def test_invalidate_drops_tagged_entries_and_keys():
+    cache = LRUCache(maxsize=10, ttl=60)
+    cache.set(("product", 1), "one")
+    cache.set(("product", 2), "two")
+    cache.set("page", "1 and 2", tags=[("product", 1), ("product", 2)])
+    cache.set("other page", "3", tags=[("product", 3)])
+
+    cache.invalidate([("product", 1)])
+
+    assert cache.get(("product", 1)) is None
+    assert cache.get("page") is None
+    assert cache.get(("product", 2)) == "two"
+    assert cache.get("other page") == "3"
+
+
+def test_evicted_entries_leave_no_tags_behind():
+    cache = LRUCache(maxsize=1, ttl=60)
+    cache.set("a", 1, tags=["t"])
+    cache.set("b", 2, tags=["t"])
+
+    cache.invalidate(["t"])
+
+    assert cache.stats()["size"] == 0
+    assert cache._tagged == {}
+
+
+def test_invalidate_discards_a_load_racing_it():
+    cache = LRUCache(maxsize=10, ttl=60)
+
+    def load():
+        cache.invalidate([("product", 1)])
+        return "stale"
+
+    assert cache.get_or_load("page", load) == "stale"
+    assert cache.get("page") is None
+
+
+def test_an_order_only_drops_payloads_of_its_products(catalog):
+    client = catalog
+    for path in ("/products/1", "/products/2", "/products?limit=1", "/products"):
+        assert client.get(path).status_code == 200
+    second_page = client.get("/products?limit=1").get_json()["next_cursor"]
+    assert client.get(f"/products?limit=1&after={second_page}").status_code == 200
+
+    response = client.post(
+        "/orders",
+        json={"user_id": 1, "order_details": [{"product_id": 1, "quantity": 2}]},
+    )
+    assert response.status_code == 201
+
+    assert catalog_cache.get(("product", 1)) is None
+    assert catalog_cache.get(("products", "all")) is None
+    assert catalog_cache.get(("products", "id", None, "1")) is None
+    assert catalog_cache.get(("product", 2)) is not None
+    assert catalog_cache.get(("products", "id", second_page, "1")) is not None
+    assert client.get("/products/1").get_json()["item_quantity"] == 8
+
+
+def test_entry_ttl_only_shortens_the_cache_ttl():
+    cache = LRUCache(maxsize=10, ttl=60)
+    cache.set("long", 1, ttl=3600)
+    cache.set("gone", 2, ttl=0)
+
+    assert cache._entries["long"][0] - time.monotonic() <= 60
+    assert cache.get("gone") is None
@@ -0,0 +1,27 @@
+# tests/test_checkout.py
+# Checkout's stock accounting.
+
+from collections import Counter
+
+from checkout import _take_stock
+from conftest import app, db
+from sqlalchemy import event
+
+
+def test_stock_is_taken_in_product_id_order(client):
+    updated = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("UPDATE products"):
+            rows = parameters if executemany else [parameters]
+            updated.extend(row[-2] for row in rows)
+
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            _take_stock(db.session, Counter({7: 1, 3: 2, 5: 1}))
+        finally:
+            event.remove(db.engine, "before_cursor_execute", record)
+            db.session.rollback()
+
+    assert updated == [3, 5, 7]
@@ -0,0 +1,71 @@
+# tests/test_exports.py
+# Time ranges of the order exports and the rollup rebuild on SQLite, where
+# created_at is stored as text with or without microseconds.
+
+import json
+from datetime import date
+
+import pytest
+from conftest import app, db
+from models import SalesDaily
+from reports import rebuild_sales_rollups
+from sqlalchemy import select, text
+
+STORED = {
+    1: "2026-10-09 23:59:59.999999",
+    2: "2026-10-10 00:00:00",
+    3: "2026-10-10 00:00:00.000000",
+    4: "2026-10-10 12:30:00.250000",
+    5: "2026-10-11 00:00:00",
+    6: "2026-10-11 00:00:00.000000",
+}
+
+
+@pytest.fixture
+def orders(catalog):
+    with app.app_context():
+        for order_id, created_at in STORED.items():
+            db.session.execute(
+                text(
+                    "INSERT INTO orders (id, user_id, created_at) "
+                    "VALUES (:id, 1, :created_at)"
+                ),
+                {"id": order_id, "created_at": created_at},
+            )
+            db.session.execute(
+                text(
+                    "INSERT INTO order_details (order_id, product_id, quantity) "
+                    "VALUES (:id, 1, 1)"
+                ),
+                {"id": order_id},
+            )
+        db.session.commit()
+    return catalog
+
+
+def exported_ids(client, query):
+    response = client.get(f"/orders/export?{query}")
+    assert response.status_code == 200
+    return [
+        json.loads(line)["id"] for line in response.get_data(as_text=True).splitlines()
+    ]
+
+
+def test_since_is_inclusive_and_until_exclusive_to_the_second(orders):
+    assert exported_ids(orders, "since=2026-10-10&until=2026-10-11") == [2, 3, 4]
+
+
+def test_bounds_with_fractional_seconds(orders):
+    query = "since=2026-10-09T23:59:59.999999&until=2026-10-10T12:30:00.250000"
+    assert exported_ids(orders, query) == [1, 2, 3]
+
+
+def test_rebuild_since_includes_orders_at_midnight(orders):
+    with app.app_context():
+        rebuild_sales_rollups(db.session, since=date(2026, 10, 10))
+        db.session.commit()
+        rows = db.session.execute(
+            select(SalesDaily.day, SalesDaily.orders).order_by(SalesDaily.day)
+        ).all()
+
+    assert rows == [(date(2026, 10, 10), 3), (date(2026, 10, 11), 2)]
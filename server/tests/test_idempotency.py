@@ -0,0 +1,50 @@
+# tests/test_idempotency.py
+# Stored responses are never replayed from the cache after their row expires.
+
+import time
+from datetime import timedelta
+
+from conftest import app, db
+from idempotency import idempotency_store, keys_table
+from inventory import utcnow
+from sqlalchemy import insert
+
+
+def cached_lifetime(key):
+    expires_at, _, _ = idempotency_store.cache._entries[key]
+    return expires_at - time.monotonic()
+
+
+def test_cache_entry_expires_with_its_row(client):
+    idempotency_store.cache.clear()
+    now = utcnow()
+    with app.app_context():
+        db.session.execute(
+            insert(keys_table).values(
+                key="almost-expired",
+                request_hash="hash",
+                status_code=201,
+                response_body="{}",
+                created_at=now - timedelta(hours=23),
+                expires_at=now + timedelta(seconds=30),
+            )
+        )
+        db.session.commit()
+
+        with app.test_request_context():
+            response = idempotency_store.replay(db.session, "almost-expired", "hash")
+
+    assert response.status_code == 201
+    assert 0 < cached_lifetime("almost-expired") <= 30
+
+
+def test_committed_responses_are_cached_until_expiry(catalog):
+    idempotency_store.cache.clear()
+    response = catalog.post(
+        "/orders",
+        json={"user_id": 1, "order_details": [{"product_id": 1, "quantity": 1}]},
+        headers={"Idempotency-Key": "fresh"},
+    )
+
+    assert response.status_code == 201
+    assert 0 < cached_lifetime("fresh") <= idempotency_store.ttl
@@ -0,0 +1,49 @@
+# tests/test_order_history.py
+# The order history endpoints issue the same number of queries however many
+# orders there are.
+
+import pytest
+from auth import issue_token
+from benchmarks.common import QueryCounter
+from conftest import app, db
+from models import Order, OrderDetail
+from sqlalchemy import insert
+
+
+def add_orders(count):
+    with app.app_context():
+        for _ in range(count):
+            order_id = db.session.execute(
+                insert(Order).values(user_id=1).returning(Order.id)
+            ).scalar_one()
+            db.session.execute(
+                insert(OrderDetail),
+                [
+                    {"order_id": order_id, "product_id": product_id, "quantity": 1}
+                    for product_id in (1, 2, 3)
+                ],
+            )
+        db.session.commit()
+
+
+def count_queries(client, path):
+    with app.app_context():
+        headers = {"Authorization": f"Bearer {issue_token(1)}"}
+        engine = db.engine
+    with QueryCounter(engine) as counter:
+        response = client.get(path, headers=headers)
+    assert response.status_code == 200
+    return counter.count, len(response.get_json())
+
+
+@pytest.mark.parametrize("path", ["/order_history", "/users/1/order_history"])
+def test_query_count_does_not_grow_with_orders(catalog, path):
+    add_orders(5)
+    queries, orders = count_queries(catalog, path)
+    assert orders == 5
+
+    add_orders(5)
+    queries_for_twice_as_many, orders = count_queries(catalog, path)
+    assert orders == 10
+
+    assert queries_for_twice_as_many == queries
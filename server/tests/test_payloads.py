@@ -0,0 +1,78 @@
+# tests/test_payloads.py
+# Request bodies that aren't JSON are rejected with a 400 before any handler work.
+
+import pytest
+from auth import issue_token
+from conftest import app
+
+ENDPOINTS = [
+    ("post", "/products"),
+    ("patch", "/products/1"),
+    ("post", "/users"),
+    ("post", "/orders"),
+    ("post", "/orders/batch"),
+    ("post", "/reservations"),
+    ("post", "/login"),
+    ("patch", "/users"),
+    ("delete", "/users"),
+    ("post", "/categories"),
+    ("post", "/product_categories"),
+]
+
+
+@pytest.mark.parametrize("method,path", ENDPOINTS)
+@pytest.mark.parametrize(
+    "body,content_type",
+    [
+        ("{bad", "application/json"),
+        ("null", "application/json"),
+        ("order=1", "text/plain"),
+        ("", None),
+    ],
+)
+def test_malformed_body_is_a_400(client, method, path, body, content_type):
+    response = getattr(client, method)(path, data=body, content_type=content_type)
+
+    assert response.status_code == 400
+    assert response.get_json()["errors"] == {
+        "_schema": ["The request body must be a JSON object."]
+    }
+
+
+@pytest.mark.parametrize("method,path", ENDPOINTS)
+def test_non_object_body_is_a_400(client, method, path):
+    response = getattr(client, method)(path, json=[1, 2])
+
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "Invalid payload"
+
+
+@pytest.mark.parametrize(
+    "method,path,body",
+    [
+        ("post", "/login", {"username": "alice"}),
+        ("delete", "/users", {"password": "secret"}),
+        ("patch", "/users", {"username": "alice", "password": "secret"}),
+        (
+            "patch",
+            "/users",
+            {"username": "alice", "password": "x", "newPassword": "short"},
+        ),
+        ("post", "/categories", {}),
+        ("post", "/product_categories", {"product_id": "1", "category_id": 1}),
+    ],
+)
+def test_incomplete_body_is_a_400(client, method, path, body):
+    response = getattr(client, method)(path, json=body)
+
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "Invalid payload"
+
+
+def test_signed_in_password_change_needs_only_the_new_password(catalog):
+    with app.app_context():
+        headers = {"Authorization": f"Bearer {issue_token(1)}"}
+
+    response = catalog.patch("/users", json={"newPassword": "secret"}, headers=headers)
+
+    assert response.status_code == 200
@@ -0,0 +1,16 @@
+# tests/test_query_plans.py
+# Every hot query of benchmarks/query_plans.py is answered from an index.
+
+import pytest
+from benchmarks.query_plans import explain, full_scans, hot_queries
+from conftest import app, db
+
+HOT_QUERIES = hot_queries()
+
+
+@pytest.mark.parametrize("name", HOT_QUERIES)
+def test_hot_query_uses_an_index(client, name):
+    with app.app_context(), db.engine.connect() as connection:
+        plan = explain(connection, HOT_QUERIES[name])
+
+    assert not full_scans(plan), plan
@@ -0,0 +1,50 @@
+# tests/test_reservations.py
+# Reservation payloads and their effect on the catalog cache.
+
+import pytest
+from catalog_cache import catalog_cache
+from conftest import app, db
+from inventory import ReservationError, reserve
+
+
+@pytest.mark.parametrize(
+    "body,field",
+    [
+        ({}, "product_id"),
+        ({"product_id": 1, "quantity": "x"}, "quantity"),
+        ({"product_id": 1, "quantity": 0}, "quantity"),
+        ({"product_id": 1, "cart": ""}, "cart"),
+        ({"product_id": 1, "colour": "red"}, "colour"),
+    ],
+)
+def test_invalid_reservation_is_a_400(catalog, body, field):
+    response = catalog.post("/reservations", json=body)
+
+    assert response.status_code == 400
+    assert field in response.get_json()["errors"]
+
+
+def test_reserve_rejects_malformed_values_with_a_reservation_error(client):
+    with app.app_context(), pytest.raises(ReservationError):
+        reserve(db.session, "x", 1)
+
+
+def test_reserving_and_releasing_only_drop_that_products_payloads(catalog):
+    client = catalog
+    for path in ("/products/1", "/products/2"):
+        assert client.get(path).status_code == 200
+
+    reservation = client.post("/reservations", json={"product_id": 1, "quantity": 3})
+    assert reservation.status_code == 201
+    assert catalog_cache.get(("product", 1)) is None
+    assert catalog_cache.get(("product", 2)) is not None
+    assert client.get("/products/1").get_json()["item_quantity"] == 7
+
+    reservation = reservation.get_json()
+    response = client.delete(
+        f"/reservations/{reservation['id']}?cart={reservation['cart']}"
+    )
+    assert response.status_code in (200, 204)
+    assert catalog_cache.get(("product", 1)) is None
+    assert catalog_cache.get(("product", 2)) is not None
+    assert client.get("/products/1").get_json()["item_quantity"] == 10
@@ -0,0 +1,30 @@
+# tests/test_seed.py
+# Bulk seeding with a fixed random seed.
+
+import random
+
+from conftest import app, db
+from models import Order, OrderDetail
+from seed import SEED_EPOCH, generate_orders
+from sqlalchemy import delete, select
+
+
+def seeded_orders():
+    random.seed(7)
+    generate_orders(50, max_details=2, days=30, chunk_size=20, now=SEED_EPOCH)
+    rows = db.session.execute(
+        select(Order.id, Order.user_id, Order.created_at).order_by(Order.id)
+    ).all()
+    db.session.execute(delete(OrderDetail))
+    db.session.execute(delete(Order))
+    db.session.commit()
+    return rows
+
+
+def test_seeded_orders_are_reproducible(catalog):
+    with app.app_context():
+        first = seeded_orders()
+        second = seeded_orders()
+
+    assert first == second
+    assert all(created_at <= SEED_EPOCH for _, _, created_at in first)
@@ -0,0 +1,59 @@
+# tests/test_user_orders.py
+# GET /users/<id>/orders: owner-only access and SQL-computed totals.
+
+import pytest
+from auth import issue_token
+from conftest import app
+
+
+def bearer(user_id):
+    with app.app_context():
+        return {"Authorization": f"Bearer {issue_token(user_id)}"}
+
+
+@pytest.fixture
+def orders(catalog):
+    for details in (
+        [{"product_id": 1, "quantity": 2}, {"product_id": 3, "quantity": 1}],
+        [{"product_id": 2, "quantity": 1}],
+    ):
+        response = catalog.post(
+            "/orders", json={"user_id": 1, "order_details": details}
+        )
+        assert response.status_code == 201
+    return catalog
+
+
+def test_orders_need_a_token(orders):
+    response = orders.get("/users/1/orders")
+
+    assert response.status_code == 401
+
+
+def test_orders_of_someone_else_are_forbidden(orders):
+    response = orders.get("/users/1/orders", headers=bearer(2))
+
+    assert response.status_code == 403
+
+
+def test_orders_come_newest_first_with_totals(orders):
+    first = orders.get("/users/1/orders?limit=1", headers=bearer(1)).get_json()
+    second = orders.get(
+        f"/users/1/orders?limit=1&after={first['next_cursor']}", headers=bearer(1)
+    ).get_json()
+
+    assert [order["id"] for order in first["orders"] + second["orders"]] == [2, 1]
+    assert second["next_cursor"] is None
+    assert first["orders"][0]["total_cents"] == 200_00
+    assert second["orders"][0]["items"] == 2
+    assert second["orders"][0]["units"] == 3
+    assert second["orders"][0]["total_cents"] == 2 * 100_00 + 300_00
+
+
+def test_order_history_needs_the_owners_token(orders):
+    assert orders.get("/users/1/order_history").status_code == 401
+    assert orders.get("/users/1/order_history", headers=bearer(2)).status_code == 403
+
+    response = orders.get("/users/1/order_history", headers=bearer(1))
+    assert response.status_code == 200
+    assert [order["id"] for order in response.get_json()] == [1, 2]